@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+#
+# This script measures lookup throughput of a frozen taxonomy with an increasing
+# number of threads. Throughput only grows with cores on free-threaded Python builds.
+#
+# Usage: thread_scaling_bench.py [taxonomy_db/] [max_threads] [lookups_per_thread]
+#
+
+import logging
+import detaxa.taxonomy as t
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M',
+)
+
+def worker(tids, n):
+    for i in range(n):
+        t.taxid2lineage(tids[i % len(tids)])
+
+def cli():
+    dbpath = sys.argv[1] if len(sys.argv) > 1 else None
+    max_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    n = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    t.loadTaxonomy(dbpath)
+    t.freezeTaxonomy()
+    tids = list(t.taxParents)
+
+    gil = sys._is_gil_enabled() if hasattr(sys, '_is_gil_enabled') else True
+    logging.info(f'GIL enabled: {gil}')
+
+    threads = 1
+    print('threads\tlookups\tseconds\tlookups/sec')
+    while threads <= max_threads:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [executor.submit(worker, tids[i::threads], n) for i in range(threads)]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+        print(f'{threads}\t{threads*n}\t{elapsed:.3f}\t{threads*n/elapsed:.0f}')
+        threads *= 2
+
+if __name__ == '__main__':
+    cli()
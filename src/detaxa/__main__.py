@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import os
 import logging
 from . import taxonomy as t
 from . import __version__
@@ -8,24 +9,40 @@ import click
 def cli():
     pass
 
+def _taxonomyOptions(func):
+    """Options of the taxonomy to load: -d/--database, -c/--custom-taxa and -f/--custom-fmt"""
+    func = click.option('-f', '--custom-fmt',
+                        help="custom taxonomy format 'tsv', 'lineage', 'gtdb_taxonomy' and 'gtdb_metadata'",
+                        required=False,
+                        default='tsv',
+                        type=click.Choice(['tsv', 'lineage', 'gtdb_taxonomy', 'gtdb_metadata'], case_sensitive=False)
+                        )(func)
+    func = click.option('-c', '--custom-taxa',
+                        help='path of custom taxonomy file',
+                        required=False,
+                        default=None,
+                        type=str)(func)
+    func = click.option('-d', '--database',
+                        help='path of taxonomy_db/',
+                        required=False,
+                        default=None,
+                        type=str)(func)
+    return func
+
+def _loadTaxonomy(database, custom_taxa, custom_fmt):
+    """Load the taxonomy of `_taxonomyOptions`"""
+    custom_fmt = custom_fmt.lower()
+    if custom_fmt.startswith('gtdb'):
+        t.loadGTDBTaxonomy(custom_taxa, custom_fmt)
+    else:
+        # 'lineage' is the MGnify lineage format of `loadTaxonomy()`
+        if custom_fmt == 'lineage':
+            custom_fmt = 'mgnify_lineage'
+        t.loadTaxonomy( database, cus_taxonomy_file=custom_taxa, cus_taxonomy_format=custom_fmt)
+
 @cli.command()
 @click.argument('taxid', required=True, type=str)
-@click.option('-d', '--database',
-              help='path of taxonomy_db/',
-              required=False,
-              default=None,
-              type=str)
-@click.option('-c', '--custom-taxa',
-              help='path of custom taxonomy file',
-              required=False,
-              default=None,
-              type=str)
-@click.option('-f', '--custom-fmt',
-              help="custom taxonomy format 'tsv', 'lineage', 'gtdb_taxonomy' and 'gtdb_metadata'",
-              required=False,
-              default='tsv',
-              type=click.Choice(['tsv', 'lineage', 'gtdb_taxonomy', 'gtdb_metadata'], case_sensitive=False)
-              )
+@_taxonomyOptions
 @click.option('--debug',
               help='debug mode',
               is_flag=True,
@@ -39,10 +56,7 @@ def taxid(taxid, database, custom_taxa, custom_fmt, debug):
             datefmt='%Y-%m-%d %H:%M',
         )
 
-    if custom_fmt.startswith('gtdb'):
-        t.loadGTDBTaxonomy(cus_taxonomy_file=custom_taxa, cus_taxonomy_format=custom_fmt)
-    else:
-        t.loadTaxonomy( database, cus_taxonomy_file=custom_taxa, cus_taxonomy_format=custom_fmt)
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
 
     if taxid:
         print( "taxid2name( %s )                 => %s" % (taxid, t.taxid2name(taxid)) )
@@ -108,10 +122,7 @@ def name2tid(name, database, custom_taxa, custom_fmt, rank, partial, debug):
             datefmt='%Y-%m-%d %H:%M',
         )
     
-    if custom_fmt.startswith('gtdb'):
-        t.loadGTDBTaxonomy(cus_taxonomy_file=custom_taxa, cus_taxonomy_format=custom_fmt)
-    else:
-        t.loadTaxonomy( database, cus_taxonomy_file=custom_taxa, cus_taxonomy_format=custom_fmt)
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
  
     print(t.name2taxid(name, rank, partial))
 
@@ -162,12 +173,20 @@ def acc2taxid(accession, mapping, debug):
               help='update accession2taxid dead acc data',
               is_flag=True,
               default=False)
+@click.option('--bgzip',
+              help='keep accession2taxid data compressed in seekable BGZF format',
+              is_flag=True,
+              default=False)
+@click.option('--index',
+              help='index accession formats and build Bloom filters of accession2taxid data to route lookups',
+              is_flag=True,
+              default=False)
 @click.option('--debug',
               help='debug mode',
               is_flag=True,
               default=False)
 
-def update(database, accnucl, accwgs, accprot, accpdb, accdead, debug):
+def update(database, accnucl, accwgs, accprot, accpdb, accdead, bgzip, index, debug):
     if debug:
         logging.basicConfig(
             level=logging.DEBUG,
@@ -185,7 +204,544 @@ def update(database, accnucl, accwgs, accprot, accpdb, accdead, debug):
                            acc_wgs=accwgs, 
                            acc_prot=accprot, 
                            acc_pdb=accpdb, 
-                           acc_dead=accdead)
+                           acc_dead=accdead,
+                           acc_bgzip=bgzip,
+                           acc_index=index)
+
+@cli.command()
+@click.argument('sample_files', nargs=-1, type=str)
+@click.option('-m', '--manifest',
+              help='tab-delimited file of sample names and paths of EDGE taxonomy list files',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-d', '--database',
+              help='path of taxonomy_db/',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-o', '--output',
+              help='output OTU table in tsv format [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-b', '--biom',
+              help='also write the OTU table in BIOM format',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--biom-fmt',
+              help="BIOM format, 'json' (BIOM 1.0) or 'hdf5' (BIOM 2.1, requires h5py)",
+              required=False,
+              default='json',
+              type=click.Choice(['json', 'hdf5'], case_sensitive=False))
+@click.option('-r', '--relative',
+              help='report abundances relative to classified reads',
+              is_flag=True,
+              default=False)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def otu_table(sample_files, manifest, database, output, biom, biom_fmt, relative, debug):
+    """Build an OTU table from EDGE taxonomy list files of many samples."""
+    from . import otu
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    samples = [(os.path.basename(f).split('.')[0], f) for f in sample_files]
+    if manifest:
+        samples += otu.readManifest(manifest)
+
+    if not samples:
+        raise click.UsageError('No sample files or manifest provided.')
+
+    t.loadTaxonomy(database)
+    table = otu.buildOTUTable(samples)
+    otu.writeOTUTableTSV(table, output, relative)
+    if biom:
+        otu.writeOTUTableBIOM(table, biom, biom_fmt)
+
+
+@cli.command()
+@_taxonomyOptions
+@click.option('-o', '--output',
+              help='output taxonomy file in Krona taxonomy.tsv format [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-m', '--merged',
+              help='also write merged taxids to this file (e.g. taxonomy.merged.tsv)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def export_tsv(database, custom_taxa, custom_fmt, output, merged, debug):
+    """Export the taxonomy to a Krona-compatible taxonomy.tsv file."""
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    t.exportTaxonomyTSV(output, merged)
+
+
+@cli.command()
+@_taxonomyOptions
+@click.option('-o', '--output',
+              help='output file of taxids and lineages [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-s', '--sep',
+              help="lineage separator, '|' (rank|taxid|name) or ';' (rank__name)",
+              required=False,
+              default='|',
+              type=click.Choice(['|', ';']))
+@click.option('--full',
+              help='full lineages of all ranks instead of major ranks',
+              is_flag=True,
+              default=False)
+@click.option('--print-strain',
+              help='include strains in major rank lineages',
+              is_flag=True,
+              default=False)
+@click.option('--space2underscore',
+              help='replace spaces with underscores',
+              is_flag=True,
+              default=False)
+@click.option('-j', '--jobs',
+              help='number of processes',
+              required=False,
+              default=1,
+              type=int)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def dump_lineages(database, custom_taxa, custom_fmt, output, sep, full, print_strain, space2underscore, jobs, debug):
+    """Write lineages of all taxa in the taxonomy."""
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    t.dumpLineages(output, sep=sep, full_lineage=full, print_strain=print_strain, space2underscore=space2underscore, jobs=jobs)
+
+
+@cli.command()
+@_taxonomyOptions
+@click.option('-t', '--taxids',
+              help='file of taxids to keep (one per line)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-a', '--accessions',
+              help='file of accessions to keep (one per line)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-l', '--clades',
+              help='file of taxids of clades to keep with all descendants (one per line)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--acc-type',
+              help="type of accessions",
+              required=False,
+              default='nucl',
+              type=click.Choice(['nucl', 'prot', 'pdb'], case_sensitive=False))
+@click.option('-m', '--mapping',
+              help='accession2taxid mapping file of accessions',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-o', '--output',
+              help='output directory of the subset taxonomy',
+              required=True,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def subset(database, custom_taxa, custom_fmt, taxids, accessions, clades, acc_type, mapping, output, debug):
+    """Write a reduced taxonomy of taxa and their ancestors."""
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    ids = {}
+    for key, path in [('taxids', taxids), ('accessions', accessions), ('clades', clades)]:
+        ids[key] = []
+        if path:
+            with open(path) as f:
+                ids[key] = [line.strip() for line in f if line.strip()]
+
+    if not any(ids.values()):
+        raise click.UsageError('No taxids, accessions or clades provided.')
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    t.subsetTaxonomy(output, acc_type=acc_type, mapping_file=mapping, **ids)
+
+
+@cli.command()
+@click.argument('keys', nargs=-1, type=str)
+@click.option('-m', '--metadata',
+              help='GTDB metadata file (e.g. bac120_metadata_r207.tsv), can be used multiple times',
+              required=True,
+              multiple=True,
+              type=str)
+@click.option('-i', '--input',
+              help='file of NCBI taxids/taxa or GTDB taxa/genomes to translate (one per line)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--to',
+              help="translate to 'gtdb' lineages or 'ncbi' taxids",
+              required=False,
+              default='gtdb',
+              type=click.Choice(['gtdb', 'ncbi'], case_sensitive=False))
+@click.option('-r', '--rank',
+              help='translate to taxa at this rank (e.g. species)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-d', '--database',
+              help='path of NCBI taxonomy_db/ (required for NCBI taxids above species)',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def crossmap(keys, metadata, input, to, rank, database, debug):
+    """Translate between NCBI and GTDB taxonomy by GTDB genome metadata."""
+    from . import crossmap as cm
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    keys = list(keys)
+    if input:
+        with open(input) as f:
+            keys += [line.strip() for line in f if line.strip()]
+
+    if not keys:
+        raise click.UsageError('No taxids or taxa provided.')
+
+    if database:
+        t.loadTaxonomy(database)
+
+    index = cm.buildCrossMap(metadata)
+    if to == 'gtdb':
+        results = index.ncbi2gtdbBatch(keys, rank)
+    else:
+        results = index.gtdb2ncbiBatch(keys, rank)
+
+    for key, result in zip(keys, results):
+        print(f"{key}\t{result}")
+
+
+@cli.command()
+@click.argument('input', required=True, type=str)
+@_taxonomyOptions
+@click.option('-r', '--rank',
+              help='only report taxa at this rank (can be used multiple times) as a table of taxid, rank, name, cumulative and direct counts',
+              required=False,
+              multiple=True,
+              type=str)
+@click.option('-o', '--output',
+              help='output file [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def rollup(input, database, custom_taxa, custom_fmt, rank, output, debug):
+    """Roll up counts of taxids (a taxid and optional count per line) to a Kraken-style report."""
+    import sys
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    taxids, counts = [], []
+    with t._openFile(input) as f:
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if not fields[0] or fields[0].startswith('#'): continue
+            taxids.append(fields[0])
+            counts.append(int(fields[1]) if len(fields) > 1 else 1)
+
+    result = t.rollupCounts(taxids, counts, ranks=list(rank))
+    if not rank:
+        t.rollupReport(result, output)
+    else:
+        fh = open(output, 'w') if output else sys.stdout
+        for tid, cumulative, direct in zip(result['taxid'], result['cumulative'].tolist(), result['direct'].tolist()):
+            fh.write(f"{tid}\t{t.taxid2rank(tid)}\t{t.taxid2name(tid)}\t{cumulative}\t{direct}\n")
+        if output:
+            fh.close()
+
+
+@cli.command()
+@click.argument('input', required=False, default=None, type=str)
+@_taxonomyOptions
+@click.option('-i', '--input-fmt',
+              help='format of the classifier output [default: auto]',
+              required=False,
+              default='auto',
+              type=click.Choice(['auto', 'kraken2', 'kraken2-report', 'centrifuge', 'centrifuge-report'], case_sensitive=False))
+@click.option('-a', '--add',
+              help="columns to add: 'name', 'rank' and 'lineage' (can be used multiple times) [default: all]",
+              required=False,
+              multiple=True,
+              type=click.Choice(['name', 'rank', 'lineage'], case_sensitive=False))
+@click.option('-r', '--rank',
+              help='also add the names of the taxa at this rank (can be used multiple times)',
+              required=False,
+              multiple=True,
+              type=str)
+@click.option('-s', '--sep',
+              help='separator of lineages',
+              required=False,
+              default='|',
+              type=click.Choice(['|', ';']))
+@click.option('-o', '--output',
+              help='output file [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def annotate(input, database, custom_taxa, custom_fmt, input_fmt, add, rank, sep, output, debug):
+    """Add name, rank and lineage columns to Kraken2 or Centrifuge outputs [default: STDIN]."""
+    from . import annotate as ann
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    ann.annotateFile(input, output, input_fmt, columns=list(add) or ['name', 'rank', 'lineage'], ranks=list(rank), sep=sep)
+
+
+@cli.command()
+@_taxonomyOptions
+@click.option('-n', '--names',
+              help='names.dmp for synonyms [default: names.dmp in taxonomy_db/]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-a', '--accession2taxid',
+              help='accession2taxid file to include (can be used multiple times)',
+              required=False,
+              multiple=True,
+              type=str)
+@click.option('-o', '--output',
+              help='output SQLite database',
+              required=True,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def build_sqlite(database, custom_taxa, custom_fmt, names, accession2taxid, output, debug):
+    """Write the taxonomy to a SQLite database for `loadTaxonomySQLite()`."""
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    t.buildTaxonomySQLite(output, names, list(accession2taxid))
+
+
+@cli.command()
+@click.argument('files', nargs=-1, required=True, type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def index_acc2taxid(files, debug):
+    """Index accession formats and build Bloom filters of accession2taxid files to route acc2taxid lookups."""
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    for acc2taxid_file in files:
+        t.indexAcc2taxid(acc2taxid_file)
+
+
+@cli.command()
+@_taxonomyOptions
+@click.option('-t', '--taxid',
+              help='taxid of the root of the subtree',
+              required=False,
+              default='1',
+              type=str)
+@click.option('-F', '--format', 'tree_fmt',
+              help='output tree format',
+              required=False,
+              default='newick',
+              type=click.Choice(['newick', 'json'], case_sensitive=False))
+@click.option('-r', '--rank',
+              help='only keep taxa at this rank (multiple allowed)',
+              required=False,
+              multiple=True,
+              type=str)
+@click.option('--max-depth',
+              help='number of levels below the root to export',
+              required=False,
+              default=None,
+              type=int)
+@click.option('--collapse-no-rank',
+              help="remove 'no rank' taxa",
+              is_flag=True,
+              default=False)
+@click.option('--no-annotate',
+              help='do not add names and ranks',
+              is_flag=True,
+              default=False)
+@click.option('-o', '--output',
+              help='output tree file [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def export_subtree(database, custom_taxa, custom_fmt, taxid, tree_fmt, rank, max_depth, collapse_no_rank, no_annotate, output, debug):
+    """Export the subtree of a taxon as a Newick tree or nested JSON."""
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    t.export_subtree(taxid, output, tree_fmt.lower(), list(rank), max_depth, collapse_no_rank, not no_annotate)
+
+
+@cli.command()
+@click.argument('input', required=False, default=None, type=str)
+@_taxonomyOptions
+@click.option('-t', '--type',
+              help='type of the subject accessions',
+              required=False,
+              default='nucl',
+              type=click.Choice(['nucl', 'prot', 'pdb'], case_sensitive=False))
+@click.option('-m', '--mapping-file',
+              help='accession2taxid file of the subjects [default: accession2taxid files in taxonomy_db/]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('-b', '--min-bitscore',
+              help='minimum bitscore of hits',
+              required=False,
+              default=0.0,
+              type=float)
+@click.option('-p', '--min-identity',
+              help='minimum percent identity of hits',
+              required=False,
+              default=0.0,
+              type=float)
+@click.option('-e', '--max-evalue',
+              help='maximum e-value of hits',
+              required=False,
+              default=None,
+              type=float)
+@click.option('--top',
+              help='only use hits within this percent of the best bitscore of a query',
+              required=False,
+              default=None,
+              type=float)
+@click.option('--majority',
+              help='report the deepest taxon of at least this fraction of hits, in (0.5, 1]',
+              required=False,
+              default=1.0,
+              type=float)
+@click.option('-l', '--lineage',
+              help='add lineages',
+              is_flag=True,
+              default=False)
+@click.option('-j', '--jobs',
+              help='number of processes',
+              required=False,
+              default=1,
+              type=int)
+@click.option('-o', '--output',
+              help='output file [default: STDOUT]',
+              required=False,
+              default=None,
+              type=str)
+@click.option('--debug',
+              help='debug mode',
+              is_flag=True,
+              default=False)
+def lca_hits(input, database, custom_taxa, custom_fmt, type, mapping_file, min_bitscore, min_identity, max_evalue, top, majority, lineage, jobs, output, debug):
+    """Classify queries of BLAST/DIAMOND tabular hits (-outfmt 6) by LCA [default: STDIN]."""
+    from . import lca
+
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s [%(levelname)s] %(module)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M',
+        )
+
+    _loadTaxonomy(database, custom_taxa, custom_fmt)
+
+    lca.lcaHits(input, output, type.lower(), mapping_file, min_bitscore, min_identity, max_evalue, top, majority, lineage, jobs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+# pandas accessors: `series.detaxa` and `df.detaxa`
+#
+# Usage:
+#   import detaxa.accessor
+#   df['genus'] = df.taxid.detaxa.nameOnRank('genus')
+#   df = df.detaxa.annotate('taxid', ranks=['genus', 'species'], lineage=True)
+
+import logging
+from typing import Optional
+
+from . import taxonomy as t
+
+try:
+    import pandas as pd
+except ImportError:
+    logger = logging.getLogger()
+    logger.fatal( "pandas is required for the detaxa accessor." )
+    t._die( "[ERROR] pandas is required for the detaxa accessor. Install it with `pip install pandas`." )
+
+def _lookup(codes, uniques, func) -> pd.Categorical:
+    """
+    Call `func` once per distinct taxid and expand the results to a Categorical by the codes of the rows.
+    Missing taxids and None results are NaN.
+    """
+    if not len(uniques):
+        return pd.Categorical.from_codes(codes, categories=[])
+
+    results = [func(str(tid)) for tid in uniques]
+    res_codes, categories = pd.factorize(pd.Index(results, dtype=object))
+    res_codes = res_codes.astype('int64')
+
+    # -1 (missing) stays -1
+    row_codes = res_codes.take(codes, mode='clip')
+    row_codes[codes < 0] = -1
+    return pd.Categorical.from_codes(row_codes, categories=categories.astype(str))
+
+@pd.api.extensions.register_series_accessor("detaxa")
+class TaxonomySeriesAccessor:
+    """
+    Taxonomy lookups of a Series of taxids. Each distinct taxid is looked up once and results are
+    Categorical, sharing one table of distinct values.
+    """
+    def __init__(self, series: pd.Series):
+        self._series = series
+        self._factorized = None
+
+    def _codes(self):
+        if self._factorized is None:
+            self._factorized = pd.factorize(self._series)
+        return self._factorized
+
+    def apply(self, func, **kwargs) -> pd.Series:
+        """
+        Apply a taxonomy function (e.g. `taxonomy.taxid2lineage`) to each distinct taxid.
+
+        Returns:
+            pd.Series: A categorical Series with the same index.
+        """
+        codes, uniques = self._codes()
+        return pd.Series(_lookup(codes, uniques, lambda tid: func(tid, **kwargs)), index=self._series.index, name=self._series.name)
+
+    def name(self) -> pd.Series:
+        return self.apply(t.taxid2name)
+
+    def rank(self, guess_strain: bool=True) -> pd.Series:
+        return self.apply(t.taxid2rank, guess_strain=guess_strain)
+
+    def parent(self, norank: bool=False) -> pd.Series:
+        return self.apply(t.taxid2parent, norank=norank)
+
+    def nameOnRank(self, rank: str) -> pd.Series:
+        return self.apply(t.taxid2nameOnRank, target_rank=rank)
+
+    def taxidOnRank(self, rank: str) -> pd.Series:
+        return self.apply(lambda tid: str(t.taxid2taxidOnRank(tid, rank)))
+
+    def lineage(self, all_major_rank=True, print_strain=False, space2underscore=False, sep="|") -> pd.Series:
+        return self.apply(t.taxid2lineage, all_major_rank=all_major_rank, print_strain=print_strain,
+                          space2underscore=space2underscore, sep=sep)
+
+    def fullLineage(self, sep: str='|', use_rank_abbr=False, space2underscore=True) -> pd.Series:
+        return self.apply(t.taxid2fullLineage, sep=sep, use_rank_abbr=use_rank_abbr, space2underscore=space2underscore)
+
+@pd.api.extensions.register_dataframe_accessor("detaxa")
+class TaxonomyDataFrameAccessor:
+    """Taxonomy annotation of a DataFrame with a column of taxids."""
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+
+    def annotate(self,
+                 column: str='taxid',
+                 name: bool=True,
+                 rank: bool=True,
+                 ranks: Optional[list]=None,
+                 lineage: bool=False,
+                 sep: str='|') -> pd.DataFrame:
+        """
+        Add taxonomy columns of the taxids in `column`: 'name', 'rank', a column of names per rank in
+        `ranks` and 'lineage'. The taxids are factorized once for all columns.
+
+        Args:
+            column (str, optional): Column of taxids. Defaults to 'taxid'.
+            name (bool, optional): Add names. Defaults to True.
+            rank (bool, optional): Add ranks. Defaults to True.
+            ranks (list, optional): Add names at these ranks (e.g. ['genus', 'species']). Defaults to None.
+            lineage (bool, optional): Add lineages of `taxonomy.taxid2lineage()`. Defaults to False.
+            sep (str, optional): Separator of lineages. Defaults to '|'.
+
+        Returns:
+            pd.DataFrame: A copy of the DataFrame with categorical taxonomy columns.
+        """
+        accessor = self._df[column].detaxa
+        df = self._df.copy(deep=False)
+        if name:
+            df['name'] = accessor.name()
+        if rank:
+            df['rank'] = accessor.rank()
+        for target_rank in (ranks or []):
+            df[target_rank] = accessor.nameOnRank(target_rank)
+        if lineage:
+            df['lineage'] = accessor.lineage(sep=sep)
+        return df
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# asyncio counterparts of lookups doing blocking I/O
+#
+# Usage:
+#   from detaxa import aio
+#   await aio.aloadTaxonomy()
+#   tid = await aio.aacc2taxid('NC_000913.3')
+#   tids = await aio.aacc2taxid_many(['NC_000913.3', 'NC_002695.2'])
+
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from . import taxonomy as t
+
+# the executor running blocking lookups, and the number of its threads
+_executor = None
+_max_workers = 8
+
+# in-flight lookups of each event loop: {loop: {(kind, key): future}}
+_inflight = weakref.WeakKeyDictionary()
+
+def setMaxWorkers(max_workers: int) -> None:
+    """
+    Set the number of threads running blocking lookups. Takes effect before the first lookup.
+    """
+    global _max_workers
+    _max_workers = max_workers
+
+def _getExecutor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with t._lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='detaxa')
+    return _executor
+
+async def _coalesce(kind: str, key, func, *args, **kwargs):
+    """Run `func` on the executor; concurrent requests of the same key share one lookup"""
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+
+    if not (kind, key) in inflight:
+        future = loop.run_in_executor(_getExecutor(), functools.partial(func, *args, **kwargs))
+        inflight[(kind, key)] = future
+        future.add_done_callback(lambda f: inflight.pop((kind, key), None))
+
+    # a cancelled request does not cancel the lookup shared with others
+    return await asyncio.shield(inflight[(kind, key)])
+
+async def aloadTaxonomy(*args, **kwargs) -> None:
+    """`taxonomy.loadTaxonomy()` on the executor. Call it before using lookups of taxids in event loops."""
+    return await _coalesce('loadTaxonomy', (args, tuple(sorted(kwargs.items()))), t.loadTaxonomy, *args, **kwargs)
+
+async def aacc2taxid(acc: str, type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> str:
+    """
+    Async `taxonomy.acc2taxid()`. Cached accessions (`taxonomy.accTid`) return without waiting.
+
+    Args:
+        acc (str): The accession number to look up.
+        type (str, optional): Type of the acession number, either nucl, prot, or pdb. Default is 'nucl'.
+        mapping_file (str, optional): An accession2taxid file. Defaults to None.
+
+    Returns:
+        str: The taxonomy ID for the given accession.
+    """
+    key = acc.split('.')[0]
+    if key in t.accTid:
+        return t.accTid[key]
+    return await _coalesce('acc2taxid', (key, type, mapping_file), t.acc2taxid, acc, type, mapping_file)
+
+async def aacc2taxid_many(accs: list, type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> list:
+    """
+    Look up many accessions concurrently; each distinct accession is looked up once.
+
+    Returns:
+        list: Taxonomy IDs of the accessions.
+    """
+    uniq = list(dict.fromkeys(acc.split('.')[0] for acc in accs))
+    tids = await asyncio.gather(*[aacc2taxid(acc, type, mapping_file) for acc in uniq])
+    results = dict(zip(uniq, tids))
+    return [results[acc.split('.')[0]] for acc in accs]
+
+async def aname2taxid(name: str, **kwargs) -> list:
+    """
+    Async `taxonomy.name2taxid()`. The name table is loaded on the executor; cached names
+    (`taxonomy.nameTid`) return without waiting.
+
+    Args:
+        name (str): Taxonomic scientific name.
+        **kwargs: Options of `taxonomy.name2taxid()` (rank, superkingdom, fuzzy...).
+
+    Returns:
+        list: The list of matched taxonomic ID.
+    """
+    if t.df_names is not None and name in t.nameTid and len(t._releases) < 2:
+        return t.name2taxid(name, **kwargs)
+    return await _coalesce('name2taxid', (name, tuple(sorted(kwargs.items()))), t.name2taxid, name, **kwargs)
+
+async def aname2taxid_many(names: list, **kwargs) -> list:
+    """
+    Look up many names concurrently; each distinct name is looked up once.
+
+    Returns:
+        list: Lists of matched taxonomic IDs of the names.
+    """
+    uniq = list(dict.fromkeys(names))
+    tids = await asyncio.gather(*[aname2taxid(name, **kwargs) for name in uniq])
+    results = dict(zip(uniq, tids))
+    return [results[name] for name in names]
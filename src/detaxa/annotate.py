@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# Streaming taxonomy annotation of classifier outputs (Kraken2 and Centrifuge)
+
+import re
+import sys
+import logging
+from typing import Optional
+
+from . import taxonomy as t
+
+logger = logging.getLogger()
+
+# column of taxids in each format (negative: from the end of the line)
+taxid_columns = {
+    "kraken2"           : 2,   # C/U, read ID, taxid, length, LCA mapping
+    "kraken2-report"    : -2,  # percentage, clade reads, direct reads, [minimizers,] rank code, taxid, name
+    "centrifuge"        : 2,   # readID, seqID, taxID, score...
+    "centrifuge-report" : 1,   # name, taxID, taxRank, genomeSize, numReads...
+}
+
+# a taxid of `kraken2 --use-names`, e.g. 'Escherichia coli (taxid 562)'
+_re_kraken_name = re.compile(r"\(taxid (\d+)\)\s*$")
+
+def detectFormat(line: str) -> str:
+    """
+    Guess the format of a classifier output from its first line.
+
+    Returns:
+        str: 'kraken2', 'kraken2-report', 'centrifuge', 'centrifuge-report' or "unknown".
+    """
+    fields = line.rstrip('\r\n').split('\t')
+    if fields[0] == 'readID':
+        return "centrifuge"
+    if fields[:2] == ['name', 'taxID']:
+        return "centrifuge-report"
+    if fields[0] in ('C', 'U') and len(fields) >= 5:
+        return "kraken2"
+    if len(fields) >= 6:
+        try:
+            float(fields[0])
+            return "kraken2-report"
+        except ValueError:
+            pass
+    return "unknown"
+
+def _keys(lines: list, column: int) -> list:
+    """The field of taxids of each line"""
+    if column >= 0:
+        return [line.split('\t', column+1)[column] for line in lines]
+    else:
+        return [line.rsplit('\t', -column)[1] for line in lines]
+
+def annotateFile(input_file: Optional[str] = None,
+                 output_file: Optional[str] = None,
+                 fmt: str = 'auto',
+                 columns: list = ['name', 'rank', 'lineage'],
+                 ranks: list = [],
+                 sep: str = '|',
+                 chunk_size: int = 4*1024*1024) -> int:
+    """
+    Append taxonomy columns to each line of a Kraken2 or Centrifuge output (read-level or report). The input is
+    streamed in chunks; the distinct taxids of a chunk are resolved together and each taxid is resolved only once,
+    so memory depends on the size of a chunk and the taxonomy, not on the input. The taxonomy has to be loaded
+    beforehand.
+
+    Args:
+        input_file (str, optional): Path of a plain or compressed classifier output. Defaults to None (STDIN).
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        fmt (str, optional): A format of `taxid_columns`, or 'auto' to detect it from the first line. Defaults to 'auto'.
+        columns (list, optional): Columns to add: 'name', 'rank' and 'lineage'. Defaults to all.
+        ranks (list, optional): Also add the names of the taxa at these ranks (e.g. ['genus', 'species']). Defaults to [].
+        sep (str, optional): Separator of lineages. Defaults to '|'.
+        chunk_size (int, optional): Size of a chunk in bytes. Defaults to 4MB.
+
+    Returns:
+        int: Number of annotated lines.
+    """
+    fh = t._openFile(input_file) if input_file else sys.stdin
+    out = open(output_file, 'w') if output_file else sys.stdout
+
+    lines = fh.readlines(chunk_size)
+    if fmt == 'auto' and len(lines):
+        fmt = detectFormat(lines[0])
+        logger.info( f"Input format: {fmt}" )
+    if not fmt in taxid_columns:
+        logger.fatal( f"Unknown classifier output format: {fmt}." )
+        t._die( f"[ERROR] Unknown classifier output format: {fmt}. Use one of {', '.join(taxid_columns)}." )
+    column = taxid_columns[fmt]
+
+    # header line of Centrifuge outputs
+    if len(lines) and fmt.startswith('centrifuge'):
+        header = lines.pop(0).rstrip('\r\n').split('\t')
+        out.write('\t'.join(header + list(columns) + list(ranks)) + '\n')
+
+    annotations = {}
+    total = 0
+    while len(lines):
+        lines = [line.rstrip('\r\n') for line in lines]
+        keys = _keys(lines, column)
+
+        for key in set(keys).difference(annotations):
+            tid = key
+            if not key.isdigit():
+                match = _re_kraken_name.search(key)
+                if match: tid = match.group(1)
+
+            fields = []
+            for col in columns:
+                if col == 'name':
+                    fields.append(t.taxid2name(tid))
+                elif col == 'rank':
+                    fields.append(t.taxid2rank(tid))
+                elif col == 'lineage':
+                    fields.append(t.taxid2lineage(tid, sep=sep))
+            for rank in ranks:
+                fields.append(t.taxid2nameOnRank(tid, rank) or '')
+            annotations[key] = '\t' + '\t'.join(fields) + '\n'
+
+        out.write(''.join([line + annotations[key] for line, key in zip(lines, keys)]))
+        total += len(lines)
+        lines = fh.readlines(chunk_size)
+
+    if input_file:
+        fh.close()
+    if output_file:
+        out.close()
+
+    logger.info( f"Done annotating {total} lines." )
+    return total
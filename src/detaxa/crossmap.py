@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+# NCBI <-> GTDB cross-mapping of genomes from GTDB metadata files
+
+import logging
+from array import array
+from collections import Counter
+from typing import Optional
+
+from . import taxonomy as t
+
+logger = logging.getLogger()
+
+# GTDB rank abbreviations in lineages (e.g. 'd__Bacteria;p__Proteobacteria;...')
+gtdb_rank_abbr = {
+    "superkingdom" : "d",
+    "domain"       : "d",
+    "phylum"       : "p",
+    "class"        : "c",
+    "order"        : "o",
+    "family"       : "f",
+    "genus"        : "g",
+    "species"      : "s",
+}
+
+def _genomeKey(acc: str) -> str:
+    """Accession without the GTDB prefix (RS_/GB_) and version"""
+    if acc[:3] in ('RS_', 'GB_'): acc = acc[3:]
+    return acc.split('.')[0]
+
+def _truncateLineage(lineage: str, rank: Optional[str]) -> str:
+    """Lineage up to `rank`, e.g. 'd__Bacteria;p__Proteobacteria' for 'phylum'"""
+    if not rank: return lineage
+    prefix = gtdb_rank_abbr.get(rank, rank) + '__'
+    taxa = lineage.split(';')
+    for i, taxon in enumerate(taxa):
+        if taxon.startswith(prefix):
+            return ';'.join(taxa[:i+1])
+    return ""
+
+def _batch(func, keys):
+    """Apply `func` once per distinct key. Returns a list, or a NumPy array for a NumPy array input."""
+    if type(keys).__module__ == 'numpy':
+        import numpy as np
+        uniq, inverse = np.unique(keys.astype(str), return_inverse=True)
+        return np.array([func(key) for key in uniq], dtype=object)[inverse]
+
+    cache = {}
+    results = []
+    for key in keys:
+        key = str(key)
+        if not key in cache:
+            cache[key] = func(key)
+        results.append(cache[key])
+    return results
+
+class CrossMap:
+    """
+    An NCBI <-> GTDB mapping index of the genomes in GTDB metadata files. Genomes are grouped by their
+    distinct GTDB and NCBI lineages; taxa of lineages (e.g. 'g__Escherichia'), NCBI taxids and NCBI species
+    taxids point to the genomes. Translations of taxa are majority votes of their genomes.
+    """
+    def __init__(self):
+        self.accessions = []
+        self.ncbi_taxids = []
+        self.ncbi_species_taxids = []
+        self.gtdb_lineages = t._CategoricalArray()
+        self.ncbi_lineages = t._CategoricalArray()
+        self.genomes = {}
+        # genomes of NCBI taxids and NCBI species taxids
+        self.ncbi_taxid_genomes = {}
+        # genomes of each distinct lineage, and distinct lineages of each taxon
+        self.gtdb_lineage_genomes = []
+        self.ncbi_lineage_genomes = []
+        self.gtdb_taxon_lineages = {}
+        self.ncbi_taxon_lineages = {}
+
+    def _addLineage(self, lineages, lineage_genomes: list, taxon_lineages: dict, lineage: str, idx: int):
+        code = len(lineages.values)
+        lineages.append(lineage)
+        if lineages.codes[-1] == code:
+            # a new lineage
+            lineage_genomes.append(array('I'))
+            for taxon in lineage.split(';'):
+                if taxon in taxon_lineages:
+                    taxon_lineages[taxon].append(code)
+                else:
+                    taxon_lineages[taxon] = [code]
+        lineage_genomes[lineages.codes[-1]].append(idx)
+
+    def addGenome(self, acc: str, gtdb_lineage: str, ncbi_taxid: str, ncbi_species_taxid: str, ncbi_lineage: str):
+        idx = len(self.accessions)
+        self.accessions.append(acc)
+        self.ncbi_taxids.append(ncbi_taxid)
+        self.ncbi_species_taxids.append(ncbi_species_taxid)
+        self.genomes[_genomeKey(acc)] = idx
+
+        for tid in set([ncbi_taxid, ncbi_species_taxid]):
+            if not tid or tid == 'none': continue
+            if tid in self.ncbi_taxid_genomes:
+                self.ncbi_taxid_genomes[tid].append(idx)
+            else:
+                self.ncbi_taxid_genomes[tid] = array('I', [idx])
+
+        self._addLineage(self.gtdb_lineages, self.gtdb_lineage_genomes, self.gtdb_taxon_lineages, gtdb_lineage, idx)
+        self._addLineage(self.ncbi_lineages, self.ncbi_lineage_genomes, self.ncbi_taxon_lineages, ncbi_lineage, idx)
+
+    def genome(self, acc: str) -> dict:
+        """
+        Get the NCBI and GTDB taxonomy of a genome.
+
+        Args:
+            acc (str): Accession of the genome, e.g. 'GCF_000566285.1' or 'RS_GCF_000566285.1'.
+
+        Returns:
+            dict: 'accession', 'gtdb_taxonomy', 'ncbi_taxid', 'ncbi_species_taxid' and 'ncbi_taxonomy'
+                of the genome. Empty if not found.
+        """
+        idx = self.genomes.get(_genomeKey(acc))
+        if idx is None: return {}
+        return {
+            'accession': self.accessions[idx],
+            'gtdb_taxonomy': self.gtdb_lineages[idx],
+            'ncbi_taxid': self.ncbi_taxids[idx],
+            'ncbi_species_taxid': self.ncbi_species_taxids[idx],
+            'ncbi_taxonomy': self.ncbi_lineages[idx],
+        }
+
+    def _ncbiGenomes(self, key: str):
+        """Genomes of an NCBI taxid or an NCBI taxon (e.g. 'g__Escherichia')"""
+        if key in self.ncbi_taxid_genomes:
+            return self.ncbi_taxid_genomes[key]
+
+        # a taxid above species: find its taxon name in the NCBI taxonomy
+        if not key in self.ncbi_taxon_lineages and key.isdigit() and len(t.taxParents):
+            rank = t.taxid2rank(key)
+            if rank in gtdb_rank_abbr:
+                key = f"{gtdb_rank_abbr[rank]}__{t.taxid2name(key)}"
+
+        genomes = []
+        for code in self.ncbi_taxon_lineages.get(key, []):
+            genomes.extend(self.ncbi_lineage_genomes[code])
+        return genomes
+
+    def _gtdbGenomes(self, key: str):
+        """Genomes of a GTDB taxon (e.g. 's__Escherichia coli'), lineage or accession"""
+        if key in self.gtdb_taxon_lineages:
+            codes = self.gtdb_taxon_lineages[key]
+        elif key in self.gtdb_lineages.index:
+            codes = [self.gtdb_lineages.index[key]]
+        elif _genomeKey(key) in self.genomes:
+            return [self.genomes[_genomeKey(key)]]
+        else:
+            codes = []
+
+        genomes = []
+        for code in codes:
+            genomes.extend(self.gtdb_lineage_genomes[code])
+        return genomes
+
+    def ncbi2gtdbVotes(self, key: str, rank: Optional[str] = None) -> Counter:
+        """
+        Count GTDB lineages of the genomes of an NCBI taxid or taxon.
+
+        Args:
+            key (str): An NCBI taxid or taxon (e.g. 'g__Escherichia'). Taxids above species require the NCBI
+                taxonomy loaded by `taxonomy.loadTaxonomy()`.
+            rank (str, optional): Truncate the GTDB lineages at this rank (e.g. 'species'). Defaults to None.
+
+        Returns:
+            Counter: Numbers of genomes of the GTDB lineages.
+        """
+        votes = Counter()
+        for idx in self._ncbiGenomes(str(key)):
+            votes[self.gtdb_lineages.codes[idx]] += 1
+
+        lineages = Counter()
+        for code, count in votes.most_common():
+            lineage = _truncateLineage(self.gtdb_lineages.values[code], rank)
+            if lineage: lineages[lineage] += count
+        return lineages
+
+    def gtdb2ncbiVotes(self, key: str, rank: Optional[str] = None) -> Counter:
+        """
+        Count NCBI taxids of the genomes of a GTDB taxon, lineage or genome.
+
+        Args:
+            key (str): A GTDB taxon (e.g. 's__Escherichia coli'), lineage or accession.
+            rank (str, optional): NCBI taxids at this rank. Defaults to None (taxids of the genomes). Ranks
+                other than 'species' require the NCBI taxonomy loaded by `taxonomy.loadTaxonomy()`.
+
+        Returns:
+            Counter: Numbers of genomes of the NCBI taxids.
+        """
+        votes = Counter()
+        for idx in self._gtdbGenomes(str(key)):
+            if rank == 'species':
+                votes[self.ncbi_species_taxids[idx]] += 1
+            else:
+                votes[self.ncbi_taxids[idx]] += 1
+
+        if rank and rank != 'species':
+            taxids = Counter()
+            for tid, count in votes.most_common():
+                taxids[str(t.taxid2taxidOnRank(tid, rank))] += count
+            votes = taxids
+        return votes
+
+    def ncbi2gtdb(self, key: str, rank: Optional[str] = None) -> str:
+        """
+        Translate an NCBI taxid or taxon to the GTDB lineage of most of its genomes.
+
+        Args:
+            key (str): An NCBI taxid or taxon (e.g. 'g__Escherichia').
+            rank (str, optional): Truncate the GTDB lineage at this rank (e.g. 'species'). Defaults to None.
+
+        Returns:
+            str: The GTDB lineage, or "unknown".
+        """
+        votes = self.ncbi2gtdbVotes(key, rank)
+        return votes.most_common(1)[0][0] if len(votes) else "unknown"
+
+    def gtdb2ncbi(self, key: str, rank: Optional[str] = None) -> str:
+        """
+        Translate a GTDB taxon, lineage or genome to the NCBI taxid of most of its genomes.
+
+        Args:
+            key (str): A GTDB taxon (e.g. 's__Escherichia coli'), lineage or accession.
+            rank (str, optional): NCBI taxid at this rank (e.g. 'species'). Defaults to None.
+
+        Returns:
+            str: The NCBI taxid, or "unknown".
+        """
+        votes = self.gtdb2ncbiVotes(key, rank)
+        return votes.most_common(1)[0][0] if len(votes) else "unknown"
+
+    def ncbi2gtdbBatch(self, keys, rank: Optional[str] = None):
+        """
+        `ncbi2gtdb()` of many NCBI taxids or taxa; each distinct key is translated once.
+
+        Returns:
+            A list of GTDB lineages, or a NumPy array for a NumPy array input.
+        """
+        return _batch(lambda key: self.ncbi2gtdb(key, rank), keys)
+
+    def gtdb2ncbiBatch(self, keys, rank: Optional[str] = None):
+        """
+        `gtdb2ncbi()` of many GTDB taxa, lineages or genomes; each distinct key is translated once.
+
+        Returns:
+            A list of NCBI taxids, or a NumPy array for a NumPy array input.
+        """
+        return _batch(lambda key: self.gtdb2ncbi(key, rank), keys)
+
+def buildCrossMap(gtdb_metadata_files: list) -> CrossMap:
+    """
+    Build an NCBI <-> GTDB mapping index from GTDB metadata files (e.g. bac120_metadata_r207.tsv and
+    ar53_metadata_r207.tsv).
+
+    Args:
+        gtdb_metadata_files (list): Paths of GTDB metadata files.
+
+    Returns:
+        CrossMap: The mapping index.
+    """
+    crossmap = CrossMap()
+    columns = ['accession', 'gtdb_taxonomy', 'ncbi_taxid', 'ncbi_species_taxid', 'ncbi_taxonomy']
+
+    for gtdb_metadata_file in gtdb_metadata_files:
+        logger.info( f"Open GTDB metadata file: {gtdb_metadata_file}" )
+        for acc, gtdb_lineage, ncbi_taxid, ncbi_species_taxid, ncbi_lineage in t.readGTDBMetadata(gtdb_metadata_file, columns):
+            crossmap.addGenome(acc, gtdb_lineage, ncbi_taxid, ncbi_species_taxid, ncbi_lineage)
+
+    logger.info( f"Done indexing {len(crossmap.accessions)} genomes." )
+    return crossmap
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+# Streaming LCA of BLAST/DIAMOND tabular hits (-outfmt 6)
+#
+# Usage:
+#   from detaxa import lca
+#   lca.lcaHits('sample.m8', 'sample.lca.tsv', type='prot', top_percent=10, majority=0.8, jobs=4)
+
+import os
+import sys
+import math
+import logging
+from collections import deque
+from typing import Optional
+
+from . import taxonomy as t
+
+logger = logging.getLogger()
+
+# columns of -outfmt 6: qseqid sseqid pident length mismatch gapopen qstart qend sstart send evalue bitscore
+m8_columns = {
+    "query"    : 0,
+    "subject"  : 1,
+    "identity" : 2,
+    "evalue"   : 10,
+    "bitscore" : 11,
+}
+
+# ancestors of taxids in a process: {tid: (tid, parent, ..., root)}
+_paths = {}
+
+def subjectAccession(sseqid: str) -> str:
+    """
+    Get the accession of a subject ID, e.g. 'NC_000913.3', 'gi|556503834|ref|NC_000913.3|' or
+    'sp|P0A7B8|CLPX_ECOLI' ('P0A7B8').
+    """
+    if not '|' in sseqid:
+        return sseqid
+    fields = sseqid.split('|')
+    if fields[0] == 'gi' and len(fields) > 3:
+        return fields[3]
+    return fields[1] or fields[0]
+
+def _groups(fh, chunk_size: int):
+    """
+    Read m8 lines in chunks and yield the lists of (query, [(accession, identity, evalue, bitscore),...])
+    of the queries in each chunk. The hits of a query are consecutive and never split across chunks.
+    """
+    pending = None
+    while True:
+        lines = fh.readlines(chunk_size)
+        groups = []
+        for line in lines:
+            if not line.strip() or line.startswith('#'): continue
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) < 12:
+                logger.fatal( f"Incorrect BLAST tabular format: {line.rstrip()}" )
+                t._die( f"[ERROR] 12 columns of BLAST/DIAMOND -outfmt 6 are required: {line.rstrip()}" )
+
+            hit = (subjectAccession(fields[m8_columns['subject']]),
+                   float(fields[m8_columns['identity']]),
+                   float(fields[m8_columns['evalue']]),
+                   float(fields[m8_columns['bitscore']]))
+            query = fields[m8_columns['query']]
+            if pending and pending[0] == query:
+                pending[1].append(hit)
+            else:
+                if pending: groups.append(pending)
+                pending = (query, [hit])
+
+        if not lines:
+            if pending: groups.append(pending)
+            if groups: yield groups
+            return
+        if groups: yield groups
+
+def filterHits(hits: list,
+               min_bitscore: float = 0.0,
+               min_identity: float = 0.0,
+               max_evalue: Optional[float] = None,
+               top_percent: Optional[float] = None) -> list:
+    """
+    Filter the (accession, identity, evalue, bitscore) hits of a query.
+
+    Args:
+        hits (list): Hits of a query.
+        min_bitscore (float, optional): Minimum bitscore. Defaults to 0.
+        min_identity (float, optional): Minimum percent identity. Defaults to 0.
+        max_evalue (float, optional): Maximum e-value. Defaults to None.
+        top_percent (float, optional): Only keep hits within this percent of the best bitscore
+            (e.g. 10). Defaults to None.
+
+    Returns:
+        list: The remaining hits.
+    """
+    hits = [hit for hit in hits if hit[3] >= min_bitscore and hit[1] >= min_identity
+            and (max_evalue is None or hit[2] <= max_evalue)]
+    if top_percent is not None and len(hits):
+        cutoff = max(hit[3] for hit in hits) * (1 - top_percent/100)
+        hits = [hit for hit in hits if hit[3] >= cutoff]
+    return hits
+
+def _ancestors(tid: str) -> tuple:
+    """The taxid and its ancestors up to the root"""
+    if not tid in _paths:
+        path = []
+        node = tid
+        while not node in path:
+            path.append(node)
+            if node == '1': break
+            parent = t.taxParents.get(node)
+            if parent is None: break
+            node = parent
+        _paths[tid] = tuple(path)
+    return _paths[tid]
+
+def lcaTaxid(taxids: list, majority: float = 1.0) -> str:
+    """
+    Get the deepest taxon of at least `majority` of the taxids (the LCA of all taxids by default)
+    in the full tree.
+
+    Args:
+        taxids (list): Taxonomy IDs, one per hit.
+        majority (float, optional): Fraction of the taxids in (0.5, 1]. Defaults to 1.0.
+
+    Returns:
+        str: Taxonomy ID of the taxon, or "unknown" without known taxids.
+    """
+    paths = []
+    for tid in taxids:
+        tid = t._checkTaxonomy(tid)
+        if tid != "unknown":
+            paths.append(_ancestors(tid))
+    if not len(paths):
+        return "unknown"
+
+    need = math.ceil(majority * len(paths) - 1e-9)
+    counts = {}
+    for path in paths:
+        for node in path:
+            counts[node] = counts.get(node, 0) + 1
+
+    # taxa of more than half of the taxids are on one path
+    best, best_depth = "unknown", -1
+    for path in paths:
+        for i, node in enumerate(path):
+            if counts[node] >= need:
+                if len(path) - i > best_depth:
+                    best, best_depth = node, len(path) - i
+                break
+    return best
+
+def _lcaChunk(args: tuple) -> tuple:
+    """Resolve the subject accessions and format the LCA of the queries of a chunk (in a worker process)"""
+    groups, type, mapping_file, majority, lineage = args
+
+    # each subject counts once per query
+    subjects = [list(dict.fromkeys(hit[0] for hit in hits)) for query, hits in groups]
+    accs = list(set(acc for accs in subjects for acc in accs))
+    tids = dict(zip(accs, t.acc2taxid_many(accs, type, mapping_file)))
+
+    lines = []
+    for query, accs in zip((query for query, hits in groups), subjects):
+        taxids = [tids[acc] for acc in accs if tids[acc]]
+        tid = lcaTaxid(taxids, majority)
+        if tid == "unknown":
+            fields = [query, tid, '', 'unclassified', str(len(taxids))]
+            if lineage: fields.append('')
+        else:
+            fields = [query, tid, t.taxid2rank(tid), t.taxid2name(tid), str(len(taxids))]
+            if lineage: fields.append(t.taxid2lineage(tid))
+        lines.append('\t'.join(fields) + '\n')
+    return ''.join(lines), len(lines)
+
+def lcaHits(input_file: Optional[str] = None,
+            output_file: Optional[str] = None,
+            type: str = 'nucl',
+            mapping_file: Optional[str] = None,
+            min_bitscore: float = 0.0,
+            min_identity: float = 0.0,
+            max_evalue: Optional[float] = None,
+            top_percent: Optional[float] = None,
+            majority: float = 1.0,
+            lineage: bool = False,
+            jobs: int = 1,
+            chunk_size: int = 4*1024*1024) -> int:
+    """
+    Classify the queries of BLAST/DIAMOND tabular hits (-outfmt 6, hits of a query in consecutive lines)
+    by the LCA of the taxa of their filtered hits. The input is streamed in chunks; the subject accessions of
+    a chunk are resolved together by `taxonomy.acc2taxid_many()` and the LCAs are computed by `jobs`
+    processes, with at most two chunks per process read ahead. The output is in the order of the input: 
+    query, taxid, rank, name, number of hits with a known taxid (and lineage). Queries without hits of known
+    taxa are reported as "unknown" and 'unclassified'. The taxonomy has to be loaded beforehand.
+
+    Args:
+        input_file (str, optional): Path of a plain or compressed m8 file. Defaults to None (STDIN).
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        type (str, optional): Type of the subject accessions, either nucl, prot, or pdb. Default is 'nucl'.
+        mapping_file (str, optional): An accession2taxid file of the subjects. Defaults to None.
+        min_bitscore (float, optional): Minimum bitscore of hits. Defaults to 0.
+        min_identity (float, optional): Minimum percent identity of hits. Defaults to 0.
+        max_evalue (float, optional): Maximum e-value of hits. Defaults to None.
+        top_percent (float, optional): Only use hits within this percent of the best bitscore of a query.
+            Defaults to None.
+        majority (float, optional): Report the deepest taxon of at least this fraction of hits instead of
+            the LCA of all hits, in (0.5, 1]. Defaults to 1.0.
+        lineage (bool, optional): Add lineages of `taxonomy.taxid2lineage()`. Defaults to False.
+        jobs (int, optional): Number of processes. Defaults to 1.
+        chunk_size (int, optional): Size of a chunk in bytes. Defaults to 4MB.
+
+    Returns:
+        int: Number of classified queries.
+    """
+    if not 0.5 < majority <= 1:
+        logger.fatal( f"Majority has to be in (0.5, 1]: {majority}." )
+        t._die( f"[ERROR] Majority has to be in (0.5, 1]: {majority}." )
+
+    t._checkTaxonomy(None)
+    _paths.clear()
+    fh = t._openFile(input_file) if input_file else sys.stdin
+    out = open(output_file, 'w') if output_file else sys.stdout
+
+    def chunks():
+        for groups in _groups(fh, chunk_size):
+            groups = [(query, filterHits(hits, min_bitscore, min_identity, max_evalue, top_percent)) for query, hits in groups]
+            yield (groups, type, mapping_file, majority, lineage)
+
+    total = 0
+    # worker processes share the loaded taxonomy by forking
+    if jobs > 1 and hasattr(os, 'fork'):
+        import multiprocessing
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            # chunks in flight, in the order of the input
+            pending = deque()
+            for args in chunks():
+                pending.append(pool.apply_async(_lcaChunk, (args,)))
+                if len(pending) < 2*jobs: continue
+                text, n = pending.popleft().get()
+                out.write(text)
+                total += n
+            while pending:
+                text, n = pending.popleft().get()
+                out.write(text)
+                total += n
+    else:
+        for args in chunks():
+            text, n = _lcaChunk(args)
+            out.write(text)
+            total += n
+
+    if input_file:
+        fh.close()
+    if output_file:
+        out.close()
+
+    logger.info( f"Done classifying {total} queries." )
+    return total
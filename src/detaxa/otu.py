@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+# Multi-sample OTU/abundance tables from EDGE taxonomy list files
+
+import os
+import logging
+from typing import Optional
+
+from . import taxonomy as t
+
+try:
+    from . import __version__
+except:
+    __version__ = 'standalone'
+
+logger = logging.getLogger()
+
+class OTUTable:
+    """
+    A sparse sample x lineage count matrix. Only non-zero counts are kept, so the memory
+    depends on the number of distinct lineages per sample, not on the size of the inputs.
+    """
+    def __init__(self):
+        self.samples = []
+        self.totals = []
+        self.lineages = {}
+        self.counts = []
+
+    def addCount(self, lineage: str, sample_idx: int, count: int):
+        if not lineage in self.lineages:
+            self.lineages[lineage] = len(self.counts)
+            self.counts.append({})
+        row = self.counts[self.lineages[lineage]]
+        row[sample_idx] = row.get(sample_idx, 0) + count
+
+def readManifest(manifest_file: str) -> list:
+    """
+    Read a manifest of samples: a tab-delimited text file of `sample_name` and `path` per line.
+    Relative paths are relative to the manifest file.
+
+    Returns:
+        list: A list of (sample_name, path).
+    """
+    samples = []
+    base = os.path.dirname(os.path.abspath(manifest_file))
+    with t._openFile(manifest_file) as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'): continue
+            name, path = line.split('\t')[:2]
+            samples.append((name, path if os.path.isabs(path) else os.path.join(base, path)))
+    return samples
+
+def readEdgeTaxaList(edge_file: str):
+    """
+    Stream an EDGE taxonomy list file (LEVEL, TAXA, ROLLUP, ASSIGNED, TAXID).
+
+    Returns:
+        Iterator of (level, taxid, rollup reads, assigned reads).
+    """
+    with t._openFile(edge_file) as fh:
+        for line in fh:
+            line = line.strip('\n')
+            if not line: continue
+            (lvl, taxa, rollup, assigned, taxid) = line.split('\t')
+
+            # skip headers
+            if lvl=='LEVEL':
+                continue
+
+            yield (lvl, taxid, int(rollup), int(assigned))
+
+def buildOTUTable(samples: list) -> OTUTable:
+    """
+    Build an OTU table of many samples. The taxonomy has to be loaded once beforehand; the lineage
+    of each distinct taxid is resolved once across all samples.
+
+    Args:
+        samples (list): A list of (sample_name, path of EDGE taxonomy list file). Sample names have to be 
+            unique (e.g. the IDs of BIOM tables).
+
+    Returns:
+        OTUTable: The sparse OTU table.
+    """
+    paths = {}
+    for sample_name, edge_file in samples:
+        if sample_name in paths:
+            logger.fatal( f"Duplicate sample name {sample_name}: {paths[sample_name]} and {edge_file}." )
+            t._die( f"[ERROR] Duplicate sample name {sample_name}: {paths[sample_name]} and {edge_file}. Name the samples in a manifest." )
+        paths[sample_name] = edge_file
+
+    table = OTUTable()
+    lineage_cache = {}
+
+    for sample_name, edge_file in samples:
+        idx = len(table.samples)
+        table.samples.append(sample_name)
+        table.totals.append(0)
+
+        for lvl, taxid, rollup, assigned in readEdgeTaxaList(edge_file):
+            if lvl=='unclassified':
+                logger.info(f'{sample_name}: total number of unclassified reads: {rollup}')
+                continue
+            elif lvl=='root':
+                table.totals[idx] = rollup
+                logger.info(f'{sample_name}: total number of classified reads: {rollup}')
+                continue
+
+            # To match OTU talbes, we will only process taxa that have reads 
+            # being assigned to them directly. Not all taxa are at the major 
+            # ranks. We will count these reads to their least major taxa.
+            if assigned>0:
+                if not taxid in lineage_cache:
+                    lineage_cache[taxid] = t.taxid2lineage(taxid, sep=';', space2underscore=True)
+                lineage = lineage_cache[taxid]
+
+                # skipping taxa not found in the taxonomy tree
+                if lineage=="":
+                    logger.info(f'{sample_name}: unmapped taxa: {taxid}')
+                    continue
+
+                table.addCount(lineage, idx, assigned)
+
+        logger.info(f'{sample_name}: {edge_file} processed.')
+
+    return table
+
+def writeOTUTableTSV(table: OTUTable, output_file: Optional[str]=None, relative: bool=False) -> None:
+    """
+    Write an OTU table in tab-delimited text format (a row per lineage and a column per sample).
+
+    Args:
+        table (OTUTable): The OTU table.
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        relative (bool, optional): Write abundances relative to the classified reads of each sample. Defaults to False.
+    """
+    import sys
+    fh = open(output_file, 'w') if output_file else sys.stdout
+
+    fh.write('#OTU ID\t' + '\t'.join(table.samples) + '\n')
+    for lineage in sorted(table.lineages):
+        row = table.counts[table.lineages[lineage]]
+        if relative:
+            values = [row.get(i, 0)/table.totals[i] if table.totals[i] else 0 for i in range(len(table.samples))]
+        else:
+            values = [row.get(i, 0) for i in range(len(table.samples))]
+        fh.write(lineage + '\t' + '\t'.join(str(v) for v in values) + '\n')
+
+    if output_file:
+        fh.close()
+
+def writeOTUTableBIOM(table: OTUTable, output_file: str, fmt: str='json') -> None:
+    """
+    Write an OTU table in BIOM format: 'json' (BIOM 1.0, sparse) or 'hdf5' (BIOM 2.1, requires h5py).
+
+    Args:
+        table (OTUTable): The OTU table.
+        output_file (str): Path of the output file.
+        fmt (str, optional): Either 'json' or 'hdf5'. Defaults to 'json'.
+    """
+    import datetime
+    lineages = sorted(table.lineages)
+    date = datetime.datetime.now().isoformat()
+    generated_by = f"detaxa v{__version__}"
+
+    if fmt == 'json':
+        import json
+        with open(output_file, 'w') as fh:
+            json.dump({
+                "id": None,
+                "format": "Biological Observation Matrix 1.0.0",
+                "format_url": "http://biom-format.org",
+                "type": "OTU table",
+                "generated_by": generated_by,
+                "date": date,
+                "rows": [{"id": lineage, "metadata": {"taxonomy": lineage.split(';')}} for lineage in lineages],
+                "columns": [{"id": sample, "metadata": None} for sample in table.samples],
+                "matrix_type": "sparse",
+                "matrix_element_type": "int",
+                "shape": [len(lineages), len(table.samples)],
+                "data": [[r, c, v] for r, lineage in enumerate(lineages)
+                                   for c, v in sorted(table.counts[table.lineages[lineage]].items())],
+            }, fh)
+    elif fmt == 'hdf5':
+        try:
+            import h5py
+        except ImportError:
+            logger.fatal( "h5py is required for BIOM HDF5 output." )
+            t._die( "[ERROR] h5py is required for BIOM HDF5 output. Install it with `pip install h5py`." )
+
+        # observation matrix in CSR and sample matrix in CSC layouts
+        obs_data, obs_indices, obs_indptr = [], [], [0]
+        by_sample = [[] for i in range(len(table.samples))]
+        for r, lineage in enumerate(lineages):
+            for c, v in sorted(table.counts[table.lineages[lineage]].items()):
+                obs_data.append(v)
+                obs_indices.append(c)
+                by_sample[c].append((r, v))
+            obs_indptr.append(len(obs_data))
+
+        smp_data, smp_indices, smp_indptr = [], [], [0]
+        for entries in by_sample:
+            for r, v in entries:
+                smp_data.append(v)
+                smp_indices.append(r)
+            smp_indptr.append(len(smp_data))
+
+        str_dtype = h5py.special_dtype(vlen=str)
+        with h5py.File(output_file, 'w') as h5:
+            h5.attrs['id'] = os.path.basename(output_file)
+            h5.attrs['type'] = 'OTU table'
+            h5.attrs['format-url'] = 'http://biom-format.org'
+            h5.attrs['format-version'] = (2, 1)
+            h5.attrs['generated-by'] = generated_by
+            h5.attrs['creation-date'] = date
+            h5.attrs['shape'] = (len(lineages), len(table.samples))
+            h5.attrs['nnz'] = len(obs_data)
+
+            for axis, ids, data, indices, indptr in [('observation', lineages, obs_data, obs_indices, obs_indptr),
+                                                     ('sample', table.samples, smp_data, smp_indices, smp_indptr)]:
+                grp = h5.create_group(axis)
+                grp.create_dataset('ids', data=ids, dtype=str_dtype)
+                grp.create_group('metadata')
+                grp.create_group('group-metadata')
+                matrix = grp.create_group('matrix')
+                matrix.create_dataset('data', data=data, dtype='float64')
+                matrix.create_dataset('indices', data=indices, dtype='int32')
+                matrix.create_dataset('indptr', data=indptr, dtype='int32')
+    else:
+        logger.fatal( f"Invalid BIOM format: {fmt}" )
+        t._die( f"[ERROR] Invalid BIOM format: {fmt}" )
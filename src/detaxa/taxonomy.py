@@ -6,8 +6,15 @@
 
 import sys
 import os
+import re
 import tarfile
 import logging
+import threading
+import hashlib
+import functools
+import contextvars
+from array import array
+from collections.abc import Mapping, MutableMapping
 from typing import Union, Optional
 
 try:
@@ -40,15 +47,41 @@ taxParents     = {}
 taxRanks       = {}
 taxNames       = {}
 taxMerged      = {}
+taxDeleted     = set()
 taxNumChilds   = {}
 accTid         = {}
 tidLineage     = {}
 tidLineageDict = {}
 nameTid        = {}
+gtdbGenomes    = {}
+_bgzfBlockKeys = {}
+_accIndexes    = {}
+gtdbMetadata   = {}
+taxChildren    = {}
+_treeArrays    = {}
+_derivedAttrs  = {}
+_lineageIndex  = {}
+_sqliteStore   = None
+_releases      = {}
+_releaseNames  = {}
 major_level_to_abbr = {}
 abbr_to_major_level = {}
 df_names = None
 
+# a taxon in a lineage string, e.g. 'g__Escherichia'
+_re_taxa = re.compile("^([^_]+)__(.*)$")
+# a taxon named after its descendant for a missing rank, e.g. 'Bacillus - no_f_rank'
+_re_no_rank = re.compile(" - no_[^_ ]+_rank$")
+
+# loaded releases (see `loadTaxonomyRelease()`): the first one, the default one and the one of a lookup
+_baseRelease = None
+_defaultRelease = None
+_release = contextvars.ContextVar('detaxa_release', default=None)
+
+# read-only snapshot flag (see `freezeTaxonomy()`) and the lock guarding lazy loading
+_frozen = False
+_lock = threading.RLock()
+
 # --- helper functions ---
 def _getTaxDepth(tid: str) -> str:
     """Get the depth of a taxonomy ID [warning: only support Kraken taxa inputs]"""
@@ -70,16 +103,248 @@ def _getTaxRank(tid: str) -> str:
     if tid in taxMerged: tid = taxMerged[tid]
     return taxRanks[tid]
 
+def _setTaxon(tid: str, parent: str, rank: str, name: str) -> None:
+    """Add or redefine a taxon; the child count of its parent is only updated when the parent changes"""
+    p_tid = taxParents.get(tid)
+    if p_tid != parent:
+        if p_tid in taxNumChilds:
+            taxNumChilds[p_tid] -= 1
+            if not taxNumChilds[p_tid]: del taxNumChilds[p_tid]
+        if parent in taxNumChilds:
+            taxNumChilds[parent] += 1
+        else:
+            taxNumChilds[parent] = 1
+    taxParents[tid] = parent
+    taxRanks[tid] = rank
+    taxNames[tid] = name
+
+def _compression(filename: str) -> Optional[str]:
+    """Detect the compression of a file by its magic bytes: 'bgzf', 'gzip', 'bz2', 'xz' or None"""
+    with open(filename, 'rb') as f:
+        magic = f.read(16)
+
+    if magic[:2] == b'\x1f\x8b':
+        # BGZF is a series of gzip blocks with a 'BC' extra field
+        if len(magic) >= 4 and magic[3] & 4 and magic[12:14] == b'BC':
+            return 'bgzf'
+        return 'gzip'
+    elif magic[:3] == b'BZh':
+        return 'bz2'
+    elif magic[:6] == b'\xfd7zXZ\x00':
+        return 'xz'
+    else:
+        return None
+
+def _openFile(filename: str, mode: str='rt'):
+    """Open a plain, gzip (BGZF), bzip2 or xz compressed file for streaming reads"""
+    compression = _compression(filename)
+    if compression in ['gzip', 'bgzf']:
+        import gzip
+        return gzip.open(filename, mode)
+    elif compression == 'bz2':
+        import bz2
+        return bz2.open(filename, mode)
+    elif compression == 'xz':
+        import lzma
+        return lzma.open(filename, mode)
+    else:
+        return open(filename, mode)
+
+def _findFile(filename: str) -> str:
+    """Return the path of `filename` or of its compressed copy (.gz, .bz2 or .xz) if only that one exists"""
+    if not os.path.isfile(filename):
+        for ext in ['.gz', '.bz2', '.xz']:
+            if os.path.isfile(filename+ext):
+                return filename+ext
+    return filename
+
+def _computeDepths(tids: Optional[list] = None) -> None:
+    """
+    Compute the depths of all taxa in one pass; each taxon is visited once. With `tids`, only compute
+    the depths of these taxa (without depths) from the known depths of their ancestors.
+    """
+    if tids is None:
+        taxDepths.clear()
+        tids = taxParents
+    for tid in tids:
+        if tid in taxDepths: continue
+
+        # walk up to the first taxon with known depth (or the root)
+        path = []
+        onpath = set()
+        while not tid in taxDepths:
+            parent = taxParents[tid]
+            if parent == tid or not parent in taxParents or parent in onpath:
+                taxDepths[tid] = 0
+                break
+            path.append(tid)
+            onpath.add(tid)
+            tid = parent
+
+        depth = taxDepths[tid]
+        for tid in reversed(path):
+            depth += 1
+            taxDepths[tid] = depth
+
+def _resolveMerged() -> None:
+    """Resolve chains of merged taxids (e.g. A -> B -> C) so every merged taxid maps to its final taxid"""
+    for tid in taxMerged:
+        new_tid = taxMerged[tid]
+        seen = {tid}
+        while new_tid in taxMerged and not new_tid in seen:
+            seen.add(new_tid)
+            new_tid = taxMerged[new_tid]
+        taxMerged[tid] = new_tid
+
+def _childrenIndex() -> dict:
+    """Get the children of each taxon ({`parent`: [`tid`,...]}), built once after a taxonomy is loaded"""
+    if not len(taxChildren):
+        with _lock:
+            if not len(taxChildren):
+                children = {}
+                for tid, parent in taxParents.items():
+                    if tid == parent: continue
+                    if parent in children:
+                        children[parent].append(tid)
+                    else:
+                        children[parent] = [tid]
+                taxChildren.update(children)
+    return taxChildren
+
+def _derivedAttributes() -> dict:
+    """
+    Get the attributes derived from the tree, computed for all taxa in one top-down pass after a taxonomy
+    is loaded: 'rank' (guessed ranks of 'no rank' taxa), 'major' (nearest ancestors at a major rank that
+    are not the parents) and 'type' (taxa of `taxid2type()` other than 0). Leaves are the taxa not in
+    `taxNumChilds`.
+    """
+    if not len(_derivedAttrs):
+        with _lock:
+            if not len(_derivedAttrs):
+                derived = {'rank': {}, 'major': {}, 'type': {}}
+                _deriveSubtrees([(tid, '1', 0) for tid in _lineageRoots()], derived)
+                _derivedAttrs.update(derived)
+    return _derivedAttrs
+
+def _deriveSubtrees(stack: list, derived: dict) -> None:
+    """
+    Derive the attributes of the taxa in the subtrees of a stack of (taxid, nearest ancestor at a major 
+    rank, child of the nearest species ancestor) states, see `_derivedAttributes()`.
+    """
+    children = _childrenIndex()
+    guessed, major, types = derived['rank'], derived['major'], derived['type']
+
+    while stack:
+        tid, nmtid, sptid = stack.pop()
+        rank = taxRanks[tid]
+        if nmtid != taxParents[tid]:
+            major[tid] = nmtid
+        else:
+            major.pop(tid, None)
+        if sptid and sptid != tid:
+            types[tid] = sptid
+        else:
+            types.pop(tid, None)
+        _guessRank(tid, nmtid, guessed)
+
+        if not tid in children: continue
+        if tid == '1':
+            c_nmtid = '1'
+        elif rank in major_level_to_abbr:
+            c_nmtid = tid
+        else:
+            c_nmtid = nmtid
+
+        for c_tid in children[tid]:
+            if tid == '1':
+                stack.append((c_tid, c_nmtid, 0))
+            elif rank == 'species':
+                stack.append((c_tid, c_nmtid, c_tid))
+            else:
+                stack.append((c_tid, c_nmtid, sptid))
+
+def _guessRank(tid: str, nmtid: str, guessed: dict) -> None:
+    """Guess the rank of a 'no rank' taxon by being a leaf and its nearest ancestor at a major rank"""
+    if taxRanks[tid] != "no rank":
+        guessed.pop(tid, None)
+    elif not tid in taxNumChilds:
+        guessed[tid] = "strain"
+    elif taxRanks.get(nmtid) == "species":
+        guessed[tid] = "species - others"
+    else:
+        guessed[tid] = "others"
+
+def _derivedState(tid: str) -> tuple:
+    """The state of a taxon in `_deriveSubtrees()` from the derived attributes of its parent"""
+    parent = taxParents[tid]
+    if parent == tid or parent == '1' or not parent in taxParents:
+        return (tid, '1', 0)
+
+    p_rank = taxRanks[parent]
+    nmtid = parent if p_rank in major_level_to_abbr else _derivedAttrs['major'].get(parent, taxParents[parent])
+    if p_rank == 'species':
+        return (tid, nmtid, tid)
+
+    # the parent is the child of a species, or below one
+    grandparent = taxParents[parent]
+    if grandparent != '1' and taxRanks.get(grandparent) == 'species':
+        return (tid, nmtid, parent)
+    return (tid, nmtid, _derivedAttrs['type'].get(parent, 0))
+
 def _die(msg: str) -> str:
     sys.exit(msg)
 
+def _checkFrozen():
+    """Refuse to modify a frozen taxonomy"""
+    if _frozen:
+        logger.fatal( "Taxonomy is frozen. Call \"unfreezeTaxonomy()\" before loading or modifying taxonomy." )
+        _die( "[ERROR] Taxonomy is frozen. Call \"unfreezeTaxonomy()\" before loading or modifying taxonomy." )
+
+def _checkWritable():
+    """Refuse to modify a frozen taxonomy, and prepare in-memory tables for loaders"""
+    _checkFrozen()
+
+    # loaders build in-memory tables
+    if isinstance(taxParents, _ReleaseProxy):
+        logger.fatal( "Several taxonomy releases are loaded. Call \"dropTaxonomyReleases()\" before loading or modifying taxonomy." )
+        _die( "[ERROR] Several taxonomy releases are loaded. Call \"dropTaxonomyReleases()\" before loading or modifying taxonomy." )
+    if _sqliteStore is not None:
+        _closeSQLite()
+
+    # the children index and tree arrays are rebuilt on demand after any modification
+    taxChildren.clear()
+    _treeArrays.clear()
+    _derivedAttrs.clear()
+    _lineageIndex.clear()
+
+def _checkOverlay():
+    """Refuse to add or remove taxa of a frozen, SQLite-backed or multi-release taxonomy"""
+    _checkFrozen()
+    if _sqliteStore is not None or isinstance(taxParents, _ReleaseProxy):
+        logger.fatal( "Taxa can only be added to or removed from a taxonomy loaded in memory." )
+        _die( "[ERROR] Taxa can only be added to or removed from a taxonomy loaded in memory by \"loadTaxonomy()\"." )
+
+def _descendants(tids: list) -> list:
+    """The taxa in the subtrees of `tids` (included)"""
+    children = _childrenIndex()
+    seen = set()
+    stack = list(tids)
+    while stack:
+        tid = stack.pop()
+        if tid in seen: continue
+        seen.add(tid)
+        stack.extend(children.get(tid, []))
+    return list(seen)
+
 def _checkTaxonomy(tid: Union[int, str]):
     """Check if a taxonomy ID is present in the taxonomy database"""
 
     if not len(taxParents):
-        logger.info("Taxonomy not loaded. Call \"loadTaxonomy()\" first to avoid this message...")
-        logger.info("Loading taxonomy...")
-        loadTaxonomy()
+        with _lock:
+            if not len(taxParents):
+                logger.info("Taxonomy not loaded. Call \"loadTaxonomy()\" first to avoid this message...")
+                logger.info("Loading taxonomy...")
+                loadTaxonomy()
 
     if tid:
         # tid must be in string type
@@ -87,7 +352,6 @@ def _checkTaxonomy(tid: Union[int, str]):
 
         # convert to merged tid first if needs
         if tid in taxMerged:
-            logger.info( f"Merged tid found: {tid} -> {taxMerged[tid]}." )
             tid = taxMerged[tid]
 
         if (tid in taxNames) and (tid in taxParents):
@@ -209,7 +473,9 @@ def _taxid2lineage(tid: Union[int, str],
             info["strain"]["name"]  = str_name
             info["strain"]["taxid"] = tid
 
-    tidLineageDict[tid] = info
+    # frozen snapshots never write to shared state on the read path
+    if not _frozen:
+        tidLineageDict[tid] = info
     return info
 
 def _loadAbbrJson(abbr_json_path: str) -> None:
@@ -244,6 +510,33 @@ def _loadAbbrJson(abbr_json_path: str) -> None:
         logger.fatal( f"None of the major level to aberration loaded from {abbr_json_path}." )
         _die(f"[ERROR] None of the major level to aberration loaded from {abbr_json_path}.")
 
+class _CategoricalArray:
+    """A compact column of repetitive strings: a code per row and a table of the distinct values."""
+    def __init__(self):
+        self.codes = array('I')
+        self.values = []
+        self.index = {}
+
+    def append(self, value: str):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> str:
+        return self.values[self.codes[i]]
+
+    def __setitem__(self, i: int, value: str):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes[i] = code
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
 class _autoVivification(dict):
     """Implementation of perl's autovivification feature."""
     def __getitem__(self, item):
@@ -253,8 +546,315 @@ class _autoVivification(dict):
             value = self[item] = type(self)()
             return value
 
+# columns of taxa in SQLite databases of `buildTaxonomySQLite()`
+_sqlite_columns = ['tid', 'parent', 'rank', 'name', 'depth', 'num_childs', 'guessed_rank', 'major', 'type']
+
+class _SQLiteStore:
+    """
+    A taxonomy database of `buildTaxonomySQLite()`, opened read-only with a connection per thread.
+    Rows of recently used taxa are kept in a cache of `cache_size` entries.
+    """
+    def __init__(self, db_file: str, cache_size: int = 65536):
+        import functools
+        import pathlib
+        self.uri = pathlib.Path(db_file).absolute().as_uri() + "?mode=ro"
+        self._local = threading.local()
+        self.row = functools.lru_cache(maxsize=cache_size)(self._row)
+        self.merged = functools.lru_cache(maxsize=cache_size)(self._merged)
+        self.meta = dict(self.execute("SELECT key, value FROM meta").fetchall())
+
+    def execute(self, sql: str, params: tuple = ()):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import sqlite3
+            conn = self._local.conn = sqlite3.connect(self.uri, uri=True)
+        return conn.execute(sql, params)
+
+    def _row(self, tid: str) -> Optional[tuple]:
+        return self.execute(f"SELECT {', '.join(_sqlite_columns)} FROM taxa WHERE tid=?", (tid,)).fetchone()
+
+    def _merged(self, tid: str) -> Optional[tuple]:
+        """(new taxid,) of a merged taxid, (None,) of a deleted one"""
+        return self.execute("SELECT new_tid FROM merged WHERE tid=?", (tid,)).fetchone()
+
+    def names(self, name: str, fuzzy: bool = False, expand: bool = True, prefix: int = 2):
+        """
+        Name search table of `name2taxid()` for a name: the rows of the name, or in fuzzy mode of the names
+        with the same first `prefix` letters (all names if `prefix` is 0)
+        """
+        import pandas as pd
+
+        if fuzzy and prefix:
+            sql, params = "SELECT name, tid FROM names WHERE name >= ? AND name < ?", (name[:prefix], name[:prefix]+'\uffff')
+        elif fuzzy:
+            sql, params = "SELECT name, tid FROM names WHERE 1", ()
+        else:
+            sql, params = "SELECT name, tid FROM names WHERE name = ?", (name,)
+        if not expand:
+            sql += " AND name_class = 'scientific name'"
+        rows = self.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=['name', 'taxid']).set_index('name')
+
+    def acc2taxid(self, acc: str) -> str:
+        row = self.execute("SELECT tid FROM accessions WHERE acc=?", (acc,)).fetchone()
+        return row[0] if row else ""
+
+class _SQLiteTable(Mapping):
+    """A read-only dict of a column of taxa (e.g. `taxParents`) in a SQLite database; taxa with NULL values are absent"""
+    def __init__(self, store: _SQLiteStore, column: str):
+        self.store = store
+        self.column = column
+        self.idx = _sqlite_columns.index(column)
+        self.size = None
+
+    def __getitem__(self, tid):
+        row = self.store.row(tid)
+        if row is None or row[self.idx] is None:
+            raise KeyError(tid)
+        return row[self.idx]
+
+    def __contains__(self, tid) -> bool:
+        row = self.store.row(tid)
+        return row is not None and row[self.idx] is not None
+
+    def get(self, tid, default=None):
+        row = self.store.row(tid)
+        return default if row is None or row[self.idx] is None else row[self.idx]
+
+    def __len__(self) -> int:
+        if self.size is None:
+            self.size = self.store.execute(f"SELECT COUNT(*) FROM taxa WHERE {self.column} IS NOT NULL").fetchone()[0]
+        return self.size
+
+    def __iter__(self):
+        for (tid,) in self.store.execute(f"SELECT tid FROM taxa WHERE {self.column} IS NOT NULL"):
+            yield tid
+
+    def items(self):
+        return self.store.execute(f"SELECT tid, {self.column} FROM taxa WHERE {self.column} IS NOT NULL")
+
+class _SQLiteMerged(Mapping):
+    """`taxMerged` ({merged: new taxid}) or `taxDeleted` (deleted: None) in a SQLite database"""
+    def __init__(self, store: _SQLiteStore, deleted: bool = False):
+        self.store = store
+        self.deleted = deleted
+        self.where = "new_tid IS NULL" if deleted else "new_tid IS NOT NULL"
+        self.size = None
+
+    def __getitem__(self, tid):
+        row = self.store.merged(tid)
+        if row is None or (row[0] is None) != self.deleted:
+            raise KeyError(tid)
+        return row[0]
+
+    def __contains__(self, tid) -> bool:
+        row = self.store.merged(tid)
+        return row is not None and (row[0] is None) == self.deleted
+
+    def __len__(self) -> int:
+        if self.size is None:
+            self.size = self.store.execute(f"SELECT COUNT(*) FROM merged WHERE {self.where}").fetchone()[0]
+        return self.size
+
+    def __iter__(self):
+        for (tid,) in self.store.execute(f"SELECT tid FROM merged WHERE {self.where}"):
+            yield tid
+
+    def items(self):
+        return self.store.execute(f"SELECT tid, new_tid FROM merged WHERE {self.where}")
+
+class _ReleaseTable(Mapping):
+    """A table (dict or set) of a release, stored as its differences from the same table of the base release"""
+    def __init__(self, base, table):
+        self.base = base
+        if isinstance(table, set):
+            self.changed = dict.fromkeys(table.difference(base))
+        else:
+            missing = object()
+            self.changed = {k: v for k, v in table.items() if base.get(k, missing) != v}
+        self.removed = set(k for k in base if not k in table)
+        self.size = len(table)
+
+    def __getitem__(self, k):
+        if k in self.changed: return self.changed[k]
+        if k in self.removed: raise KeyError(k)
+        return self.base[k]
+
+    def __contains__(self, k) -> bool:
+        return k in self.changed or (not k in self.removed and k in self.base)
+
+    def get(self, k, default=None):
+        if k in self.changed: return self.changed[k]
+        if k in self.removed: return default
+        return self.base.get(k, default)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        yield from self.changed
+        for k in self.base:
+            if not k in self.changed and not k in self.removed:
+                yield k
+
+class _ReleaseProxy(MutableMapping):
+    """A taxonomy table (e.g. `taxParents`) of the release of a lookup (`release=`), or of the default release"""
+    def __init__(self, name: str):
+        self.name = name
+
+    def table(self):
+        return _releases[_release.get() or _defaultRelease][self.name]
+
+    def __getitem__(self, k):
+        return self.table()[k]
+
+    def __setitem__(self, k, v):
+        self.table()[k] = v
+
+    def __delitem__(self, k):
+        del self.table()[k]
+
+    def __contains__(self, k) -> bool:
+        return k in self.table()
+
+    def get(self, k, default=None):
+        return self.table().get(k, default)
+
+    def __len__(self) -> int:
+        return len(self.table())
+
+    def __iter__(self):
+        return iter(self.table())
+
+    def items(self):
+        return self.table().items()
+
+    def clear(self):
+        self.table().clear()
+
+    def update(self, *args, **kwargs):
+        self.table().update(*args, **kwargs)
+
+class _LazyNames(MutableMapping):
+    """
+    `taxNames` read from a names.dmp sorted by taxids on demand: the scientific name of a taxon is found
+    by bisecting the file and kept in a cache of `cache_size` names. Names set by loaders are kept in
+    `names`. Taxa in `taxParents` are assumed to have names.
+    """
+    def __init__(self, names_dmp_file: str, names: dict, cache_size: int = 65536):
+        self.names = names
+        self.size = os.path.getsize(names_dmp_file)
+        self.fh = open(names_dmp_file, 'rb')
+        self.lock = threading.Lock()
+        self.fetch = functools.lru_cache(maxsize=cache_size)(self._fetch)
+
+    def _lineAt(self, pos: int) -> bytes:
+        """The first line starting at or after `pos`"""
+        if pos:
+            self.fh.seek(pos-1)
+            self.fh.readline()
+        else:
+            self.fh.seek(0)
+        return self.fh.readline()
+
+    def _fetch(self, tid: str) -> Optional[str]:
+        if not tid.isdigit(): return None
+        key = int(tid)
+
+        with self.lock:
+            # the first line of a taxid >= key
+            lo, hi = 0, self.size
+            while lo < hi:
+                mid = (lo+hi)//2
+                line = self._lineAt(mid)
+                if not line or int(line.split(b'\t', 1)[0]) >= key:
+                    hi = mid
+                else:
+                    lo = mid+1
+
+            line = self._lineAt(lo)
+            while line:
+                fields = line.decode('utf8').rstrip('\r\n').split('\t|\t')
+                if fields[0] != tid: break
+                if fields[3].startswith("scientific name"):
+                    return fields[1]
+                line = self.fh.readline()
+        return None
+
+    def __getitem__(self, tid):
+        if tid in self.names: return self.names[tid]
+        name = self.fetch(tid)
+        if name is None: raise KeyError(tid)
+        return name
+
+    def get(self, tid, default=None):
+        try:
+            return self[tid]
+        except KeyError:
+            return default
+
+    def __contains__(self, tid) -> bool:
+        return tid in self.names or tid in taxParents
+
+    def __setitem__(self, tid, name):
+        self.names[tid] = name
+
+    def __delitem__(self, tid):
+        # names read from names.dmp are dropped with their taxa in `taxParents`
+        self.names.pop(tid, None)
+
+    def __len__(self) -> int:
+        return len(taxParents) + sum(1 for tid in self.names if not tid in taxParents)
+
+    def __iter__(self):
+        yield from taxParents
+        for tid in self.names:
+            if not tid in taxParents: yield tid
+
+    def items(self):
+        """All names in one pass over names.dmp"""
+        with open(self.fh.name) as f:
+            for line in f:
+                tid, name, tmp, nametype = line.rstrip('\r\n').split('\t|\t')
+                if nametype.startswith("scientific name") and tid in taxParents and not tid in self.names:
+                    yield tid, name
+        yield from self.names.items()
+
+def _isSortedByTaxid(names_dmp_file: str, samples: int = 64) -> bool:
+    """Check that the lines of a names.dmp at some offsets are sorted by taxids"""
+    size = os.path.getsize(names_dmp_file)
+    last = -1
+    with open(names_dmp_file, 'rb') as f:
+        for i in range(samples):
+            f.seek(size*i//samples)
+            if i: f.readline()
+            line = f.readline()
+            if not line: break
+            tid = line.split(b'\t', 1)[0]
+            if not tid.isdigit() or int(tid) < last:
+                return False
+            last = int(tid)
+    return True
+
+def _releaseArg(func):
+    """Add a `release` argument to a lookup: the name of a release of `loadTaxonomyRelease()` to look up in"""
+    @functools.wraps(func)
+    def wrapper(*args, release: Optional[str] = None, **kwargs):
+        if release is None:
+            return func(*args, **kwargs)
+        if not release in _releases:
+            logger.fatal( f"Taxonomy release not loaded: {release}." )
+            _die( f"[ERROR] Taxonomy release not loaded: {release}. Call \"loadTaxonomyRelease()\" first." )
+        token = _release.set(release)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _release.reset(token)
+    return wrapper
+
 # --- main functions ---
 
+@_releaseArg
 def taxid2rank(tid: Union[int, str], guess_strain: bool=True) -> str:
     """
     Get the taxonomic rank of a given taxonomic ID.
@@ -274,21 +874,13 @@ def taxid2rank(tid: Union[int, str], guess_strain: bool=True) -> str:
     if tid == '1':
         return "root"
 
+    # a leaf taxonomy is a strain; others are guessed by the nearest major rank
     if _getTaxRank(tid) == "no rank" and guess_strain:
-        # a leaf taxonomy is a strain
-        if taxidIsLeaf(tid):
-            return "strain"
-        # if not
-        else:
-            nmtid = taxid2nearestMajorTaxid(tid)
-            nmrank = _getTaxRank(nmtid)
-            if nmrank == "species":
-                return "species - others"
-            else:
-                return "others"
+        return _derivedAttributes()['rank'][tid]
     
     return _getTaxRank(tid)
 
+@_releaseArg
 def taxid2name(tid: Union[int, str]) -> str:
     """
     Get the taxonomic name of a given taxonomic ID.
@@ -306,6 +898,7 @@ def taxid2name(tid: Union[int, str]) -> str:
     else:
         return _getTaxName(tid)
 
+@_releaseArg
 def taxid2depth(tid: Union[int, str]) -> int:
     """
     Get the depth of a given taxonomic ID.
@@ -323,6 +916,7 @@ def taxid2depth(tid: Union[int, str]) -> int:
     else:
         return _getTaxDepth(tid)
 
+@_releaseArg
 def taxid2type(tid: Union[int, str]):
     """
     Guessing the `type` of a given taxonomic ID. It could be rank of `group`, `serotype`...etc.
@@ -337,22 +931,10 @@ def taxid2type(tid: Union[int, str]):
     tid = _checkTaxonomy(tid)
     if tid == "unknown": return "unknown"
 
-    origID = tid
-    lastID = tid
-    tid = _getTaxParent(tid)
-
-    while tid != '1' and _getTaxRank(tid) != 'species':
-        lastID = tid
-        tid = _getTaxParent(tid)
-
-    if _getTaxRank(tid) != 'species':
-        tid = 0
-    else:
-        tid = lastID
-        if tid == origID: tid = 0
-
-    return tid
+    # the child of the nearest species ancestor, 0 if it is the taxon itself or not found
+    return _derivedAttributes()['type'].get(tid, 0)
 
+@_releaseArg
 def taxid2parent(tid: Union[int, str], norank: bool=False) -> str:
     """
     Get the parent of a given taxonomic ID.
@@ -376,15 +958,107 @@ def taxid2parent(tid: Union[int, str], norank: bool=False) -> str:
 
     return tid
 
+@_releaseArg
+def normalize_taxids(tids: list) -> tuple:
+    """
+    Normalize many taxonomic IDs at once. Merged IDs are replaced by their current IDs; deleted and 
+    unknown IDs become "unknown". Remapped and deleted IDs are counted instead of logged.
+    
+    Args:
+        tids (list): Taxonomic IDs.
+    
+    Returns:
+        tuple: The list of normalized taxonomic IDs and a dictionary of counters of the input IDs
+            ({'remapped': Counter, 'deleted': Counter, 'unknown': Counter}).
+    """
+    from collections import Counter
+
+    _checkTaxonomy(None)
+
+    counters = {'remapped': Counter(), 'deleted': Counter(), 'unknown': Counter()}
+    # normalized ID and the counter of each distinct input ID
+    cache = {}
+    normalized = []
+
+    for tid in tids:
+        tid = str(tid)
+        if not tid in cache:
+            new_tid, counter = tid, None
+            if tid in taxMerged:
+                new_tid, counter = taxMerged[tid], counters['remapped']
+            if new_tid in taxDeleted:
+                new_tid, counter = "unknown", counters['deleted']
+            elif not new_tid in taxParents:
+                new_tid, counter = "unknown", counters['unknown']
+            cache[tid] = (new_tid, counter)
+
+        new_tid, counter = cache[tid]
+        if counter is not None:
+            counter[tid] += 1
+        normalized.append(new_tid)
+
+    return normalized, counters
+
 def name2taxid_reset():
     """
     Clean up cached results and searching domain
     """
     global nameTid, df_names
-    nameTid = {}
-    df_names = None
+    with _lock:
+        nameTid = {}
+        df_names = None
+        for names in _releaseNames.values():
+            names['nameTid'] = {}
+            names['df_names'] = None
     return
 
+def _releaseNameTables():
+    """The name search cache and table of the release of a lookup, or None for the first release"""
+    release = _release.get() or _defaultRelease
+    if release is None or release == _baseRelease:
+        return None
+    return _releaseNames[release]
+
+def _loadNameTable(expand: bool=True):
+    """Build the name search table used by `name2taxid()` once (thread-safe)"""
+    global df_names
+    import pandas as pd
+
+    names = _releaseNameTables()
+
+    # if expand is True, loading names.dmp
+    names_dmp_file = _findFile((names['dir'] if names else taxonomy_dir)+"/names.dmp")
+
+    with _lock:
+        if names and names['df_names'] is not None:
+            return names['df_names']
+        if not names and df_names is not None:
+            return df_names
+
+        # "expand" mode is ON
+        if expand and os.path.isfile( names_dmp_file ):
+            logging.debug(f"Loading {names_dmp_file}")
+            with _openFile(names_dmp_file) as f:
+                df = pd.read_csv(f, 
+                                 sep='\t', 
+                                 header=None, 
+                                 names=['taxid', 'sep1', 'name', 'sep2', 'annot', 'sep3', 'type', 'sep4'], 
+                                 usecols=['taxid','name'],
+                                 index_col='name')
+            logging.debug(f"names.dmp loaded")
+        # "expand" mode is OFF, search loaded names only
+        else:
+            df = pd.DataFrame.from_dict(dict(taxNames.items()), orient='index', columns=['name'])
+            df = df.reset_index().rename(columns={'index': 'taxid'})
+            df = df.set_index('name')
+
+        if names:
+            names['df_names'] = df
+            return df
+        df_names = df
+        return df_names
+
+@_releaseArg
 def name2taxid(name: str, 
                rank: str=None, 
                superkingdom: str=None, 
@@ -393,7 +1067,7 @@ def name2taxid(name: str,
                max_matches: int=3,
                expand: bool=True) -> list:
     """
-    Get the taxonomic ID of a given taxonomic name.
+    Get the taxonomic ID of a given taxonomic name. See `lineage2taxid()` for lineage strings.
     
     Args:
         name (str): Taxonomic scientific name.
@@ -401,36 +1075,23 @@ def name2taxid(name: str,
         superkingdom (str, optional): The expected superkingdom of the taxonomic name.
         fuzzy (bool, optional): Whether to allow fuzzy search. Defaults to False.
         cutoff (float, optional): Similarity cutoff for `difflib.get_close_matches`. 
-            Only apply to `expand` mode. Defaults to 0.7.
+            Only apply to `expand` mode. Defaults to 0.7. With a SQLite taxonomy (`loadTaxonomySQLite()`),
+            names sharing the first two letters are searched first and all names only without a match.
         max_matches (int, optional): Reporting max number of taxid. Defaults to 3.
         expand (bool, optional): Search the entire 'names.dmp' if True, otherwise search sientific names only. 
             Defaults to False.
     Returns:
         list: The list of matched taxonomic ID.
     """
-    global nameTid, df_names, taxonomy_dir
-    import pandas as pd
-
-    # if expand is True, loading names.dmp
-    names_dmp_file = taxonomy_dir+"/names.dmp"
-
-    # "expand" mode is ON
-    if df_names is None and expand and os.path.isfile( names_dmp_file ):
-        logging.debug(f"Loading {names_dmp_file}")
-        df_names = pd.read_csv(names_dmp_file, 
-                            sep='\t', 
-                            header=None, 
-                            names=['taxid', 'sep1', 'name', 'sep2', 'annot', 'sep3', 'type', 'sep4'], 
-                            usecols=['taxid','name'],
-                            index_col='name')
-        logging.debug(f"names.dmp loaded")
-    # "expand" mode is OFF, search loaded names only
-    elif df_names is None:
-        df_names = pd.DataFrame.from_dict(taxNames, orient='index', columns=['name'])
-        df_names = df_names.reset_index().rename(columns={'index': 'taxid'})
-        df_names = df_names.set_index('name')
+    # keep local references so a concurrent `name2taxid_reset()` can't swap the tables mid-search
+    names = _releaseNameTables()
+    cache = names['nameTid'] if names else nameTid
+    if _sqliteStore is not None and not name in cache:
+        df_names = _sqliteStore.names(name, fuzzy, expand)
+    else:
+        df_names = _loadNameTable(expand)
     
-    if not name in nameTid:
+    if not name in cache:
         matched_taxid = []
         df_temp = None
         logging.debug(f"Searching {name}...")
@@ -438,6 +1099,10 @@ def name2taxid(name: str,
         if fuzzy==True:
             import difflib
             matches = difflib.get_close_matches(name, df_names.index, max_matches, cutoff)
+            if not matches and _sqliteStore is not None:
+                # names with other first letters (e.g. a typo in the first two letters)
+                df_names = _sqliteStore.names(name, fuzzy, expand, prefix=0)
+                matches = difflib.get_close_matches(name, df_names.index, max_matches, cutoff)
             logger.debug(f'{name}: {matches}')
             df_temp = df_names.loc[matches,:]
         else:
@@ -447,8 +1112,9 @@ def name2taxid(name: str,
                 df_temp = df_names.head(0)
 
         if len(df_temp)==0:
-            nameTid[name] = []
-            return nameTid[name]
+            if not _frozen:
+                cache[name] = []
+            return []
 
         if rank:
             df_temp['rank'] = df_temp.taxid.apply(taxid2rank)
@@ -460,14 +1126,125 @@ def name2taxid(name: str,
             idx = df_temp['sk']==superkingdom
             df_temp = df_temp[idx]
         
-        nameTid[name] = df_temp.head(max_matches).taxid.to_list()
-        return nameTid[name]
+        matched_taxid = df_temp.head(max_matches).taxid.to_list()
+        if not _frozen:
+            cache[name] = matched_taxid
+        return matched_taxid
     else:
-        if len(nameTid[name]):
-            return nameTid[name][:max_matches]
+        matched_taxid = cache.get(name, [])
+        if len(matched_taxid):
+            return matched_taxid[:max_matches]
         else:
             return []
 
+def _lineagePaths() -> dict:
+    """
+    Get the index of rank-qualified lineage paths (built once after a taxonomy is loaded): 'edges'
+    ({(ancestor, rank, name): tid}) and 'names' ({(rank, name): [tid,...]}) of the taxa at major ranks.
+    The ancestor of a taxon is its nearest ancestor at a major rank, skipping taxa named after their 
+    descendants for missing ranks (`no_{rank}_rank`), or '1' for the top ones.
+    """
+    if not len(_lineageIndex):
+        with _lock:
+            if not len(_lineageIndex):
+                major = _derivedAttributes()['major']
+                edges, names = {}, {}
+                for tid, rank in taxRanks.items():
+                    if not rank in major_level_to_abbr or not tid in taxParents: continue
+                    name = taxNames[tid]
+                    if _re_no_rank.search(name): continue
+
+                    ancestor = major.get(tid) or taxParents[tid]
+                    while ancestor != '1' and ancestor in taxParents and _re_no_rank.search(taxNames[ancestor]):
+                        ancestor = major.get(ancestor) or taxParents[ancestor]
+
+                    edges.setdefault((ancestor, rank, name), tid)
+                    names.setdefault((rank, name), []).append(tid)
+                _lineageIndex.update({'edges': edges, 'names': names})
+    return _lineageIndex
+
+def _hasAncestor(tid: str, ancestors: list) -> bool:
+    """Whether one of `ancestors` is an ancestor of the taxon"""
+    ancestors = set(ancestors)
+    parent = taxParents.get(tid)
+    while parent is not None and parent != tid:
+        if parent in ancestors:
+            return True
+        tid, parent = parent, taxParents.get(parent)
+    return False
+
+def _resolveLineage(lineage: str, sep: str) -> str:
+    """Resolve a lineage string to the deepest matching taxid, see `lineage2taxid()`"""
+    index = _lineagePaths()
+    edges, names = index['edges'], index['names']
+
+    candidates = None
+    for comp in lineage.split(sep):
+        match = _re_taxa.match(comp.strip())
+        if not match: continue
+        rank_abbr, name = match.groups()
+        rank = _gtdbRank(rank_abbr)
+
+        # missing ranks
+        if not rank in major_level_to_abbr or not name or _re_no_rank.search(name):
+            continue
+
+        # names with underscores for spaces (e.g. 's__Escherichia_coli')
+        for key in (name, name.replace('_', ' ')):
+            if candidates is None:
+                matched = [edges[('1', rank, key)]] if ('1', rank, key) in edges else names.get((rank, key), [])
+            else:
+                matched = [edges[(tid, rank, key)] for tid in candidates if (tid, rank, key) in edges]
+                # ranks empty or skipped in the lineage (e.g. 'o__')
+                if not matched:
+                    matched = [tid for tid in names.get((rank, key), []) if _hasAncestor(tid, candidates)]
+            if matched: break
+
+        # stop at the deepest match
+        if not matched: break
+        candidates = matched
+
+    if not candidates:
+        return "unknown"
+    elif len(candidates) == 1:
+        return candidates[0]
+    else:
+        # homonyms without a distinguishing ancestor in the lineage
+        return lca_taxid(candidates)
+
+@_releaseArg
+def lineage2taxid(lineage: str, sep: str=';') -> str:
+    """
+    Get the taxonomic ID of a lineage string of rank-prefixed names (e.g. MGnify 'sk__Bacteria;p__...;g__X'
+    or GTDB 'd__Bacteria;...;s__Y'). Each name is looked up under the taxon matched by the names above it,
+    so homonyms elsewhere in the tree don't match. A lineage may be partial (e.g. 'g__X;s__Y'); empty names
+    and names for missing ranks (e.g. 'Bacillus - no_f_rank') are skipped. The index of lineage paths is 
+    built on the first call.
+
+    Args:
+        lineage (str): A lineage string.
+        sep (str, optional): Separator of the lineage string. Defaults to ';'.
+
+    Returns:
+        str: Taxonomy ID of the deepest matching taxon, the LCA of the matches if the lineage matches homonyms,
+            or "unknown".
+    """
+    _checkTaxonomy(None)
+    return _resolveLineage(lineage, sep)
+
+@_releaseArg
+def lineage2taxid_many(lineages: list, sep: str=';') -> list:
+    """
+    Get the taxonomic IDs of many lineage strings; each distinct lineage is resolved once.
+
+    Returns:
+        list: Taxonomy IDs of the lineages, see `lineage2taxid()`.
+    """
+    _checkTaxonomy(None)
+    results = {lineage: _resolveLineage(lineage, sep) for lineage in dict.fromkeys(lineages)}
+    return [results[lineage] for lineage in lineages]
+
+@_releaseArg
 def taxid2nameOnRank(tid: Union[int, str], target_rank=None) -> str:
     """
     Get the taxonomic name of a given taxonomic ID at a specific rank.
@@ -501,6 +1278,7 @@ def taxid2nameOnRank(tid: Union[int, str], target_rank=None) -> str:
     else:
         return ""
 
+@_releaseArg
 def taxid2taxidOnRank(tid: Union[int, str], target_rank=None ) -> str:
     """
     Returns the taxonomy ID of the nearest parent taxon at the specified rank.
@@ -534,6 +1312,7 @@ def taxid2taxidOnRank(tid: Union[int, str], target_rank=None ) -> str:
     else:
         return ""
 
+@_releaseArg
 def taxidIsLeaf(tid: Union[int, str]) -> bool:
     """
     Checks if the taxonomy ID corresponds to a leaf node in the taxonomic tree.
@@ -554,6 +1333,7 @@ def taxidIsLeaf(tid: Union[int, str]) -> bool:
         return False
 
 
+@_releaseArg
 def taxid2fullLineage(tid: Union[int, str], sep: str='|', use_rank_abbr=False, space2underscore=True) -> str:
     """
     Returns the full lineage of the target taxon in a specified format.
@@ -591,6 +1371,7 @@ def taxid2fullLineage(tid: Union[int, str], sep: str='|', use_rank_abbr=False, s
     else:
         return sep.join(texts)
 
+@_releaseArg
 def taxid2fullLinkDict(tid: Union[int, str]) -> str:
     """
     Returns a dictionary containing the full lineage of the target taxon.
@@ -604,6 +1385,7 @@ def taxid2fullLinkDict(tid: Union[int, str]) -> str:
     """
     return _taxid2fullLink(tid)
 
+@_releaseArg
 def taxid2nearestMajorTaxid(tid: Union[int, str]) -> str:
     """
     Returns the taxonomy ID of the nearest parent taxon at a major rank.
@@ -618,16 +1400,10 @@ def taxid2nearestMajorTaxid(tid: Union[int, str]) -> str:
 
     tid = _checkTaxonomy(tid)
     if tid == "unknown": return "unknown"
-    ptid = _getTaxParent(tid)
-    while ptid != '1':
-        tmp = _getTaxRank(ptid)
-        if tmp in major_level_to_abbr:
-            return ptid
-        else:
-            ptid = _getTaxParent(ptid)
-
-    return "1"
+    # only nearest major taxa other than the parents are kept
+    return _derivedAttributes()['major'].get(tid) or _getTaxParent(tid)
 
+@_releaseArg
 def taxid2lineage(tid: Union[int, str], all_major_rank=True, print_strain=False, space2underscore=False, sep="|") -> str:
     """
     Returns the taxonomic lineage for a given taxonomic identifier (tid) as a formatted string.
@@ -659,9 +1435,302 @@ def taxid2lineage(tid: Union[int, str], all_major_rank=True, print_strain=False,
     else:
         return sep.join(texts) 
 
+@_releaseArg
 def taxid2lineageDICT(tid: Union[int, str], all_major_rank=True, print_strain=True, space2underscore=False, guess_type=False):
     return _taxid2lineage( tid, all_major_rank, print_strain, space2underscore, guess_type)
 
+def _lineageRoots() -> list:
+    """Taxa without a parent in the loaded taxonomy"""
+    return [tid for tid, parent in taxParents.items() if parent == tid or not parent in taxParents]
+
+def _lineageChildState(tid: str, state: tuple, opts: tuple) -> tuple:
+    """Extend the lineage state of a taxon to the state shared by all of its children"""
+    anc, end, nmtid, full = state
+    sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr = opts
+    name = taxNames[tid]
+    rank = taxRanks[tid]
+
+    # taxa at major ranks of the ancestors (the topmost one wins); a walk up stops at 'root'
+    if name == 'root':
+        c_anc, c_end = {}, tid
+    elif rank in major_level_to_abbr and not rank in anc:
+        c_anc, c_end = dict(anc), end
+        c_anc[rank] = (tid, name)
+    else:
+        c_anc, c_end = anc, end
+
+    # nearest ancestor at a major rank
+    if tid == '1':
+        c_nmtid = '1'
+    elif rank in major_level_to_abbr:
+        c_nmtid = tid
+    else:
+        c_nmtid = nmtid
+
+    # full lineage
+    c_full = ''
+    if full_lineage and tid != '1' and name:
+        c_full = _lineageFullText(tid, opts)
+        if full: c_full = full + sep + c_full
+
+    return (c_anc, c_end, c_nmtid, c_full)
+
+def _lineageFullText(tid: str, opts: tuple) -> str:
+    """A taxon in the format of `taxid2fullLineage()`"""
+    sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr = opts
+    rank = taxRanks[tid]
+    if use_rank_abbr and (rank in major_level_to_abbr):
+        rank =  major_level_to_abbr[rank]
+    if sep == ';':
+        return f"{rank}__{taxNames[tid]}"
+    else:
+        return f"{rank}|{tid}|{taxNames[tid]}"
+
+def _lineageFormat(tid: str, state: tuple, opts: tuple) -> str:
+    """Format the lineage of a taxon from the lineage state shared with its siblings"""
+    anc, end, nmtid, full = state
+    sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr = opts
+    name = taxNames[tid]
+
+    if full_lineage:
+        if not name:
+            lineage = ''
+        elif full:
+            lineage = full + sep + _lineageFullText(tid, opts)
+        else:
+            lineage = _lineageFullText(tid, opts)
+    else:
+        # same as `taxid2rank()`
+        rank = taxRanks[tid]
+        if rank == "no rank":
+            if not tid in taxNumChilds:
+                rank = "strain"
+            elif taxRanks.get(nmtid) == "species":
+                rank = "species - others"
+            else:
+                rank = "others"
+
+        taxa = dict(anc)
+        if rank in major_level_to_abbr and not rank in taxa:
+            taxa[rank] = (tid, name)
+
+        # fill missing major ranks above the taxon
+        if all_major_rank:
+            ranks = list(abbr_to_major_level.keys())
+            ranks.reverse()
+            if rank in major_level_to_abbr:
+                idx = ranks.index( major_level_to_abbr[rank] )
+            elif nmtid == '1':
+                idx = 7
+            else:
+                idx = ranks.index( major_level_to_abbr[taxRanks[nmtid]] )
+
+            last = name
+            for lvl in ranks[idx:]:
+                major_rank = abbr_to_major_level[lvl]
+                if not (major_rank in taxa and taxa[major_rank][1]):
+                    taxa[major_rank] = (0, f'{last} - no_{lvl}_rank')
+                last = taxa[major_rank][1]
+
+        if print_strain and rank == "strain":
+            taxa["strain"] = (end, name)
+
+        texts = []
+        for rank in major_level_to_abbr:
+            if rank in taxa:
+                if print_strain==False and rank=="strain":
+                    continue
+                if sep == ";":
+                    texts.append( f"{major_level_to_abbr[rank]}__{taxa[rank][1]}" )
+                else:
+                    texts.append( f"{rank}|{taxa[rank][0]}|{taxa[rank][1]}" )
+        lineage = sep.join(texts)
+
+    if space2underscore:
+        return lineage.replace(' ', '_')
+    else:
+        return lineage
+
+def _lineageState(tid: str, opts: tuple) -> Optional[tuple]:
+    """Build the lineage state of a taxon top-down from its path to the root. Returns None for a root."""
+    path = []
+    parent = taxParents[tid]
+    while parent != tid and parent in taxParents:
+        path.append(parent)
+        tid = parent
+        parent = taxParents[tid]
+
+    if not path:
+        return None
+
+    state = ({}, parent, '1', '')
+    for tid in reversed(path):
+        state = _lineageChildState(tid, state, opts)
+    return state
+
+def _lineageSubtree(tid: str, opts: tuple, subtree: bool=True):
+    """Yield (tid, lineage) of a taxon and its descendants in preorder; each child extends the state of its parent."""
+    sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr = opts
+    children = _childrenIndex()
+
+    stack = [(tid, _lineageState(tid, opts))]
+    while stack:
+        tid, state = stack.pop()
+        if state is None:
+            # root
+            if full_lineage:
+                lineage = taxid2fullLineage(tid, sep, use_rank_abbr, space2underscore)
+            else:
+                lineage = taxid2lineage(tid, all_major_rank, print_strain, space2underscore, sep)
+            state = ({}, taxParents[tid], '1', '')
+        else:
+            lineage = _lineageFormat(tid, state, opts)
+        yield tid, lineage
+
+        if subtree and tid in children:
+            c_state = _lineageChildState(tid, state, opts)
+            for c_tid in reversed(children[tid]):
+                stack.append((c_tid, c_state))
+
+def _lineageShards(num_shards: int) -> list:
+    """Split the tree into batches of (tid, with_subtree) of similar sizes, in preorder"""
+    children = _childrenIndex()
+    roots = _lineageRoots()
+
+    # subtree sizes
+    order = []
+    stack = roots[::-1]
+    while stack:
+        tid = stack.pop()
+        order.append(tid)
+        if tid in children: stack.extend(reversed(children[tid]))
+    size = {}
+    for tid in reversed(order):
+        n = 1
+        if tid in children:
+            for c_tid in children[tid]: n += size[c_tid]
+        size[tid] = n
+
+    # big subtrees are split into their children
+    target = max(1, len(order)//num_shards)
+    shards = []
+    batch, batch_size = [], 0
+    stack = roots[::-1]
+    while stack:
+        tid = stack.pop()
+        if size[tid] <= target:
+            batch.append((tid, True))
+            batch_size += size[tid]
+        else:
+            batch.append((tid, False))
+            batch_size += 1
+            stack.extend(reversed(children[tid]))
+        if batch_size >= target:
+            shards.append(batch)
+            batch, batch_size = [], 0
+    if batch:
+        shards.append(batch)
+    return shards
+
+def _lineageShard(args: tuple) -> tuple:
+    """Format the lineages of a shard in a worker process"""
+    batch, opts = args
+    lines = []
+    for tid, subtree in batch:
+        for c_tid, lineage in _lineageSubtree(tid, opts, subtree):
+            lines.append(f"{c_tid}\t{lineage}\n")
+    return ''.join(lines), len(lines)
+
+def iterLineages(tid: Optional[Union[int, str]] = None, 
+                 sep: str='|', 
+                 full_lineage: bool=False, 
+                 all_major_rank: bool=True, 
+                 print_strain: bool=False, 
+                 space2underscore: bool=False, 
+                 use_rank_abbr: bool=False):
+    """
+    Generate lineages of a taxon and all of its descendants (or the whole tree) in one top-down traversal.
+    Each lineage extends the lineage of its parent instead of walking up the tree. 
+    Lineages are in the same format as `taxid2lineage()` or `taxid2fullLineage()`.
+
+    Args:
+        tid (Union[int, str], optional): Taxonomy ID of the top taxon. Defaults to None (whole tree).
+        sep (str): Separator, '|' or ';'. Defaults to '|'.
+        full_lineage (bool): Output lineages of all ranks like `taxid2fullLineage()`. Defaults to False.
+        all_major_rank (bool): Fill missing major ranks like `taxid2lineage()`. Defaults to True.
+        print_strain (bool): Include strains like `taxid2lineage()`. Defaults to False.
+        space2underscore (bool): Replace spaces with underscores. Defaults to False.
+        use_rank_abbr (bool): Use abbreviated ranks in full lineages. Defaults to False.
+
+    Returns:
+        Iterator of (tid, lineage).
+    """
+    _checkTaxonomy(None)
+    opts = (sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr)
+
+    if tid is None:
+        tids = _lineageRoots()
+    else:
+        tid = _checkTaxonomy(tid)
+        if tid == "unknown": return
+        tids = [tid]
+
+    for tid in tids:
+        yield from _lineageSubtree(tid, opts)
+
+def dumpLineages(output_file: Optional[str] = None, 
+                 sep: str='|', 
+                 full_lineage: bool=False, 
+                 all_major_rank: bool=True, 
+                 print_strain: bool=False, 
+                 space2underscore: bool=False, 
+                 use_rank_abbr: bool=False,
+                 jobs: int=1) -> int:
+    """
+    Write lineages of all taxa (tid and lineage per line) in one top-down traversal. 
+    The tree is split into subtrees and formatted by `jobs` processes; the output order
+    is the same in all cases.
+
+    Args:
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        sep (str): Separator, '|' or ';'. Defaults to '|'.
+        full_lineage (bool): Output lineages of all ranks like `taxid2fullLineage()`. Defaults to False.
+        all_major_rank (bool): Fill missing major ranks like `taxid2lineage()`. Defaults to True.
+        print_strain (bool): Include strains like `taxid2lineage()`. Defaults to False.
+        space2underscore (bool): Replace spaces with underscores. Defaults to False.
+        use_rank_abbr (bool): Use abbreviated ranks in full lineages. Defaults to False.
+        jobs (int): Number of processes. Defaults to 1.
+
+    Returns:
+        int: Number of lineages.
+    """
+    _checkTaxonomy(None)
+    opts = (sep, full_lineage, all_major_rank, print_strain, space2underscore, use_rank_abbr)
+
+    count = 0
+    f = open(output_file, 'w') if output_file else sys.stdout
+
+    # worker processes share the loaded taxonomy by forking
+    if jobs > 1 and hasattr(os, 'fork'):
+        import multiprocessing
+        shards = _lineageShards(jobs*8)
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            for text, n in pool.imap(_lineageShard, [(batch, opts) for batch in shards]):
+                f.write(text)
+                count += n
+    else:
+        for tid in _lineageRoots():
+            for c_tid, lineage in _lineageSubtree(tid, opts):
+                f.write(f"{c_tid}\t{lineage}\n")
+                count += 1
+
+    if output_file:
+        f.close()
+    logger.info( f"{count} lineages written to {output_file if output_file else 'STDOUT'}." )
+
+    return count
+
+@_releaseArg
 def lca_taxid(taxids: list) -> str:
     """ lca_taxid
     Return lowest common ancestor (LCA) taxid of input taxids
@@ -692,6 +1761,290 @@ def lca_taxid(taxids: list) -> str:
 
     return '1'
 
+def _scanAcc2taxid(acc: str, accession2taxid_file: str) -> str:
+    """Look up an accession by streaming through a sorted accession2taxid file"""
+    with _openFile(accession2taxid_file) as f:
+        for line in f:
+            accNew, accNewVer, tid = line.split('\t', 3)[:3]
+            if accNew == acc:
+                return tid.strip()
+            elif accNew > acc and accNew != 'accession':
+                break
+    return ""
+
+def _bgzfReadBlock(f, offset: int):
+    """Read and decompress the BGZF block at `offset`. Returns the data and the offset of the next block."""
+    import zlib
+    f.seek(offset)
+    header = f.read(18)
+    if len(header) < 18:
+        return None, offset
+    bsize = int.from_bytes(header[16:18], 'little') + 1
+    cdata = f.read(bsize-18)
+    return zlib.decompress(cdata[:-8], -15), offset+bsize
+
+def _bgzfNextBlock(f, pos: int, end: int) -> Optional[int]:
+    """Find the offset of the first BGZF block at or after `pos` and before `end`"""
+    import zlib
+    while pos < end:
+        f.seek(pos)
+        buf = f.read(0x20000)
+        idx = buf.find(b'\x1f\x8b\x08\x04')
+        while idx != -1 and pos+idx < end:
+            if buf[idx+12:idx+14] == b'BC':
+                try:
+                    _bgzfReadBlock(f, pos+idx)
+                    return pos+idx
+                except (zlib.error, IndexError):
+                    pass
+            idx = buf.find(b'\x1f\x8b\x08\x04', idx+1)
+        if len(buf) < 0x20000:
+            break
+        pos += len(buf)-3
+    return None
+
+def _bgzfAcc2taxid(acc: str, accession2taxid_file: str) -> str:
+    """
+    Look up an accession in a sorted accession2taxid file compressed with `bgzip`. The file is bisected
+    on BGZF block boundaries, so only a few 64kb blocks are decompressed for each lookup.
+    """
+    key = acc.encode()
+
+    with open( accession2taxid_file, 'rb' ) as f:
+        f.seek(0, 2)
+        start = 0
+        end = f.tell()
+        best = 0
+
+        # the first accessions of visited blocks, shared by all lookups of this file
+        if not accession2taxid_file in _bgzfBlockKeys:
+            _bgzfBlockKeys[accession2taxid_file] = {}
+        blockKeys = _bgzfBlockKeys[accession2taxid_file]
+
+        # find the last block whose first complete line is <= acc
+        while start < end:
+            pos = (start+end)//2
+            if (pos, end) in blockKeys:
+                offset, accNew = blockKeys[(pos, end)]
+            else:
+                offset = _bgzfNextBlock(f, pos, end)
+                accNew = b''
+                if offset is not None:
+                    data, nextOffset = _bgzfReadBlock(f, offset)
+                    idx = data.find(b'\n')
+                    # the first complete line of the block may continue in the next block
+                    while idx != -1 and data.find(b'\t', idx+1) == -1 and nextOffset < end:
+                        more, nextOffset = _bgzfReadBlock(f, nextOffset)
+                        if not more: break
+                        data += more
+                    accNew = data[idx+1:].split(b'\t', 1)[0] if idx != -1 else b''
+                blockKeys[(pos, end)] = (offset, accNew)
+
+            if offset is None:
+                end = pos
+            elif accNew and accNew <= key:
+                best = offset
+                start = offset+1
+            else:
+                end = pos
+
+        # search lines from that block
+        offset = best
+        needle = b'\n' + key + b'\t'
+        buf = b'' if best else b'\n'
+        while True:
+            data, offset = _bgzfReadBlock(f, offset)
+            buf += data
+
+            idx = buf.find(needle)
+            if idx != -1:
+                end = buf.find(b'\n', idx+1)
+                # the line continues in the next block
+                if end == -1 and data: continue
+                return buf[idx+1:end if end != -1 else None].split(b'\t', 3)[2].decode().strip()
+            elif not data:
+                break
+
+            # stop once the last complete line is past acc
+            end = buf.rfind(b'\n')
+            if end > 0:
+                accNew = buf[buf.rfind(b'\n', 0, end)+1:end].split(b'\t', 1)[0]
+                if accNew > key and accNew != b'accession':
+                    break
+                buf = buf[end:]
+
+    return ""
+
+def bgzipFile(input_file: str, output_file: str) -> None:
+    """
+    Compress a plain or compressed text file to BGZF (the `bgzip` format), a gzip file of independent 
+    64kb blocks that can be searched without decompressing the whole file (e.g. accession2taxid files).
+
+    Args:
+        input_file (str): Path of the input file.
+        output_file (str): Path of the output .gz file.
+
+    Returns:
+        None
+    """
+    import zlib
+    import struct
+
+    def _block(data):
+        c = zlib.compressobj(6, zlib.DEFLATED, -15)
+        cdata = c.compress(data) + c.flush()
+        header = struct.pack('<4BI2BH2BHH', 0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, 66, 67, 2, len(cdata)+25)
+        return header + cdata + struct.pack('<II', zlib.crc32(data), len(data))
+
+    with _openFile(input_file, 'rb') as fin, open(output_file, 'wb') as fout:
+        while True:
+            data = fin.read(0xff00)
+            if not data: break
+            fout.write(_block(data))
+        # empty EOF block
+        fout.write(_block(b''))
+
+# accession formats: letters as 'A' and digits as '9', e.g. 'NC_000913' -> 'AA_999999'
+_acc_format_table = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789', 'A'*52 + '9'*10)
+
+def _bloomBits(acc: str, num_bits: int, num_hashes: int) -> list:
+    """Bits of an accession in a Bloom filter (double hashing of a 128-bit BLAKE2 digest)"""
+    h = hashlib.blake2b(acc.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(h[:8], 'little')
+    h2 = int.from_bytes(h[8:], 'little') | 1
+    return [(h1 + i*h2) % num_bits for i in range(num_hashes)]
+
+def _accCount(accession2taxid_file: str) -> int:
+    """
+    Number of accessions of an accession2taxid file to size its Bloom filter: the count of an earlier index,
+    an estimate from the size and the first lines of a plain file, or the number of lines of a compressed file
+    """
+    import json
+    routes_file = f"{accession2taxid_file}.routes.json"
+    if os.path.isfile(routes_file):
+        with open(routes_file) as f:
+            index = json.load(f)
+        if 'count' in index:
+            return index['count']
+
+    if _compression(accession2taxid_file):
+        num_lines = 0
+        with _openFile(accession2taxid_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1<<20), b''):
+                num_lines += chunk.count(b'\n')
+        return num_lines
+
+    with open(accession2taxid_file, 'rb') as f:
+        lines = f.readlines(1<<20)
+    if not len(lines):
+        return 0
+    # 10% more for longer accessions further down
+    return int(os.path.getsize(accession2taxid_file) / sum(len(line) for line in lines) * len(lines) * 1.1) + 1
+
+def indexAcc2taxid(accession2taxid_file: str, bits_per_key: int = 10) -> dict:
+    """
+    Index an accession2taxid file for `acc2taxid()`: the key ranges of accession formats (e.g. 'AAAA99999999' 
+    of WGS accessions) and a Bloom filter of the accessions, saved next to the file as `<file>.routes.json`
+    and `<file>.bloom`. Lookups skip the files without the format or range of an accession, or certainly 
+    without the accession. The file is parsed once; the filter is sized by the number of accessions of an
+    earlier index, or by an estimate (see `_accCount()`).
+
+    Args:
+        accession2taxid_file (str): Path of a plain or compressed accession2taxid file.
+        bits_per_key (int, optional): Size of the Bloom filter per accession; 10 bits keep about 1% of 
+            lookups of missing accessions. Defaults to 10.
+
+    Returns:
+        dict: The key ranges ({format: [first, last]}).
+    """
+    import json
+    import math
+
+    num_bits = max(_accCount(accession2taxid_file)*bits_per_key, 64)
+    num_hashes = max(round(bits_per_key*math.log(2)), 1)
+    bloom = bytearray((num_bits+7)//8)
+    blake2b = hashlib.blake2b
+
+    logger.info( f"Indexing accession formats and building Bloom filter of {accession2taxid_file}" )
+    routes = {}
+    num_accs = 0
+    with _openFile(accession2taxid_file) as f:
+        for line in f:
+            acc = line.split('\t', 1)[0]
+            if acc == 'accession': continue
+            num_accs += 1
+            fmt = acc.translate(_acc_format_table)
+            if fmt in routes:
+                keys = routes[fmt]
+                if acc < keys[0]: keys[0] = acc
+                elif acc > keys[1]: keys[1] = acc
+            else:
+                routes[fmt] = [acc, acc]
+
+            # same bits as `_bloomBits()`
+            h = blake2b(acc.encode(), digest_size=16).digest()
+            h1 = int.from_bytes(h[:8], 'little')
+            h2 = int.from_bytes(h[8:], 'little') | 1
+            for i in range(num_hashes):
+                bit = (h1 + i*h2) % num_bits
+                bloom[bit >> 3] |= 1 << (bit & 7)
+
+    if num_accs*bits_per_key > num_bits*1.2:
+        logger.warning( f"Bloom filter of {accession2taxid_file} is undersized for {num_accs} accessions. Run `indexAcc2taxid()` again." )
+    with open(f"{accession2taxid_file}.bloom", 'wb') as f:
+        f.write(bloom)
+
+    stat = os.stat(accession2taxid_file)
+    with open(f"{accession2taxid_file}.routes.json", 'w') as f:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'count': num_accs, 'routes': routes, 
+                   'bloom': {'bits': num_bits, 'hashes': num_hashes}}, f)
+    _accIndexes.pop(accession2taxid_file, None)
+    logger.info( f"Done indexing {len(routes)} accession formats of {num_accs} accessions." )
+    return routes
+
+def _accFileIndex(accession2taxid_file: str) -> Optional[dict]:
+    """
+    The index of `indexAcc2taxid()`: 'routes' and 'bloom' (the memory-mapped filter, its numbers of bits and 
+    hashes). None if not indexed or changed since indexing.
+    """
+    if not accession2taxid_file in _accIndexes:
+        import json
+        index = None
+        routes_file = f"{accession2taxid_file}.routes.json"
+        if os.path.isfile(routes_file):
+            with open(routes_file) as f:
+                index = json.load(f)
+            stat = os.stat(accession2taxid_file)
+            if index['size'] != stat.st_size or index['mtime'] != stat.st_mtime:
+                logger.warning( f"{accession2taxid_file} changed after indexing. Run `indexAcc2taxid()` again." )
+                index = None
+            elif 'bloom' in index and os.path.isfile(f"{accession2taxid_file}.bloom"):
+                import mmap
+                with open(f"{accession2taxid_file}.bloom", 'rb') as f:
+                    bloom = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                index['bloom'] = (bloom, index['bloom']['bits'], index['bloom']['hashes'])
+            else:
+                index['bloom'] = None
+        _accIndexes[accession2taxid_file] = index
+    return _accIndexes[accession2taxid_file]
+
+def _accInFile(acc: str, accession2taxid_file: str) -> bool:
+    """Whether an accession (without version) may be in an accession2taxid file by its format, key range and Bloom filter"""
+    index = _accFileIndex(accession2taxid_file)
+    if index is None:
+        return True
+
+    keys = index['routes'].get(acc.translate(_acc_format_table))
+    if keys is None or not keys[0] <= acc <= keys[1]:
+        return False
+
+    if index['bloom']:
+        bloom, num_bits, num_hashes = index['bloom']
+        for bit in _bloomBits(acc, num_bits, num_hashes):
+            if not bloom[bit >> 3] & (1 << (bit & 7)):
+                return False
+    return True
+
 def acc2taxid_raw(acc: str, accession2taxid_file: Optional[str] = None) -> str:
     """
     Get the taxonomy ID for a given accession from NCBI accession2taxid tsv file.
@@ -707,59 +2060,61 @@ def acc2taxid_raw(acc: str, accession2taxid_file: Optional[str] = None) -> str:
     # Remove version number
     acc = acc.split('.')[0]
 
-    if not acc in accTid:
+    # only found accessions are cached; an accession missing in one file may be in another one
+    if not accTid.get(acc):
         logger.info( f"acc2taxid from file: {accession2taxid_file}" )
+        compression = _compression(accession2taxid_file)
+
+        if compression == 'bgzf':
+            tid = _bgzfAcc2taxid(acc, accession2taxid_file)
+            if tid and not _frozen: accTid[acc] = tid
+            return tid
+        elif compression:
+            if not accession2taxid_file in _bgzfBlockKeys:
+                logger.warning( f"{accession2taxid_file} is not seekable. Compress it with `bgzip` for fast lookups." )
+                _bgzfBlockKeys[accession2taxid_file] = {}
+            tid = _scanAcc2taxid(acc, accession2taxid_file)
+            if tid and not _frozen: accTid[acc] = tid
+            return tid
+
         with open( accession2taxid_file ) as f:
             f.seek(0, 2)
             start = 0
             end = f.tell()
-            accCur = ""
-            
-            while( acc != accCur and start < end ):
-                posNew = (end+start)/2
+
+            # the smallest offset after which the first whole line has an accession >= acc
+            while start < end:
+                posNew = (end+start)//2
                 f.seek( posNew )
-                if posNew != start: f.readline()
-                line = f.readline()    
-                
-                logger.debug( "start: %15d, posNew: %15d, end: %15d, line: %s" % (start, posNew, end, line) )
-                if line :
-                    (accNew, accNewVer, tid, gi) = line.split('\t')
-                else:
-                    break
+                if posNew: f.readline()
+                line = f.readline()
 
-                logger.debug( f'[acc, accNew, accCur]=[{acc}, {accNew}, {accCur}]')
-                if acc > accNew and accCur != accNew and accNew:
-                    if accNew: posNew = f.tell()
-                    start = posNew
-                    if start >= end: end = start+1
+                logger.debug( "start: %15d, posNew: %15d, end: %15d, line: %s" % (start, posNew, end, line) )
+                accNew = line.split('\t', 1)[0]
+                if line and (accNew < acc or accNew == 'accession'):
+                    start = posNew + 1
                 else:
                     end = posNew
-                
-                accCur = accNew
+
+            f.seek( start )
+            if start: f.readline()
+            line = f.readline()
             f.close()
 
-            if accCur == acc:
-                accTid[acc] = tid.strip()
-            else:
-                accTid[acc] = ""
+            fields = line.split('\t')
+            if fields[0] != acc:
+                return ""
+            tid = fields[2].strip()
+            if not _frozen: accTid[acc] = tid
+            return tid
 
     return accTid[acc]
 
-def acc2taxid(acc: str, type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> str:
-    """
-    Get the taxonomy ID for a given accession.
-
-    Args:
-        acc (str): The accession number to look up.
-        type (str, optional): Type of the acession number, either nucl, prot, or pdb. Default is 'nucl'.
-
-    Returns:
-        str: The taxonomy ID for the given accession.
-    """
+def _acc2taxidFiles(type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> list:
+    """The available accession2taxid files of a type of accessions (or the mapping file)"""
     global taxonomy_dir
-    import glob
     acc2taxid_files = []
-    
+
     # preparing accession2taxid files
     if type == 'nucl':
         acc2taxid_files = [
@@ -789,6 +2144,7 @@ def acc2taxid(acc: str, type: Optional[str] = 'nucl', mapping_file: Optional[str
 
     for acc2taxid_file in acc2taxid_files:
         logger.debug( f"checking {acc2taxid_file}" )
+        acc2taxid_file = _findFile(acc2taxid_file)
         if os.path.isfile(acc2taxid_file):
             avail_acc2taxid_files.append(acc2taxid_file)
     
@@ -799,12 +2155,93 @@ def acc2taxid(acc: str, type: Optional[str] = 'nucl', mapping_file: Optional[str
         logger.info( f"NCBI accession2taxid data not found. Please run `detaxa update --help` for details." )
         print( f"WARNING: NCBI accession2taxid data not found. Please run `detaxa update --help` for details." )
 
-    for acc2taxid_file in avail_acc2taxid_files:
+    return avail_acc2taxid_files
+
+def acc2taxid(acc: str, type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> str:
+    """
+    Get the taxonomy ID for a given accession.
+
+    Args:
+        acc (str): The accession number to look up.
+        type (str, optional): Type of the acession number, either nucl, prot, or pdb. Default is 'nucl'.
+
+    Returns:
+        str: The taxonomy ID for the given accession.
+    """
+    key = acc.split('.')[0]
+    if key in accTid:
+        return accTid[key]
+
+    if not mapping_file and _sqliteStore is not None and _sqliteStore.meta.get('accessions', '0') != '0':
+        # accessions in the SQLite database
+        return _sqliteStore.acc2taxid(key)
+
+    # indexed files without the format, key range or Bloom filter bits of the accession are skipped
+    for acc2taxid_file in _acc2taxidFiles(type, mapping_file):
+        if not _accInFile(key, acc2taxid_file): continue
         taxid = acc2taxid_raw(acc, accession2taxid_file=acc2taxid_file)
         if taxid: return taxid
 
+    if not _frozen:
+        accTid[key] = ""
     return ""
 
+def _scanAcc2taxidMany(accs: set, accession2taxid_file: str) -> dict:
+    """Look up many accessions in one pass through a sorted accession2taxid file"""
+    found = {}
+    last = max(accs)
+    with _openFile(accession2taxid_file) as f:
+        for line in f:
+            accNew, accNewVer, tid = line.split('\t', 3)[:3]
+            if accNew in accs:
+                found[accNew] = tid.strip()
+                if len(found) == len(accs): break
+            elif accNew > last and accNew != 'accession':
+                break
+    return found
+
+def acc2taxid_many(accs: list, type: Optional[str] = 'nucl', mapping_file: Optional[str] = None) -> list:
+    """
+    Get the taxonomy IDs of many accessions. Each distinct accession is looked up once and in sorted order, 
+    and compressed accession2taxid files that are not seekable are streamed once for all accessions.
+
+    Args:
+        accs (list): Accession numbers.
+        type (str, optional): Type of the acession numbers, either nucl, prot, or pdb. Default is 'nucl'.
+        mapping_file (str, optional): An accession2taxid file. Defaults to None.
+
+    Returns:
+        list: Taxonomy IDs of the accessions ("" if not found).
+    """
+    keys = [acc.split('.')[0] for acc in accs]
+    found = {key: accTid[key] for key in set(keys) if key in accTid}
+    missing = sorted(set(keys).difference(found))
+
+    if len(missing):
+        if not mapping_file and _sqliteStore is not None and _sqliteStore.meta.get('accessions', '0') != '0':
+            return [acc2taxid(key) for key in keys]
+
+        for acc2taxid_file in _acc2taxidFiles(type, mapping_file):
+            batch = [key for key in missing if not found.get(key) and _accInFile(key, acc2taxid_file)]
+            if not len(batch): continue
+
+            compression = _compression(acc2taxid_file)
+            if compression and compression != 'bgzf':
+                found.update(_scanAcc2taxidMany(set(batch), acc2taxid_file))
+            else:
+                for key in batch:
+                    tid = acc2taxid_raw(key, accession2taxid_file=acc2taxid_file)
+                    if tid: found[key] = tid
+
+        for key in missing:
+            if not found.get(key):
+                found[key] = ""
+        if not _frozen:
+            accTid.update((key, found[key]) for key in missing)
+
+    return [found[key] for key in keys]
+
+@_releaseArg
 def taxid2decendentOnRank(tid: Union[int, str], target_rank=None) -> list:
     """
     Return a list of taxids for all descendants of the given taxid at the specified target rank.
@@ -835,18 +2272,284 @@ def taxid2decendentOnRank(tid: Union[int, str], target_rank=None) -> list:
 
         return tids
 
-def loadTaxonomy(dbpath: Optional[str] = None,
-                 cus_taxonomy_file: Optional[str] = None, 
-                 cus_taxonomy_format: str = 'tsv',
-                 auto_download: bool = True) -> None:
-    """
-    Load taxonomy files into memory for use in subsequent conversions.
+def _importNumpy():
+    try:
+        import numpy as np
+    except ImportError:
+        logger.fatal( "numpy is required for abundance roll-up." )
+        _die( "[ERROR] numpy is required for abundance roll-up. Install it with `pip install numpy`." )
+    return np
 
-    Args:
+def _getTreeArrays() -> dict:
+    """
+    Get the taxonomy as NumPy arrays (built once after a taxonomy is loaded):
+    'tids' (list), 'index' ({tid: node}), 'parent' (node of the parent, -1 for roots), 'depth' 
+    (depths of nodes) and 'levels' (arrays of nodes of each depth).
+    """
+    np = _importNumpy()
+
+    if not len(_treeArrays):
+        with _lock:
+            if not len(_treeArrays):
+                tids = list(taxParents)
+                depths = [taxDepths[tid] for tid in tids]
+                # GTDB and MGnify taxonomies have no parent of the root
+                if not '1' in taxParents and '1' in taxNames:
+                    tids.append('1')
+                    depths = [depth+1 for depth in depths] + [0]
+
+                index = {tid: i for i, tid in enumerate(tids)}
+                parent = np.fromiter((index.get(taxParents.get(tid), -1) for tid in tids), dtype=np.int64, count=len(tids))
+                nodes = np.arange(len(tids))
+                parent[parent == nodes] = -1
+
+                depths = np.array(depths, dtype=np.int64)
+                order = np.argsort(depths, kind='stable')
+                bounds = np.searchsorted(depths[order], np.arange(depths.max()+2))
+                levels = [order[bounds[d]:bounds[d+1]] for d in range(len(bounds)-1)]
+
+                _treeArrays.update({'tids': tids, 'index': index, 'parent': parent, 'depth': depths, 'levels': levels})
+    return _treeArrays
+
+@_releaseArg
+def rollupCounts(taxids, counts=None, ranks: Optional[list] = None) -> dict:
+    """
+    Roll up counts (e.g. reads) of taxids to all of their ancestors in one bottom-up pass over the tree.
+    Each distinct taxid is resolved once; merged taxids are counted to their current taxids. Requires numpy.
+
+    Args:
+        taxids (list or array): Taxonomy IDs.
+        counts (list or array, optional): Counts of the taxids. Defaults to None (1 per taxid).
+        ranks (list, optional): Only report taxa at these ranks (e.g. ['genus', 'species']). Defaults to None (all ranks).
+
+    Returns:
+        dict: Taxa with counts: 'taxid' (list), 'cumulative' (clade counts) and 'direct' (counts of the 
+            taxa themselves) in NumPy arrays, and the 'unclassified' count of taxid 0, unknown and deleted taxids.
+    """
+    np = _importNumpy()
+    _checkTaxonomy(None)
+
+    tree = _getTreeArrays()
+    index = tree['index']
+    parent = tree['parent']
+
+    # resolve distinct taxids; numeric taxids (e.g. NCBI) are sorted as integers, others are hashed
+    taxids = np.asarray(taxids)
+    if not np.issubdtype(taxids.dtype, np.integer):
+        try:
+            taxids = taxids.astype(np.int64)
+        except (ValueError, TypeError):
+            pass
+    if np.issubdtype(taxids.dtype, np.integer):
+        uniq, inverse = np.unique(taxids, return_inverse=True)
+    else:
+        try:
+            import pandas as pd
+            inverse, uniq = pd.factorize(taxids)
+        except ImportError:
+            uniq, inverse = np.unique(taxids.astype(str), return_inverse=True)
+    nodes = np.empty(len(uniq), dtype=np.int64)
+    for i, tid in enumerate(np.asarray(uniq).tolist()):
+        tid = str(tid)
+        if tid in taxMerged: tid = taxMerged[tid]
+        nodes[i] = index.get(tid, -1)
+    nodes = nodes[inverse.reshape(-1)]
+
+    weights = np.ones(len(nodes)) if counts is None else np.asarray(counts, dtype=np.float64)
+    classified = nodes >= 0
+    unclassified = weights[~classified].sum()
+
+    direct = np.bincount(nodes[classified], weights=weights[classified], minlength=len(parent))
+    cumulative = direct.copy()
+
+    # children before parents
+    for level in reversed(tree['levels'][1:]):
+        np.add.at(cumulative, parent[level], cumulative[level])
+
+    selected = cumulative > 0
+    if ranks:
+        rank_mask = np.fromiter((taxRanks.get(tid, 'root') in ranks for tid in tree['tids']), dtype=bool, count=len(parent))
+        selected &= rank_mask
+    selected = np.flatnonzero(selected)
+
+    # integer counts stay integers
+    if counts is None or np.issubdtype(np.asarray(counts).dtype, np.integer):
+        cumulative = cumulative.astype(np.int64)
+        direct = direct.astype(np.int64)
+        unclassified = int(unclassified)
+
+    return {
+        'taxid': [tree['tids'][i] for i in selected],
+        'cumulative': cumulative[selected],
+        'direct': direct[selected],
+        'unclassified': unclassified,
+    }
+
+# rank codes of Kraken reports
+_kraken_rank_codes = {
+    "root"         : "R",
+    "superkingdom" : "D",
+    "domain"       : "D",
+    "kingdom"      : "K",
+    "phylum"       : "P",
+    "class"        : "C",
+    "order"        : "O",
+    "family"       : "F",
+    "genus"        : "G",
+    "species"      : "S",
+}
+
+def rollupReport(rollup: dict, output_file: Optional[str] = None) -> None:
+    """
+    Write rolled up counts from `rollupCounts()` (of all ranks) as a Kraken-style report: percentage, 
+    cumulative count, direct count, rank code, taxid and indented name, children sorted by cumulative counts.
+
+    Args:
+        rollup (dict): Rolled up counts from `rollupCounts()`.
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+    """
+    children = _childrenIndex()
+    cumulative = dict(zip(rollup['taxid'], rollup['cumulative'].tolist()))
+    direct = dict(zip(rollup['taxid'], rollup['direct'].tolist()))
+    unclassified = rollup['unclassified']
+    roots = [tid for tid in cumulative if taxParents.get(tid, tid) == tid or not taxParents[tid] in cumulative]
+    total = sum(cumulative[tid] for tid in roots) + unclassified
+
+    f = open(output_file, 'w') if output_file else sys.stdout
+    if unclassified:
+        f.write(f"{100*unclassified/total:.2f}\t{unclassified}\t{unclassified}\tU\t0\tunclassified\n")
+
+    # preorder; (tid, depth of indentation, rank code of the nearest ancestor and number of taxa below it)
+    stack = [(tid, 0, 'R', -1) for tid in sorted(roots, key=lambda tid: cumulative[tid])]
+    while stack:
+        tid, indent, code, offset = stack.pop()
+        rank = "root" if tid == '1' else taxRanks.get(tid, "no rank")
+        if rank in _kraken_rank_codes:
+            code, offset = _kraken_rank_codes[rank], 0
+        else:
+            offset += 1
+        rank_code = code if offset <= 0 else f"{code}{offset}"
+
+        f.write(f"{100*cumulative[tid]/total:.2f}\t{cumulative[tid]}\t{direct[tid]}\t{rank_code}\t{tid}\t{'  '*indent}{taxNames.get(tid, '')}\n")
+
+        c_tids = [c_tid for c_tid in children.get(tid, []) if c_tid in cumulative]
+        c_tids.sort(key=lambda c_tid: cumulative[c_tid])
+        for c_tid in c_tids:
+            stack.append((c_tid, indent+1, code, offset))
+
+    if output_file:
+        f.close()
+
+@_releaseArg
+def taxDistanceMatrix(taxids, metric: str = 'edges', dtype='float32'):
+    """
+    Pairwise tree distances of taxids as a condensed matrix (the layout of `scipy.spatial.distance.pdist`, 
+    `scipy.spatial.distance.squareform` converts it to a square matrix). Requires numpy.
+
+    Taxa are sorted in the depth-first order of the tree, so the depth of the LCA of two taxa is the lowest 
+    LCA depth of the adjacent taxa between them, and each row of the matrix is a vectorized pass. Memory 
+    other than the matrix is linear to the number of taxa.
+
+    Args:
+        taxids (list or array): Taxonomy IDs.
+        metric (str, optional): 'edges' for the number of edges of the path through the LCA, or 'rank' for 
+            the number of major ranks (`major_level_to_abbr`) below the deepest one shared by both taxa, 
+            e.g. 1 for taxa of the same species. Defaults to 'edges'.
+        dtype (optional): NumPy data type of the distances. Defaults to 'float32'.
+
+    Returns:
+        An array of n*(n-1)/2 distances of the pairs (i, j), i < j. Distances of unknown taxids are NaN 
+            (-1 for signed integer types, the maximum value of unsigned types).
+    """
+    np = _importNumpy()
+    _checkTaxonomy(None)
+
+    if not metric in ('edges', 'rank'):
+        logger.fatal( f"Unknown distance metric: {metric}." )
+        _die( f"[ERROR] Unknown distance metric: {metric}. Use 'edges' or 'rank'." )
+
+    tree = _getTreeArrays()
+    index = tree['index']
+    parent = tree['parent']
+    depth = tree['depth']
+
+    # resolve distinct taxids
+    uniq, inverse = np.unique(np.asarray(taxids).astype(str), return_inverse=True)
+    nodes = np.empty(len(uniq), dtype=np.int64)
+    for i, tid in enumerate(uniq.tolist()):
+        if tid in taxMerged: tid = taxMerged[tid]
+        nodes[i] = index.get(tid, -1)
+    nodes = nodes[inverse.reshape(-1)]
+
+    n = len(nodes)
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.floating):
+        missing = np.nan
+    elif np.issubdtype(dtype, np.signedinteger):
+        missing = -1
+    else:
+        missing = np.iinfo(dtype).max
+    dist = np.full(n*(n-1)//2, missing, dtype=dtype)
+    known = np.flatnonzero(nodes >= 0)
+    if len(known) < 2:
+        return dist
+
+    # ancestors of the taxa at each depth (-1 below the taxa)
+    q = nodes[known]
+    anc = np.full((len(q), depth[q].max()+1), -1, dtype=np.int64)
+    rows, cur, d = np.arange(len(q)), q, depth[q]
+    while len(rows):
+        anc[rows, d] = cur
+        keep = (d > 0) & (parent[cur] >= 0)
+        rows, cur, d = rows[keep], parent[cur[keep]], d[keep]-1
+
+    # depth-first order: ancestors before descendants, clades contiguous
+    order = np.lexsort(anc.T[::-1])
+    anc = anc[order]
+    pos = known[order]
+    q_depth = depth[q[order]]
+    adj = ((anc[:-1] == anc[1:]) & (anc[:-1] >= 0)).sum(axis=1) - 1
+
+    if metric == 'rank':
+        # the deepest major rank of each ancestor path
+        rank_pos = {rank: i for i, rank in enumerate(major_level_to_abbr)}
+        tids = tree['tids']
+        mask = anc >= 0
+        anc_uniq, anc_inverse = np.unique(anc[mask], return_inverse=True)
+        levels = np.full(anc.shape, -1, dtype=np.int64)
+        levels[mask] = np.array([rank_pos.get(taxRanks.get(tids[x]), -1) for x in anc_uniq.tolist()], dtype=np.int64)[anc_inverse]
+        levels = np.maximum.accumulate(levels, axis=1)
+        num_ranks = len(rank_pos)
+
+    for i in range(len(pos)-1):
+        lca_depth = np.minimum.accumulate(adj[i:])
+        if metric == 'edges':
+            row = q_depth[i] + q_depth[i+1:] - 2*lca_depth
+        else:
+            row = num_ranks - 1 - np.where(lca_depth >= 0, levels[i, np.maximum(lca_depth, 0)], -1)
+
+        # condensed indices of the pairs in the input order
+        lo = np.minimum(pos[i], pos[i+1:])
+        hi = np.maximum(pos[i], pos[i+1:])
+        dist[lo*(2*n-lo-1)//2 + hi-lo-1] = row
+
+    return dist
+
+def loadTaxonomy(dbpath: Optional[str] = None,
+                 cus_taxonomy_file: Optional[str] = None, 
+                 cus_taxonomy_format: str = 'tsv',
+                 auto_download: bool = True,
+                 lazy_names: bool = False) -> None:
+    """
+    Load taxonomy files into memory for use in subsequent conversions.
+
+    Args:
         dbpath (str, optional): Path to store and load the taxonomy files. Defaults to None.
         cus_taxonomy_file (str, optional): Path to a custom taxonomy file. Defaults to None.
         cus_taxonomy_format (str, optional): Format of the custom taxonomy file, one of ['tsv','mgnify_lineage','gtdb_taxonomy','gtdb_metadata']. Defaults to 'tsv'.
         auto_download (bool, optional): If True, automatically download the taxonomy files if they are not found locally. Defaults to True.
+        lazy_names (bool, optional): Load only the tree of NCBI dumps and read names from names.dmp on demand,
+            for jobs that mostly need parents and ranks. Defaults to False.
 
     Returns:
         None
@@ -854,6 +2557,7 @@ def loadTaxonomy(dbpath: Optional[str] = None,
     global taxonomy_dir, abbr_json_path
     
     logger.debug( f"v{__version__}" )
+    _checkWritable()
 
     if dbpath:
         if os.path.isdir(dbpath):
@@ -872,17 +2576,18 @@ def loadTaxonomy(dbpath: Optional[str] = None,
     taxdump_tgz_file = taxonomy_dir+"/taxdump.tar.gz"
 
     #raw taxonomy dmp files from NCBI
-    names_dmp_file = taxonomy_dir+"/names.dmp"
-    nodes_dmp_file = taxonomy_dir+"/nodes.dmp"
-    merged_dmp_file = taxonomy_dir+"/merged.dmp"
+    names_dmp_file = _findFile(taxonomy_dir+"/names.dmp")
+    nodes_dmp_file = _findFile(taxonomy_dir+"/nodes.dmp")
+    merged_dmp_file = _findFile(taxonomy_dir+"/merged.dmp")
+    delnodes_dmp_file = _findFile(taxonomy_dir+"/delnodes.dmp")
 
     #parsed taxonomy tsv file
-    taxonomy_file = taxonomy_dir+"/taxonomy.tsv"
-    merged_taxonomy_file = taxonomy_dir+"/taxonomy.merged.tsv"
+    taxonomy_file = _findFile(taxonomy_dir+"/taxonomy.tsv")
+    merged_taxonomy_file = _findFile(taxonomy_dir+"/taxonomy.merged.tsv")
 
     #custom taxonomy file
     if not cus_taxonomy_file:
-        cus_taxonomy_file = taxonomy_dir+"/taxonomy.custom.tsv"
+        cus_taxonomy_file = _findFile(taxonomy_dir+"/taxonomy.custom.tsv")
 
     # checking if taxonomy files provided
     if not os.path.isfile( taxdump_tgz_file ) \
@@ -899,15 +2604,19 @@ def loadTaxonomy(dbpath: Optional[str] = None,
             logger.fatal( f"No available taxonomy files." )
             _die( "[ERROR] No available taxonomy files." )
 
-    # try to load taxonomy from taxonomy.tsv
-    if os.path.isfile( nodes_dmp_file ) and os.path.isfile( names_dmp_file ):
-        loadNCBITaxonomy(taxdump_tgz_file, names_dmp_file, nodes_dmp_file, merged_dmp_file)
-    elif os.path.isfile(taxdump_tgz_file):
-        loadNCBITaxonomy(taxdump_tgz_file, names_dmp_file, nodes_dmp_file, merged_dmp_file)
-
+    # try to load taxonomy from taxonomy.tsv (e.g. written by `exportTaxonomyTSV()`) first
     if os.path.isfile(taxonomy_file):
         logger.info( "Open taxonomy file: %s"% taxonomy_file )
         loadTaxonomyTSV(taxonomy_file)
+        if os.path.isfile(merged_taxonomy_file):
+            loadMergedTSV(merged_taxonomy_file)
+        else:
+            # merged and deleted taxids of NCBI dumps next to the tsv
+            _loadMergedDmp(merged_dmp_file, delnodes_dmp_file)
+    elif os.path.isfile( nodes_dmp_file ) and os.path.isfile( names_dmp_file ):
+        loadNCBITaxonomy(taxdump_tgz_file, names_dmp_file, nodes_dmp_file, merged_dmp_file, delnodes_dmp_file, lazy_names)
+    elif os.path.isfile(taxdump_tgz_file):
+        loadNCBITaxonomy(taxdump_tgz_file, names_dmp_file, nodes_dmp_file, merged_dmp_file, delnodes_dmp_file, lazy_names)
 
     # try to load custom taxonomy from taxonomy.custom.tsv
     if os.path.isfile(cus_taxonomy_file) and (cus_taxonomy_format=='tsv'):
@@ -924,7 +2633,292 @@ def loadTaxonomy(dbpath: Optional[str] = None,
         logger.fatal( f"invalid cus_taxonomy_format: {cus_taxonomy_format}" )
         _die(f"[ERROR] Invalid cus_taxonomy_format: {cus_taxonomy_format}")
 
-def NCBITaxonomyDownload(dir=None, taxdump=True, acc_wgs=False, acc_nucl=False, acc_prot=False, acc_pdb=False, acc_dead=True):
+def buildTaxonomySQLite(db_file: str, 
+                        names_dmp_file: Optional[str] = None, 
+                        accession2taxid_files: Optional[list] = None) -> None:
+    """
+    Write the loaded taxonomy to a SQLite database for `loadTaxonomySQLite()`: taxa with indexed parents, 
+    ranks, names and derived attributes, merged and deleted taxids, and names for `name2taxid()`.
+
+    Args:
+        db_file (str): Path of the database. An existing file is replaced.
+        names_dmp_file (str, optional): Path of names.dmp for synonyms and other names. Defaults to 
+            names.dmp in the taxonomy directory if found, otherwise scientific names of the loaded taxa.
+        accession2taxid_files (list, optional): accession2taxid files for `acc2taxid()`. The first file 
+            of an accession wins. Defaults to None.
+
+    Returns:
+        None
+    """
+    import sqlite3
+    import json
+
+    _checkTaxonomy(None)
+    derived = _derivedAttributes()
+    if not names_dmp_file:
+        names_dmp_file = _findFile(taxonomy_dir+"/names.dmp")
+
+    if os.path.isfile(db_file):
+        os.remove(db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE taxa (tid TEXT PRIMARY KEY, parent TEXT, rank TEXT, name TEXT, depth INTEGER, num_childs INTEGER, guessed_rank TEXT, major TEXT, type TEXT) WITHOUT ROWID")
+    conn.execute("CREATE TABLE merged (tid TEXT PRIMARY KEY, new_tid TEXT) WITHOUT ROWID")
+    conn.execute("CREATE TABLE names (name TEXT, tid TEXT, name_class TEXT)")
+    conn.execute("CREATE TABLE accessions (acc TEXT PRIMARY KEY, tid TEXT) WITHOUT ROWID")
+
+    # taxa, and the root of GTDB and MGnify taxonomies without a parent
+    tids = list(taxParents) + [tid for tid in taxNames if not tid in taxParents]
+    logger.info( f"Write {len(tids)} taxa to {db_file}" )
+    conn.executemany("INSERT INTO taxa VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+        ((tid, taxParents.get(tid), taxRanks.get(tid), taxNames.get(tid), taxDepths.get(tid), taxNumChilds.get(tid), 
+          derived['rank'].get(tid), derived['major'].get(tid), derived['type'].get(tid)) for tid in tids))
+    conn.execute("CREATE INDEX taxa_parent ON taxa (parent)")
+
+    conn.executemany("INSERT INTO merged VALUES (?, ?)", taxMerged.items())
+    conn.executemany("INSERT OR IGNORE INTO merged VALUES (?, NULL)", ((tid,) for tid in taxDeleted))
+
+    if os.path.isfile(names_dmp_file):
+        logger.info( f"Write names from {names_dmp_file}" )
+        with _openFile(names_dmp_file) as f:
+            conn.executemany("INSERT INTO names VALUES (?, ?, ?)", 
+                ((name, tid, name_class.rstrip('\t|')) for tid, name, _, name_class in (line.rstrip('\r\n').split('\t|\t') for line in f)))
+    else:
+        conn.executemany("INSERT INTO names VALUES (?, ?, 'scientific name')", ((name, tid) for tid, name in taxNames.items()))
+    conn.execute("CREATE INDEX names_name ON names (name)")
+
+    num_accs = 0
+    for accession2taxid_file in (accession2taxid_files or []):
+        logger.info( f"Write accessions from {accession2taxid_file}" )
+        with _openFile(accession2taxid_file) as f:
+            cursor = conn.executemany("INSERT OR IGNORE INTO accessions VALUES (?, ?)", 
+                ((fields[0], fields[2].strip()) for fields in (line.split('\t', 3) for line in f) if fields[0] != 'accession'))
+            num_accs += cursor.rowcount
+
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ('version', __version__),
+        ('major_level_to_abbr', json.dumps(major_level_to_abbr)),
+        ('accessions', str(num_accs)),
+    ])
+    conn.commit()
+    conn.close()
+    logger.info( f"Done writing {db_file}." )
+
+def loadTaxonomySQLite(db_file: str, cache_size: int = 65536) -> None:
+    """
+    Use a SQLite database of `buildTaxonomySQLite()` instead of loading the taxonomy into memory. Lookups
+    query the database through a cache of recently used taxa. Bulk operations (e.g. `iterLineages()`) still 
+    build their indexes in memory. Loading other taxonomies closes the database.
+
+    Args:
+        db_file (str): Path of the database.
+        cache_size (int, optional): Number of cached taxa. Defaults to 65536.
+
+    Returns:
+        None
+    """
+    import json
+    global taxDepths, taxParents, taxRanks, taxNames, taxMerged, taxDeleted, taxNumChilds
+    global _sqliteStore, _derivedAttrs, major_level_to_abbr, abbr_to_major_level
+
+    _checkWritable()
+    _releases.clear()
+
+    if not os.path.isfile(db_file):
+        logger.fatal( f"Taxonomy database not found: {db_file}." )
+        _die( f"[ERROR] Taxonomy database not found: {db_file}." )
+
+    logger.info( f"Open taxonomy database: {db_file}" )
+    store = _SQLiteStore(db_file, cache_size)
+    major_level_to_abbr = json.loads(store.meta['major_level_to_abbr'])
+    abbr_to_major_level = {v: k for k, v in major_level_to_abbr.items()}
+
+    taxParents   = _SQLiteTable(store, 'parent')
+    taxRanks     = _SQLiteTable(store, 'rank')
+    taxNames     = _SQLiteTable(store, 'name')
+    taxDepths    = _SQLiteTable(store, 'depth')
+    taxNumChilds = _SQLiteTable(store, 'num_childs')
+    taxMerged    = _SQLiteMerged(store)
+    taxDeleted   = _SQLiteMerged(store, deleted=True)
+    _derivedAttrs = {
+        'rank': _SQLiteTable(store, 'guessed_rank'),
+        'major': _SQLiteTable(store, 'major'),
+        'type': _SQLiteTable(store, 'type'),
+    }
+    _sqliteStore = store
+
+def _closeSQLite() -> None:
+    """Stop using a SQLite database; the taxonomy tables are empty dicts again"""
+    global taxDepths, taxParents, taxRanks, taxNames, taxMerged, taxDeleted, taxNumChilds, _sqliteStore
+
+    taxDepths, taxParents, taxRanks, taxNames = {}, {}, {}, {}
+    taxMerged, taxDeleted, taxNumChilds = {}, set(), {}
+    tidLineage.clear()
+    tidLineageDict.clear()
+    _sqliteStore = None
+
+# tables of a release; the shared ones of later releases are stored as differences from the first release
+_release_shared_tables = ['taxDepths', 'taxParents', 'taxRanks', 'taxNames', 'taxMerged', 'taxDeleted', 'taxNumChilds']
+_release_tables = _release_shared_tables + ['gtdbGenomes', 'gtdbMetadata', 'tidLineage', 'tidLineageDict', 
+                                            'taxChildren', '_treeArrays', '_derivedAttrs', '_lineageIndex']
+
+def _bindTables(tables: dict) -> None:
+    """Make the module tables (e.g. `taxParents`) refer to these tables"""
+    globals().update(tables)
+
+def loadTaxonomyRelease(release: str, dbpath: str, **kwargs) -> None:
+    """
+    Load a taxonomy release (e.g. a taxdump directory) next to the releases already loaded. The first
+    release is loaded as usual; later releases keep only their differences from the first one, so the
+    unchanged taxa and names are shared. Lookups (`taxid2name()`, `taxid2lineage()`, `name2taxid()`...) take
+    a `release` argument and use the default release (see `setDefaultRelease()`) without it; `name2taxid()`
+    searches names.dmp of the release. Accession lookups (`acc2taxid()`) are shared by all releases. Other
+    loaders refuse to run while several releases are loaded (see `dropTaxonomyReleases()`).
+
+    Args:
+        release (str): Name of the release (e.g. '2023-01').
+        dbpath (str): Path of the taxonomy files of the release.
+        **kwargs: Other arguments of `loadTaxonomy()`.
+
+    Returns:
+        None
+    """
+    global _baseRelease, _defaultRelease, taxonomy_dir, abbr_json_path
+
+    with _lock:
+        if release in _releases:
+            logger.fatal( f"Taxonomy release already loaded: {release}." )
+            _die( f"[ERROR] Taxonomy release already loaded: {release}." )
+
+        if not len(_releases):
+            loadTaxonomy(dbpath, **kwargs)
+            _releases[release] = {name: globals()[name] for name in _release_tables}
+            _baseRelease = _defaultRelease = release
+            logger.info( f"Taxonomy release {release} loaded." )
+            return
+
+        # derived attributes of the first release are compared too
+        base = _releases[_baseRelease]
+        _bindTables(base)
+        _derivedAttributes()
+
+        # load the release into empty tables; the paths of the first release stay in use
+        paths = (taxonomy_dir, abbr_json_path)
+        _bindTables({name: set() if name == 'taxDeleted' else {} for name in _release_tables})
+        try:
+            loadTaxonomy(dbpath, **kwargs)
+            _derivedAttributes()
+            tables = {name: globals()[name] for name in _release_tables}
+            names = {'dir': taxonomy_dir, 'nameTid': {}, 'df_names': None}
+        finally:
+            taxonomy_dir, abbr_json_path = paths
+            _bindTables({name: _ReleaseProxy(name) for name in _release_tables})
+
+        for name in _release_shared_tables:
+            tables[name] = _ReleaseTable(base[name], tables[name])
+        tables['_derivedAttrs'] = {key: _ReleaseTable(base['_derivedAttrs'][key], table) for key, table in tables['_derivedAttrs'].items()}
+        tables['taxChildren'] = {}
+        tables['_treeArrays'] = {}
+        tables['_lineageIndex'] = {}
+        tables['tidLineage'] = {}
+        tables['tidLineageDict'] = {}
+        _releases[release] = tables
+        _releaseNames[release] = names
+
+        num_changed = len(tables['taxParents'].changed) + len(tables['taxNames'].changed)
+        logger.info( f"Taxonomy release {release} loaded ({num_changed} taxa and names differ from {_baseRelease})." )
+
+def setDefaultRelease(release: str) -> None:
+    """
+    Set the release of lookups without a `release` argument.
+
+    Args:
+        release (str): Name of a release of `loadTaxonomyRelease()`.
+    """
+    global _defaultRelease
+    if not release in _releases:
+        logger.fatal( f"Taxonomy release not loaded: {release}." )
+        _die( f"[ERROR] Taxonomy release not loaded: {release}. Call \"loadTaxonomyRelease()\" first." )
+    _defaultRelease = release
+
+def dropTaxonomyReleases() -> None:
+    """
+    Keep only the first release of `loadTaxonomyRelease()`; its tables are the module tables again, so 
+    other loaders and `add_taxa()`/`remove_taxa()` can modify them.
+
+    Returns:
+        None
+    """
+    global _defaultRelease
+
+    _checkFrozen()
+    with _lock:
+        if not len(_releases):
+            return
+        _bindTables(_releases[_baseRelease])
+        for release in list(_releases):
+            if release != _baseRelease:
+                del _releases[release]
+        _releaseNames.clear()
+        _defaultRelease = _baseRelease
+
+def freezeTaxonomy(expand: bool=True) -> None:
+    """
+    Freeze the loaded taxonomy into a read-only snapshot.
+
+    The indexes built on demand (children, derived attributes, lineage paths, tree arrays with numpy and 
+    the name search table of `name2taxid()` with pandas) are built now for every loaded release, and 
+    lookups of a frozen taxonomy don't fill the lineage, name and accession caches, so many threads can 
+    query the same tree without taking locks. Only the per-file indexes of accession2taxid files are still 
+    loaded on first use; SQLite-backed taxonomies (`loadTaxonomySQLite()`) keep building their indexes 
+    on demand. Loaders refuse to run until `unfreezeTaxonomy()` is called.
+
+    Args:
+        expand (bool, optional): Build the name search table from the entire 'names.dmp'. Defaults to True.
+
+    Returns:
+        None
+    """
+    import importlib.util
+    global _frozen
+
+    with _lock:
+        if not len(taxParents):
+            logger.fatal( f"No taxonomy loaded. Call \"loadTaxonomy()\" before freezing taxonomy." )
+            _die( "[ERROR] No taxonomy loaded. Call \"loadTaxonomy()\" before freezing taxonomy." )
+
+        # indexes are built before readers share the snapshot
+        for release in list(_releases) or [None]:
+            token = _release.set(release)
+            try:
+                _derivedAttributes()
+                if _sqliteStore is None:
+                    _childrenIndex()
+                    _lineagePaths()
+                    if importlib.util.find_spec('numpy'):
+                        _getTreeArrays()
+                    if importlib.util.find_spec('pandas'):
+                        _loadNameTable(expand)
+            finally:
+                _release.reset(token)
+
+        # lineage dicts are never read back from the cache
+        tidLineageDict.clear()
+        _frozen = True
+
+    logger.info( f"Taxonomy frozen (total {len(taxParents)} taxa)." )
+
+def unfreezeTaxonomy() -> None:
+    """
+    Make a frozen taxonomy writable again. Callers must ensure no other thread is reading it.
+    """
+    global _frozen
+    with _lock:
+        _frozen = False
+
+def NCBITaxonomyDownload(dir=None, taxdump=True, acc_wgs=False, acc_nucl=False, acc_prot=False, acc_pdb=False, acc_dead=True, acc_bgzip=False, acc_index=False):
     import requests
     global taxonomy_dir
 
@@ -960,6 +2954,8 @@ def NCBITaxonomyDownload(dir=None, taxdump=True, acc_wgs=False, acc_nucl=False,
         tax_tar.extract('names.dmp', dir)
         logger.info( f"Extracting merged.dmp..." )
         tax_tar.extract('merged.dmp', dir)
+        logger.info( f"Extracting delnodes.dmp..." )
+        tax_tar.extract('delnodes.dmp', dir)
         tax_tar.close()
         # # delete taxdump_tgz_file
         # os.remove(taxdump_tgz_file)
@@ -985,40 +2981,603 @@ def NCBITaxonomyDownload(dir=None, taxdump=True, acc_wgs=False, acc_nucl=False,
         logger.info( f"Auto ryncing accession2taxid data from {url}..." )
         subprocess.call(cmd, shell=True)
 
-        logger.info( f"Decompressing accession2taxid data..." )
-        cmd = f"gzip -f -d {dir}/accession2taxid/*.gz"
-        subprocess.call(cmd, shell=True)
+        if acc_bgzip:
+            # keep accession2taxid data compressed in a seekable format
+            import glob
+            logger.info( f"Recompressing accession2taxid data with bgzip..." )
+            for gz_file in glob.glob(f"{dir}/accession2taxid/*.gz"):
+                if _compression(gz_file) == 'gzip':
+                    bgzipFile(gz_file, f"{gz_file}.tmp")
+                    os.replace(f"{gz_file}.tmp", gz_file)
+        else:
+            logger.info( f"Decompressing accession2taxid data..." )
+            cmd = f"gzip -f -d {dir}/accession2taxid/*.gz"
+            subprocess.call(cmd, shell=True)
+
+        if acc_index:
+            # key ranges of accession formats and Bloom filters for routing lookups
+            import glob
+            for acc2taxid_file in glob.glob(f"{dir}/accession2taxid/*accession2taxid*"):
+                if acc2taxid_file.endswith(('.json', '.bloom', '.md5')): continue
+                indexAcc2taxid(acc2taxid_file)
     
     logger.info( f"Done." )
 
 def loadTaxonomyTSV(tsv_taxonomy_file):
 
+    _checkWritable()
+
     # loading major levels to json file
     _loadAbbrJson(abbr_json_path)
 
+    # number of children of taxa in the full taxonomy (6th column of a subset, see `subsetTaxonomy()`)
+    num_childs = {}
+
     try:
-        with open(tsv_taxonomy_file) as f:
+        with _openFile(tsv_taxonomy_file) as f:
             for line in f:
                 line = line.rstrip('\r\n')
                 if not line: continue
-                tid, depth, parent, rank, name = line.split('\t')
-                taxParents[tid] = parent
+                fields = line.split('\t')
+                tid, depth, parent, rank, name = fields[:5]
+                _setTaxon(tid, parent, rank, name)
                 taxDepths[tid] = int(depth)
-                taxRanks[tid] = rank
-                taxNames[tid] = name
-                if parent in taxNumChilds:
-                    taxNumChilds[parent] += 1
-                else:
-                    taxNumChilds[parent] = 1
+                if len(fields) > 5:
+                    num_childs[tid] = int(fields[5])
             f.close()
+
+            for tid in num_childs:
+                if num_childs[tid]:
+                    taxNumChilds[tid] = num_childs[tid]
+                elif tid in taxNumChilds:
+                    del taxNumChilds[tid]
             logger.info( f"Done parsing custom tsv taxonomy file." )
     except IOError:
         _die( "Failed to open custom tsv taxonomy file: %s." % tsv_taxonomy_file )
 
+def loadMergedTSV(merged_tsv_file):
+    """
+    Load merged taxonomy IDs from a tab-delimited file of `merged_tid` and `tid` (e.g. taxonomy.merged.tsv).
+    A deleted taxonomy ID has an empty `tid`.
+    """
+    _checkWritable()
+
+    try:
+        with _openFile(merged_tsv_file) as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if not line: continue
+                tid, new_tid = line.split('\t')
+                if new_tid:
+                    taxMerged[tid] = new_tid
+                else:
+                    taxDeleted.add(tid)
+            f.close()
+            logger.info( f"Done parsing merged taxonomy file." )
+    except IOError:
+        _die( "Failed to open merged taxonomy file: %s." % merged_tsv_file )
+
+    _resolveMerged()
+
+def _updateNameTable(added: dict, renamed: dict, removed: Optional[list] = None) -> None:
+    """
+    Update the name search table of `name2taxid()` (if loaded) in place of a rebuild: drop the rows of 
+    `removed` taxa and of the previous names of `renamed` taxa ({tid: name}), then add `added` ({tid: name}).
+    """
+    global df_names
+    df = df_names
+    if df is None: return
+    import pandas as pd
+
+    # taxids of names.dmp are integers (custom taxids may be strings)
+    integer = len(df) and not isinstance(df.taxid.iat[0], str)
+    def key(tid):
+        return int(tid) if integer and tid.isdigit() else tid
+
+    keep = None
+    if removed:
+        keep = ~df.taxid.isin([key(tid) for tid in removed]).to_numpy()
+    if renamed:
+        pairs = {(name, key(tid)) for tid, name in renamed.items()}
+        drop = df.index.isin([name for name, tid in pairs]) & df.taxid.isin([tid for name, tid in pairs]).to_numpy()
+        for i in drop.nonzero()[0]:
+            drop[i] = (df.index[i], df.taxid.iat[i]) in pairs
+        keep = ~drop if keep is None else keep & ~drop
+    if keep is not None:
+        df = df[keep]
+    if added:
+        df = pd.concat([df, pd.DataFrame({'taxid': [key(tid) for tid in added]}, index=pd.Index(list(added.values()), name='name'))])
+
+    with _lock:
+        df_names = df
+
+def _checkNewParents(parents: dict) -> None:
+    """Refuse new parents ({tid: parent}) of `add_taxa()` that are unknown or in the subtrees of their taxa"""
+    for tid, parent in parents.items():
+        if not parent in parents and not parent in taxParents:
+            logger.fatal( f"Parent {parent} of taxon {tid} not found." )
+            _die( f"[ERROR] Parent {parent} of taxon {tid} not found. Load or add it first." )
+
+    # walk up from each taxon with the new parents; taxa already walked lead to the root
+    rooted = set()
+    for tid in parents:
+        path = []
+        node = tid
+        while not node in rooted:
+            if node in path:
+                logger.fatal( f"Taxon {node} can't be a descendant of itself." )
+                _die( f"[ERROR] Taxon {node} can't be a descendant of itself. Check the parents of {tid}." )
+            path.append(node)
+            parent = parents.get(node, taxParents.get(node))
+            if parent is None or parent == node: break
+            node = parent
+        rooted.update(path)
+
+def add_taxa(records) -> int:
+    """
+    Add custom taxa (e.g. genomes) to the loaded taxonomy, or redefine loaded taxa. Child counts, depths, 
+    the children index, derived ranks and types, the name table of `name2taxid()` and lineage caches are 
+    updated for the changed taxa instead of being rebuilt, so adding many leaves to a large taxonomy is fast.
+    Parents can be added in the same call in any order. Records with unknown parents or making a taxon its
+    own descendant are refused before the taxonomy is modified.
+
+    Args:
+        records (iterable): (tid, parent, rank, name) of each taxon.
+
+    Returns:
+        int: Number of added or redefined taxa.
+    """
+    with _lock:
+        _checkOverlay()
+        if not len(major_level_to_abbr):
+            _loadAbbrJson(abbr_json_path)
+
+        records = [(str(tid), str(parent), rank, name) for tid, parent, rank, name in records]
+        _checkNewParents({tid: parent for tid, parent, rank, name in records})
+
+        tids = []
+        added = {}
+        moved = {}   # loaded taxa with new parents: {tid: previous parent}
+        renamed = {} # loaded taxa with new names: {tid: previous name}
+        changed = [] # redefined loaded taxa with children
+        for tid, parent, rank, name in records:
+            p_tid = taxParents.get(tid)
+            if p_tid is None:
+                added[tid] = None
+            elif not tid in added:
+                if p_tid != parent and not tid in moved:
+                    moved[tid] = p_tid
+                if taxNames[tid] != name and not tid in renamed:
+                    renamed[tid] = taxNames[tid]
+                if tid in taxNumChilds and (p_tid, taxRanks[tid], taxNames[tid]) != (parent, rank, name):
+                    changed.append(tid)
+            _setTaxon(tid, parent, rank, name)
+            tids.append(tid)
+        moved = {tid: p_tid for tid, p_tid in moved.items() if taxParents[tid] != p_tid}
+
+        # children index
+        if len(taxChildren):
+            former = {}
+            for tid, p_tid in moved.items():
+                former.setdefault(p_tid, set()).add(tid)
+            for p_tid, c_tids in former.items():
+                taxChildren[p_tid] = [c_tid for c_tid in taxChildren[p_tid] if not c_tid in c_tids]
+                if not taxChildren[p_tid]: del taxChildren[p_tid]
+            for tid in dict.fromkeys(list(added) + list(moved)):
+                parent = taxParents[tid]
+                if parent == tid: continue
+                if parent in taxChildren:
+                    taxChildren[parent].append(tid)
+                else:
+                    taxChildren[parent] = [tid]
+
+        # depths of the new taxa and of the subtrees of moved taxa
+        subtree = [tid for tid in moved if tid in taxNumChilds]
+        if subtree:
+            subtree = _descendants(subtree)
+        affected = set(tids).union(subtree)
+        for tid in affected:
+            taxDepths.pop(tid, None)
+        _computeDepths(list(affected))
+
+        # derived attributes and lineages of the subtrees of redefined taxa
+        affected.update(_descendants(changed) if changed else [])
+        if len(_derivedAttrs):
+            _deriveSubtrees([_derivedState(tid) for tid in affected if not taxParents[tid] in affected], _derivedAttrs)
+            # parents gaining or losing their first child
+            for parent in set(taxParents[tid] for tid in tids).union(moved.values()).difference(affected):
+                if parent in taxParents:
+                    _guessRank(parent, _derivedAttrs['major'].get(parent, taxParents[parent]), _derivedAttrs['rank'])
+        for tid in affected:
+            tidLineage.pop(tid, None)
+            tidLineageDict.pop(tid, None)
+
+        # name search
+        for tid in tids:
+            nameTid.pop(taxNames[tid], None)
+        for name in renamed.values():
+            nameTid.pop(name, None)
+        _updateNameTable({tid: taxNames[tid] for tid in dict.fromkeys(list(added) + list(renamed))}, renamed)
+
+        _treeArrays.clear()
+        _lineageIndex.clear()
+        logger.debug( f"Added {len(added)} and redefined {len(set(tids))-len(added)} taxa." )
+        return len(set(tids))
+
+def remove_taxa(tids) -> int:
+    """
+    Remove taxa and their descendants from the loaded taxonomy. The tables derived from the tree are updated 
+    like `add_taxa()`.
+
+    Args:
+        tids (iterable): Taxonomy IDs to remove.
+
+    Returns:
+        int: Number of removed taxa, including descendants.
+    """
+    with _lock:
+        _checkOverlay()
+
+        tids = list(dict.fromkeys(str(tid) for tid in tids if str(tid) in taxParents))
+        if any(tid in taxNumChilds for tid in tids):
+            tids = _descendants(tids)
+        removed = set(tids)
+
+        parents = {}
+        for tid in tids:
+            nameTid.pop(taxNames.get(tid), None)
+            parent = taxParents.pop(tid)
+            taxNames.pop(tid, None)
+            taxRanks.pop(tid)
+            taxDepths.pop(tid, None)
+            taxNumChilds.pop(tid, None)
+            tidLineage.pop(tid, None)
+            tidLineageDict.pop(tid, None)
+            if parent == tid or parent in removed: continue
+            parents.setdefault(parent, set()).add(tid)
+            if parent in taxNumChilds:
+                taxNumChilds[parent] -= 1
+                if not taxNumChilds[parent]: del taxNumChilds[parent]
+
+        if len(taxChildren):
+            for tid in tids:
+                taxChildren.pop(tid, None)
+            for parent, c_tids in parents.items():
+                taxChildren[parent] = [c_tid for c_tid in taxChildren.get(parent, []) if not c_tid in c_tids]
+                if not taxChildren[parent]: del taxChildren[parent]
+        if len(_derivedAttrs):
+            for attrs in _derivedAttrs.values():
+                for tid in tids:
+                    attrs.pop(tid, None)
+            # parents losing their last child
+            for parent in parents:
+                if parent in taxParents:
+                    _guessRank(parent, _derivedAttrs['major'].get(parent, taxParents[parent]), _derivedAttrs['rank'])
+
+        _updateNameTable({}, {}, tids)
+        _treeArrays.clear()
+        _lineageIndex.clear()
+        logger.debug( f"Removed {len(tids)} taxa." )
+        return len(tids)
+
+def _writeTaxonomyTSV(f, tids, num_childs: Optional[dict] = None) -> int:
+    """
+    Write taxa in taxonomy.tsv format, parents before children. Taxa in `num_childs` get a 6th 
+    column of their number of children.
+    """
+    # bucket taxa by depth: a single pass writes every parent before its children
+    levels = []
+    for tid in tids:
+        depth = taxDepths[tid]
+        while len(levels) <= depth:
+            levels.append([])
+        levels[depth].append(tid)
+
+    count = 0
+    # GTDB and MGnify taxonomies have no parent of the root
+    if not '1' in taxParents and '1' in taxNames:
+        f.write(f"1\t0\t1\t{taxRanks.get('1', 'root')}\t{taxNames['1']}")
+        f.write(f"\t{num_childs['1']}\n" if num_childs and '1' in num_childs else "\n")
+        count += 1
+    for level in levels:
+        for tid in level:
+            f.write(f"{tid}\t{taxDepths[tid]}\t{taxParents[tid]}\t{taxRanks[tid]}\t{taxNames[tid]}")
+            f.write(f"\t{num_childs[tid]}\n" if num_childs and tid in num_childs else "\n")
+        count += len(level)
+
+    return count
+
+def exportTaxonomyTSV(output_file: Optional[str] = None, merged_output_file: Optional[str] = None) -> int:
+    """
+    Export the loaded taxonomy to a Krona-compatible taxonomy.tsv file (tid, depth, parent, rank, name),
+    parents before children. The file can be loaded by `loadTaxonomyTSV()` or `loadTaxonomy()` without 
+    any depth fix-ups.
+
+    Args:
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        merged_output_file (str, optional): Path of the output file of merged taxonomy IDs (merged_tid, tid)
+            and deleted taxonomy IDs (deleted_tid, empty). Defaults to None (not exported).
+
+    Returns:
+        int: Number of exported taxa.
+    """
+    _checkTaxonomy(None)
+
+    f = open(output_file, 'w') if output_file else sys.stdout
+    count = _writeTaxonomyTSV(f, taxParents)
+    if output_file:
+        f.close()
+    logger.info( f"{count} taxa exported to {output_file if output_file else 'STDOUT'}." )
+
+    if merged_output_file:
+        with open(merged_output_file, 'w') as f:
+            for tid in taxMerged:
+                f.write(f"{tid}\t{taxMerged[tid]}\n")
+            for tid in taxDeleted:
+                f.write(f"{tid}\t\n")
+            f.close()
+        logger.info( f"{len(taxMerged)} merged and {len(taxDeleted)} deleted taxa exported to {merged_output_file}." )
+
+    return count
+
+def _keptChildren(tid: str, children: dict, keep):
+    """The nearest descendants of a taxon that are kept by `keep(tid)`, in the order of the children index"""
+    stack = [iter(children.get(tid, ()))]
+    while stack:
+        for c_tid in stack[-1]:
+            if keep(c_tid):
+                yield c_tid
+            else:
+                stack.append(iter(children.get(c_tid, ())))
+                break
+        else:
+            stack.pop()
+
+def export_subtree(tid: Union[int, str] = '1',
+                   output_file: Optional[str] = None,
+                   format: str = 'newick',
+                   ranks: Optional[list] = None,
+                   max_depth: Optional[int] = None,
+                   collapse_no_rank: bool = False,
+                   annotate: bool = True) -> int:
+    """
+    Export the subtree of a taxon as a Newick tree or a nested JSON object. The tree is streamed to the output
+    by an iterative traversal of the children index, so the subtrees of any size are exported without recursion.
+
+    In Newick trees, taxa are labeled by taxids with names and ranks in comments (e.g. 
+    `562[&name="Escherichia coli",rank=species]`). In JSON, each taxon is an object of 'taxid', 'name', 
+    'rank' and 'children'.
+
+    Args:
+        tid (Union[int, str], optional): Taxonomy ID of the root of the subtree. Defaults to '1'.
+        output_file (str, optional): Path of the output file. Defaults to None (STDOUT).
+        format (str, optional): 'newick' or 'json'. Defaults to 'newick'.
+        ranks (list, optional): Only keep the root and the taxa at these ranks (e.g. ['phylum', 'genus']); 
+            the children of the other taxa are attached to their nearest kept ancestors. Defaults to None (all taxa).
+        max_depth (int, optional): Number of levels below the root to export. Defaults to None (all levels).
+        collapse_no_rank (bool, optional): Remove 'no rank' taxa like `ranks`. Defaults to False.
+        annotate (bool, optional): Add names and ranks. Defaults to True.
+
+    Returns:
+        int: Number of exported taxa.
+    """
+    import json
+
+    if not format in ('newick', 'json'):
+        logger.fatal( f"Unknown tree format: {format}." )
+        _die( f"[ERROR] Unknown tree format: {format}. Use 'newick' or 'json'." )
+
+    root = _checkTaxonomy(tid)
+    # GTDB and MGnify taxonomies have no parent of the root
+    if root == "unknown" and str(tid) == '1' and '1' in taxNames:
+        root = '1'
+    if root == "unknown":
+        logger.fatal( f"Unknown taxid: {tid}." )
+        _die( f"[ERROR] Unknown taxid: {tid}." )
+
+    children = _childrenIndex()
+    names, tax_ranks = taxNames, taxRanks
+    if ranks or collapse_no_rank:
+        ranks = set(ranks) if ranks else None
+        def keep(c_tid):
+            rank = tax_ranks[c_tid]
+            if collapse_no_rank and rank == "no rank":
+                return False
+            return ranks is None or rank in ranks
+        kept = lambda tid: _keptChildren(tid, children, keep)
+    else:
+        kept = lambda tid: iter(children.get(tid, ()))
+
+    # the text written before the children of a taxon, between them and after them
+    if format == 'newick':
+        opening = lambda tid: ''
+        first, between, end = '(', ',', ')'
+        if annotate:
+            def closing(tid):
+                name = names[tid].replace('\\', '\\\\').replace('"', '\\"')
+                return f'{tid}[&name="{name}",rank={tax_ranks[tid].replace(" ", "_")}]'
+        else:
+            closing = lambda tid: tid
+    else:
+        quote = json.encoder.encode_basestring
+        if annotate:
+            opening = lambda tid: f'{{"taxid": {quote(tid)}, "name": {quote(names[tid])}, "rank": {quote(tax_ranks[tid])}'
+        else:
+            opening = lambda tid: f'{{"taxid": {quote(tid)}'
+        first, between, end = ', "children": [', ', ', ']'
+        closing = lambda tid: '}'
+    max_depth = float('inf') if max_depth is None else max_depth
+
+    f = open(output_file, 'w') if output_file else sys.stdout
+    buffer = [opening(root)]
+    count = 1
+
+    # [taxid, iterator of kept children, number of written children, depth]
+    stack = [[root, kept(root), 0, 0]]
+    while stack:
+        node = stack[-1]
+        c_tid = next(node[1], None) if node[3] < max_depth else None
+        if c_tid is None:
+            stack.pop()
+            if node[2]:
+                buffer.append(end)
+            buffer.append(closing(node[0]))
+        else:
+            buffer.append(between if node[2] else first)
+            buffer.append(opening(c_tid))
+            node[2] += 1
+            count += 1
+            stack.append([c_tid, kept(c_tid), 0, node[3]+1])
+
+            if len(buffer) >= 65536:
+                f.write(''.join(buffer))
+                buffer = []
+
+    buffer.append(';\n' if format == 'newick' else '\n')
+    f.write(''.join(buffer))
+    if output_file:
+        f.close()
+
+    logger.info( f"{count} taxa exported to {output_file if output_file else 'STDOUT'}." )
+    return count
+
+def subsetTaxonomy(output_dir: str, 
+                   taxids: Optional[list] = None, 
+                   accessions: Optional[list] = None, 
+                   clades: Optional[list] = None, 
+                   acc_type: str = 'nucl', 
+                   mapping_file: Optional[str] = None) -> int:
+    """
+    Write a reduced taxonomy of the given taxa and all of their ancestors to `output_dir` 
+    (taxonomy.tsv, taxonomy.merged.tsv and major_level_to_abbr.json). Load it with `loadTaxonomy(output_dir)`.
+
+    Taxa keep their names, ranks and depths. Taxa that lose children in the subset keep their number of 
+    children in a 6th column of taxonomy.tsv, so guessed ranks (e.g. strain for leaves of 'no rank') and 
+    lineages stay the same as in the full taxonomy. Merged taxids of kept taxa are kept.
+
+    Args:
+        output_dir (str): Output directory.
+        taxids (list, optional): Taxonomy IDs. Defaults to None.
+        accessions (list, optional): Accessions, converted to taxids by `acc2taxid()`. Defaults to None.
+        clades (list, optional): Taxonomy IDs of clades to keep entirely (with all descendants). Defaults to None.
+        acc_type (str, optional): Type of the accessions, either nucl, prot, or pdb. Defaults to 'nucl'.
+        mapping_file (str, optional): An accession2taxid file of the accessions. Defaults to None.
+
+    Returns:
+        int: Number of taxa in the subset.
+    """
+    import json
+
+    _checkTaxonomy(None)
+
+    tids = []
+    unknown = 0
+    for tid in (taxids or []):
+        tid = _checkTaxonomy(tid)
+        if tid == "unknown":
+            unknown += 1
+        else:
+            tids.append(tid)
+    for acc in (accessions or []):
+        tid = _checkTaxonomy(acc2taxid(acc, acc_type, mapping_file))
+        if tid == "unknown":
+            unknown += 1
+        else:
+            tids.append(tid)
+
+    # entire clades
+    children = _childrenIndex()
+    for tid in (clades or []):
+        tid = _checkTaxonomy(tid)
+        if tid == "unknown":
+            unknown += 1
+            continue
+        stack = [tid]
+        while stack:
+            tid = stack.pop()
+            tids.append(tid)
+            if tid in children: stack.extend(children[tid])
+
+    if unknown:
+        logger.info( f"{unknown} unknown taxids or accessions skipped." )
+
+    # ancestors
+    subset = set()
+    for tid in tids:
+        while not tid in subset:
+            subset.add(tid)
+            parent = taxParents[tid]
+            if not parent in taxParents: break
+            tid = parent
+
+    # taxa losing children
+    sub_childs = {}
+    for tid in subset:
+        parent = taxParents[tid]
+        sub_childs[parent] = sub_childs.get(parent, 0) + 1
+    if not '1' in taxParents and '1' in taxNames:
+        sub_childs['1'] = sub_childs.get('1', 0) + 1
+    num_childs = {tid: taxNumChilds.get(tid, 0) for tid in subset.union(['1']) 
+                  if sub_childs.get(tid, 0) != taxNumChilds.get(tid, 0)}
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f"{output_dir}/taxonomy.tsv", 'w') as f:
+        count = _writeTaxonomyTSV(f, subset, num_childs)
+        f.close()
+
+    with open(f"{output_dir}/taxonomy.merged.tsv", 'w') as f:
+        for tid in taxMerged:
+            if taxMerged[tid] in subset:
+                f.write(f"{tid}\t{taxMerged[tid]}\n")
+        f.close()
+
+    with open(f"{output_dir}/major_level_to_abbr.json", 'w') as f:
+        json.dump(major_level_to_abbr, f, indent=4)
+        f.close()
+
+    logger.info( f"{count} taxa written to {output_dir}." )
+
+    return count
+
+def _loadMergedDmp(merged_dmp_file: Optional[str] = None, delnodes_dmp_file: Optional[str] = None) -> None:
+    """Load merged and deleted taxids from NCBI merged.dmp and delnodes.dmp if the files exist"""
+    #try to load merged taxids
+    if merged_dmp_file and os.path.isfile( merged_dmp_file ):
+        logger.info( "Open merged taxonomy node file: %s"% merged_dmp_file )
+        with _openFile(merged_dmp_file) as f:
+            for line in f:
+                fields = line.rstrip('\r\n').split('\t|')
+                taxMerged[fields[0]] = fields[1].strip('\t')
+            f.close()
+            logger.info( f"Done parsing merged taxonomy file." )
+
+    #try to load deleted taxids
+    if delnodes_dmp_file and os.path.isfile( delnodes_dmp_file ):
+        logger.info( "Open deleted taxonomy node file: %s"% delnodes_dmp_file )
+        with _openFile(delnodes_dmp_file) as f:
+            for line in f:
+                taxDeleted.add(line.split('\t', 1)[0])
+            f.close()
+            logger.info( f"Done parsing deleted taxonomy node file." )
+
+    _resolveMerged()
+
 def loadNCBITaxonomy(taxdump_tgz_file: Optional[str] = None, 
                      names_dmp_file: Optional[str] = None, 
                      nodes_dmp_file: Optional[str] = None, 
-                     merged_dmp_file: Optional[str] = None):
+                     merged_dmp_file: Optional[str] = None,
+                     delnodes_dmp_file: Optional[str] = None,
+                     lazy_names: bool = False):
+    """
+    Load NCBI taxonomy from nodes.dmp and names.dmp, or from taxdump.tar.gz.
+
+    Args:
+        lazy_names (bool, optional): Only load the tree; names are read from a plain names.dmp sorted 
+            by taxids on demand. Defaults to False.
+    """
+    global taxNames
+
+    _checkWritable()
 
     # loading major levels from json file
     _loadAbbrJson(abbr_json_path)
@@ -1026,26 +3585,32 @@ def loadNCBITaxonomy(taxdump_tgz_file: Optional[str] = None,
     # try to load taxonomy from taxonomy.tsv
     if os.path.isfile(nodes_dmp_file) and os.path.isfile(names_dmp_file):
         try:
-            # read name from names.dmp
-            logger.info( f"Open taxonomy name file: {names_dmp_file}" )
-            with open(names_dmp_file) as f:
-                for line in f:
-                    tid, name, tmp, nametype = line.rstrip('\r\n').split('\t|\t')
-                    if not nametype.startswith("scientific name"):
-                        continue
-                    taxNames[tid] = name
-                f.close()
-                logger.info( f"Done parsing taxonomy name file." )    
+            if lazy_names and not _compression(names_dmp_file) and _isSortedByTaxid(names_dmp_file):
+                logger.info( f"Taxonomy names are read from {names_dmp_file} on demand." )
+                taxNames = _LazyNames(names_dmp_file, taxNames.names if isinstance(taxNames, _LazyNames) else taxNames)
+            else:
+                if lazy_names:
+                    logger.info( f"{names_dmp_file} is compressed or not sorted by taxids. All names are loaded." )
+
+                # read name from names.dmp
+                logger.info( f"Open taxonomy name file: {names_dmp_file}" )
+                with _openFile(names_dmp_file) as f:
+                    for line in f:
+                        tid, name, tmp, nametype = line.rstrip('\r\n').split('\t|\t')
+                        if not nametype.startswith("scientific name"):
+                            continue
+                        taxNames[tid] = name
+                    f.close()
+                    logger.info( f"Done parsing taxonomy name file." )    
 
             # read taxonomy info from nodes.dmp
             logger.info( f"Open taxonomy node file: {nodes_dmp_file}" )
-            with open(nodes_dmp_file) as f:
+            with _openFile(nodes_dmp_file) as f:
                 for line in f:
                     fields = line.rstrip('\r\n').split('\t|\t')
                     tid = fields[0]
                     parent = fields[1]
                     taxParents[tid] = parent
-                    taxDepths[tid] = int(taxDepths[parent])+1 if parent in taxDepths else 0 # could have potiential bug if child node is parsed before parent node.
                     taxRanks[tid] = fields[2]
                     if parent in taxNumChilds:
                         taxNumChilds[parent] += 1
@@ -1058,6 +3623,8 @@ def loadNCBITaxonomy(taxdump_tgz_file: Optional[str] = None,
     elif os.path.isfile( taxdump_tgz_file ):
         try:
             logger.info( f"Open taxonomy file: {taxdump_tgz_file}" )
+            if lazy_names:
+                logger.warning( f"Lazy names need an extracted names.dmp. All names of {taxdump_tgz_file} are loaded." )
             tar = tarfile.open(taxdump_tgz_file, "r:gz")
             
             # read name from names.dmp
@@ -1080,7 +3647,6 @@ def loadNCBITaxonomy(taxdump_tgz_file: Optional[str] = None,
                 tid = fields[0]
                 parent = fields[1]
                 taxParents[tid] = parent
-                taxDepths[tid] = int(taxDepths[parent])+1 if parent in taxDepths else 0 # could have potiential bug if child node is parsed before parent node.
                 taxRanks[tid] = fields[2]
                 if parent in taxNumChilds:
                     taxNumChilds[parent] += 1
@@ -1097,23 +3663,27 @@ def loadNCBITaxonomy(taxdump_tgz_file: Optional[str] = None,
                 taxMerged[fields[0]] = fields[1].strip('\t')
             f.close()
 
+            # read deleted taxids from delnodes.dmp
+            if "delnodes.dmp" in tar.getnames():
+                logger.info( "Extract taxonomy deleted nodes file: delnodes.dmp" )
+                f = tar.extractfile(tar.getmember("delnodes.dmp"))
+                for line in f.readlines():
+                    taxDeleted.add(line.decode('utf8').split('\t', 1)[0])
+                f.close()
+
         except IOError:
             _die( "Failed to load taxonomy from %s"%taxdump_tgz_file )
     
-    #try to load merged taxids
-    if os.path.isfile( merged_dmp_file ):
-        logger.info( "Open merged taxonomy node file: %s"% merged_dmp_file )
-        with open(merged_dmp_file) as f:
-            for line in f:
-                fields = line.rstrip('\r\n').split('\t|')
-                taxMerged[fields[0]] = fields[1].strip('\t')
-            f.close()
-            logger.info( f"Done parsing merged taxonomy file." )
+    _loadMergedDmp(merged_dmp_file, delnodes_dmp_file)
+
+    # nodes.dmp isn't sorted by depth
+    _computeDepths()
     
 def loadMgnifyTaxonomy(mgnify_taxonomy_file=None):
     """
     loadMgnifyTaxonomy()
     """
+    _checkWritable()
 
     # loading major levels to json file
     _loadAbbrJson(abbr_json_path)
@@ -1122,7 +3692,7 @@ def loadMgnifyTaxonomy(mgnify_taxonomy_file=None):
     if os.path.isfile(mgnify_taxonomy_file):
         logger.info( "Open custom taxonomy node file (lineage format): %s"% mgnify_taxonomy_file)
         try:
-            with open(mgnify_taxonomy_file) as f:
+            with _openFile(mgnify_taxonomy_file) as f:
                 for line in f:
                     line = line.rstrip('\r\n')
                     if not line: continue
@@ -1138,18 +3708,14 @@ def loadMgnifyTaxonomy(mgnify_taxonomy_file=None):
 
                     for i in range(1, len(temp)+1):
                         # this taxa
-                        (rank_abbr, name) = temp[-i].split('__')
-
-                        import re
-                        re_taxa = re.compile("^([^_]+)__(.*)$")
-                        rank_abbr, name = re_taxa.match(temp[-i]).groups()
+                        rank_abbr, name = _re_taxa.match(temp[-i]).groups()
 
                         # for na taxon (no_{rank_abbr}_rank)
                         if name=="": name = p_name
 
                         # paranet taxa
                         try:
-                            p_rank_abbr, p_name = re_taxa.match(temp[-(i+1)]).groups()
+                            p_rank_abbr, p_name = _re_taxa.match(temp[-(i+1)]).groups()
                             if p_name=="":
                                 p_name = f'{name} - no_{rank_abbr}_rank'
                         except:
@@ -1164,106 +3730,233 @@ def loadMgnifyTaxonomy(mgnify_taxonomy_file=None):
                             rank = rank_abbr
                             
                         tid = name
-                        taxParents[tid] = p_name
-                        taxRanks[tid] = rank
-                        taxNames[tid] = name
-                        if p_name in taxNumChilds:
-                            taxNumChilds[p_name] += 1
-                        else:
-                            taxNumChilds[p_name] = 1
+                        _setTaxon(tid, p_name, rank, name)
                 f.close()
                 logger.info( f"Done parsing custom taxonomy file." )
         except IOError:
             _die( "Failed to open custom taxonomy file: %s." % mgnify_taxonomy_file )
 
+        _computeDepths()
+
     logger.info( f"Done parsing taxonomy files (total {len(taxParents)} taxa loaded)" )
 
-def loadGTDBTaxonomy(gtdb_taxonomy_file=None, gtdb_taxonomy_format="gtdb_metadata"):
+def _gtdbRank(rank_abbr: str) -> str:
+    """Convert the rank abbreviation of a GTDB taxon to a rank"""
+    if rank_abbr=='d':
+        return 'superkingdom'
+    elif rank_abbr=='x':
+        return 'strain'
+    elif rank_abbr in abbr_to_major_level:
+        return abbr_to_major_level[rank_abbr]
+    else:
+        return rank_abbr
+
+def _gtdbTaxa(taxa: list, p_tid: str, child_name: str='') -> list:
     """
-    loadGTDBTaxonomy()
+    Convert a top-down list of (rank_abbr, name) GTDB taxa under `p_tid` to (tid, parent, rank, name).
+    A taxon without a name (no_{rank_abbr}_rank) is named after its nearest named descendant.
     """
+    names = []
+    name = child_name
+    for rank_abbr, t_name in reversed(taxa):
+        name = t_name if t_name else f'{name} - no_{rank_abbr}_rank'
+        names.append(name)
+    names.reverse()
+
+    records = []
+    for (rank_abbr, t_name), name in zip(taxa, names):
+        records.append((name, p_tid, _gtdbRank(rank_abbr), name))
+        p_tid = name
+
+    return records
+
+def _addGTDBLineage(lineage: str, prefix_cache: dict):
+    """
+    Add the taxa of a GTDB lineage string (e.g. 'd__Bacteria;p__Proteobacteria;...') once.
+    Returns the taxid of the last named taxon and the unnamed taxa below it, which can't be 
+    shared because they are named after the genome. Prefixes that have been added are looked up 
+    in `prefix_cache` instead of being parsed and inserted again.
+    """
+    if lineage in prefix_cache:
+        return prefix_cache[lineage]
+
+    comps = lineage.split(';')
+    taxa = [_re_taxa.match(x).groups() for x in comps]
+
+    k = len(taxa)
+    while k and taxa[k-1][1]=='':
+        k -= 1
+
+    records = []
+    p_tid = '1'
+    start = 0
+    for i in range(k):
+        if taxa[i][1]=='':
+            continue
+        prefix = ';'.join(comps[:i+1])
+        if prefix in prefix_cache:
+            p_tid = prefix_cache[prefix][0]
+        else:
+            records.extend(_gtdbTaxa(taxa[start:i+1], p_tid))
+            p_tid = records[-1][0]
+            prefix_cache[prefix] = (p_tid, [])
+        start = i+1
+
+    # add taxa bottom-up, so an ancestor wins over a descendant with the same name (e.g. f__D2472;g__D2472)
+    for record in reversed(records):
+        _setTaxon(*record)
+
+    prefix_cache[lineage] = (p_tid, taxa[k:])
+    return prefix_cache[lineage]
+
+def _addGTDBGenome(acc: str, lineage: str, name: str, prefix_cache: dict) -> None:
+    """Add a GTDB genome (strain) named `name ({acc})` with its lineage"""
+    name = f'{name} ({acc})'
+    p_tid, tail = _addGTDBLineage(lineage, prefix_cache)
+    records = _gtdbTaxa(tail, p_tid, name) if tail else []
+    records.append((acc.split('.')[0], records[-1][0] if records else p_tid, 'strain', name))
+    for record in reversed(records):
+        _setTaxon(*record)
+
+def loadGTDBTaxonomy(gtdb_taxonomy_file=None, gtdb_taxonomy_format="gtdb_metadata", metadata_columns: Optional[list]=None):
+    """
+    Load GTDB taxonomy from a GTDB taxonomy file (e.g. bac120_taxonomy_r207.tsv) or a GTDB metadata
+    file (e.g. bac120_metadata_r207.tsv). Both can be gzipped.
+
+    Args:
+        gtdb_taxonomy_file (str): Path of the GTDB file.
+        gtdb_taxonomy_format (str, optional): Either 'gtdb_taxonomy' or 'gtdb_metadata'. Defaults to 'gtdb_metadata'.
+        metadata_columns (list, optional): Extra metadata columns to keep for each genome (e.g. ['ncbi_taxid', 
+            'gtdb_representative']), see `taxid2metadata()`. Only apply to 'gtdb_metadata'. Defaults to None.
+
+    Returns:
+        None
+    """
+    _checkWritable()
 
     # loading major levels to json file
-    _loadAbbrJson(abbr_json_path, type='gtdb')
+    _loadAbbrJson(abbr_json_path)
 
     # try to load custom taxonomy from GTDB file
     if os.path.isfile(gtdb_taxonomy_file) and (gtdb_taxonomy_format in ['gtdb_taxonomy','gtdb_metadata']):
         logger.info( f"Open custom taxonomy node file ({gtdb_taxonomy_format}): %s"% gtdb_taxonomy_file)
-        try:
-            with open(gtdb_taxonomy_file) as f:
-                for line in f:
-                    line = line.rstrip('\r\n')
-                    if not line: continue
-                    if line.startswith('#'): continue
-                    if line.startswith('accession'): continue
 
-                    acc, lineage = '', ''
+        # the *first* taxa in lineage lines (usually superkingdom) are under the root
+        if not '1' in taxRanks: taxRanks['1'] = 'root'
+        if not '1' in taxNames: taxNames['1'] = 'root'
+
+        # lineage prefixes that have been added
+        prefix_cache = {}
+
+        try:
+            if gtdb_taxonomy_format=='gtdb_metadata':
+                metadata_columns = metadata_columns or []
+                for col in metadata_columns:
+                    if not col in gtdbMetadata:
+                        gtdbMetadata[col] = _CategoricalArray()
+                        # for genomes loaded before this column was kept
+                        for i in range(len(gtdbGenomes)):
+                            gtdbMetadata[col].append('')
+
+                rows = readGTDBMetadata(gtdb_taxonomy_file, ['accession', 'gtdb_taxonomy', 'ncbi_organism_name'] + metadata_columns)
+                for row in rows:
+                    acc, lineage, name = row[:3]
+                    _addGTDBGenome(acc, lineage, name, prefix_cache)
+
+                    if metadata_columns:
+                        values = dict(zip(metadata_columns, row[3:]))
+                        # a genome loaded before (reloads, duplicate rows) keeps its row
+                        key = acc.split('.')[0]
+                        if key in gtdbGenomes:
+                            idx = gtdbGenomes[key]
+                            for col in metadata_columns:
+                                gtdbMetadata[col][idx] = values.get(col, '')
+                        else:
+                            gtdbGenomes[key] = len(gtdbGenomes)
+                            for col in gtdbMetadata:
+                                gtdbMetadata[col].append(values.get(col, ''))
+            else:
+                with _openFile(gtdb_taxonomy_file) as f:
+                    for line in f:
+                        line = line.rstrip('\r\n')
+                        if not line: continue
+                        if line.startswith('#'): continue
+                        if line.startswith('accession'): continue
 
-                    if gtdb_taxonomy_format=='gtdb_taxonomy':
                         try:
                             acc, lineage = line.split('\t')
                         except:
                             logger.fatal( f"Incorrect GTDB taxonomy .tsv format: {gtdb_taxonomy_file}" )
                             _die( f"[ERROR] 2 columns are required for GTDB taxonomy .tsv format: {gtdb_taxonomy_file}" )
-                        lineage = f'{lineage};x__{acc}'
-                    elif gtdb_taxonomy_format=='gtdb_metadata':
-                        temp = line.split('\t')
-                        if len(temp)!=110:
-                            logger.fatal( f"Incorrect GTDB metadata .tsv format: {gtdb_taxonomy_file}" )
-                            _die( f"[ERROR] 110 columns are required for GTDB metadata .tsv format: {gtdb_taxonomy_file}" )
-                        acc = temp[0]
-                        # col_17: 'gtdb_taxonomy'; col_63: 'ncbi_organism_name'
-                        lineage = f'{temp[16]};x__{temp[62]}'
-                    else:
-                        logger.fatal( f"Incorrect format: {gtdb_taxonomy_format}: {gtdb_taxonomy_file}" )
-                        _die( f"[ERROR] Incorrect format: {gtdb_taxonomy_format}: {gtdb_taxonomy_file}" )
-
-                    temp = lineage.split(';')
-                    p_name = ''
-                    rank = ''
-                    name = ''
 
-                    for i in range(1, len(temp)+1):
-                        # this taxa
-                        import re
-                        re_taxa = re.compile("^([^_]+)__(.*)$")
-                        rank_abbr, name = re_taxa.match(temp[-i]).groups()
-                        if i==1 and rank_abbr=='x':
-                            name = f'{name} ({acc})'
-                        # for na taxon (no_{rank_abbr}_rank)
-                        if name=="": name = p_name
-
-                        # paranet taxa
-                        try:
-                            p_rank_abbr, p_name = re_taxa.match(temp[-(i+1)]).groups()
-                            if p_name=="":
-                                p_name = f'{name} - no_{p_rank_abbr}_rank'
-                        except:
-                            # for the *first* taxa in lineage line (usually superkingdom), assign parant taxid to 1 (root)
-                            p_name = '1'
-                            if not '1' in taxRanks: taxRanks['1'] = 'root'
-                            if not '1' in taxNames: taxNames['1'] = 'root'
-
-                        if rank_abbr=='d':
-                            rank = 'superkingdom'
-                        elif rank_abbr=='x':
-                            rank = 'strain'
-                        if rank_abbr in abbr_to_major_level:
-                            rank = abbr_to_major_level[rank_abbr]
-                        else:
-                            rank = rank_abbr
-                            
-                        tid = acc.split('.')[0] if i==1 and rank=='strain' else name
-                        taxParents[tid] = p_name
-                        taxRanks[tid] = rank
-                        taxNames[tid] = name
-                        if p_name in taxNumChilds:
-                            taxNumChilds[p_name] += 1
-                        else:
-                            taxNumChilds[p_name] = 1
-                f.close()
-                logger.info( f"Done parsing custom taxonomy file." )
+                        _addGTDBGenome(acc, lineage, acc, prefix_cache)
+                    f.close()
+            logger.info( f"Done parsing custom taxonomy file." )
         except IOError:
             _die( "Failed to open custom taxonomy file: %s." % gtdb_taxonomy_file )
 
+        _computeDepths()
+    elif os.path.isfile(gtdb_taxonomy_file):
+        logger.fatal( f"Incorrect format: {gtdb_taxonomy_format}: {gtdb_taxonomy_file}" )
+        _die( f"[ERROR] Incorrect format: {gtdb_taxonomy_format}: {gtdb_taxonomy_file}" )
+
     logger.info( f"Done parsing taxonomy files (total {len(taxParents)} taxa loaded)" )
+
+def readGTDBMetadata(gtdb_metadata_file: str, columns: list):
+    """
+    Stream selected columns of a GTDB metadata file (e.g. bac120_metadata_r207.tsv or .tsv.gz).
+    Columns are located by their header names and each row is only split up to the last selected column.
+
+    Args:
+        gtdb_metadata_file (str): Path of the GTDB metadata file.
+        columns (list): Names of the columns to read (e.g. ['accession', 'gtdb_taxonomy']).
+
+    Returns:
+        Iterator of tuples with the values of `columns` of each genome.
+    """
+    with _openFile(gtdb_metadata_file) as f:
+        header = f.readline().rstrip('\r\n').lstrip('#').split('\t')
+
+        missing = [col for col in columns if not col in header]
+        if len(missing):
+            logger.fatal( f"Incorrect GTDB metadata .tsv format: {gtdb_metadata_file}" )
+            _die( f"[ERROR] Column(s) {', '.join(missing)} not found in GTDB metadata .tsv file: {gtdb_metadata_file}" )
+
+        idx = [header.index(col) for col in columns]
+        maxsplit = max(idx)+1
+
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line: continue
+            if line.startswith('#'): continue
+
+            fields = line.split('\t', maxsplit)
+            if len(fields) < maxsplit:
+                logger.fatal( f"Incorrect GTDB metadata .tsv format: {gtdb_metadata_file}" )
+                _die( f"[ERROR] {maxsplit} columns are required for GTDB metadata .tsv format: {gtdb_metadata_file}" )
+
+            yield tuple(fields[i] for i in idx)
+
+@_releaseArg
+def taxid2metadata(tid: Union[int, str], column: Optional[str]=None) -> Union[str, dict]:
+    """
+    Get the GTDB metadata of a genome kept by `loadGTDBTaxonomy(..., metadata_columns=[...])`.
+
+    Args:
+        tid (Union[int, str]): Taxonomy ID (accession) of the genome, e.g. 'RS_GCF_000566285' or 'RS_GCF_000566285.1'.
+        column (str, optional): Name of the metadata column. Defaults to None.
+
+    Returns:
+        Union[str, dict]: The value of the column, or a dictionary of all kept columns if `column` is None.
+    """
+    tid = str(tid).split('.')[0]
+    if not tid in gtdbGenomes:
+        return {} if column is None else "unknown"
+
+    idx = gtdbGenomes[tid]
+    if column is None:
+        return {col: gtdbMetadata[col][idx] for col in gtdbMetadata}
+    elif column in gtdbMetadata:
+        return gtdbMetadata[column][idx]
+    else:
+        return "unknown"
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from detaxa import taxonomy as t
+
+# (tid, parent, rank, name) of a small NCBI-like taxonomy
+nodes = [
+    ('1', '1', 'no rank', 'root'),
+    ('131567', '1', 'no rank', 'cellular organisms'),
+    ('2', '131567', 'superkingdom', 'Bacteria'),
+    ('1224', '2', 'phylum', 'Pseudomonadota'),
+    ('1236', '1224', 'class', 'Gammaproteobacteria'),
+    ('91347', '1236', 'order', 'Enterobacterales'),
+    ('543', '91347', 'family', 'Enterobacteriaceae'),
+    ('561', '543', 'genus', 'Escherichia'),
+    ('562', '561', 'species', 'Escherichia coli'),
+    ('83333', '562', 'strain', 'Escherichia coli K-12'),
+    ('620', '543', 'genus', 'Shigella'),
+    ('622', '620', 'species', 'Shigella dysenteriae'),
+    ('1239', '2', 'phylum', 'Bacillota'),
+    ('91061', '1239', 'class', 'Bacilli'),
+    ('1385', '91061', 'order', 'Bacillales'),
+    ('186817', '1385', 'family', 'Bacillaceae'),
+    ('1386', '186817', 'genus', 'Bacillus'),
+    ('1423', '1386', 'species', 'Bacillus subtilis'),
+    ('90964', '1385', 'family', 'Staphylococcaceae'),
+    ('1279', '90964', 'genus', 'Staphylococcus'),
+    ('1280', '1279', 'species', 'Staphylococcus aureus'),
+    ('2759', '131567', 'superkingdom', 'Eukaryota'),
+    ('33208', '2759', 'kingdom', 'Metazoa'),
+    ('6656', '33208', 'phylum', 'Arthropoda'),
+    ('50557', '6656', 'class', 'Insecta'),
+    ('55087', '50557', 'genus', 'Bacillus'),
+]
+
+# accessions of the taxa
+accessions = [
+    ('NC_000913', '511145'),
+    ('NZ_CP009072', '562'),
+    ('NC_007795', '1280'),
+    ('NC_000964', '1423'),
+    ('AL009126', '1423'),
+]
+
+def _clear():
+    """Empty the taxonomy tables of the module"""
+    t.unfreezeTaxonomy()
+    t.dropTaxonomyReleases()
+    t._releases.clear()
+    t._baseRelease = t._defaultRelease = None
+    if t._sqliteStore is not None:
+        t._closeSQLite()
+    for table in [t.taxDepths, t.taxParents, t.taxRanks, t.taxNames, t.taxMerged, t.taxDeleted, t.taxNumChilds,
+                  t.accTid, t.tidLineage, t.tidLineageDict, t.gtdbGenomes, t.gtdbMetadata, t.taxChildren,
+                  t._treeArrays, t._derivedAttrs, t._lineageIndex, t._accIndexes, t._bgzfBlockKeys]:
+        table.clear()
+    if isinstance(t.taxNames, t._LazyNames):
+        t.taxNames = {}
+    t.name2taxid_reset()
+
+@pytest.fixture
+def taxdb(tmp_path):
+    """Load the NCBI-like taxonomy from dumps in a temporary directory"""
+    with open(tmp_path / 'nodes.dmp', 'w') as f:
+        for tid, parent, rank, name in nodes:
+            f.write(f"{tid}\t|\t{parent}\t|\t{rank}\t|\t\t|\n")
+    with open(tmp_path / 'names.dmp', 'w') as f:
+        for tid, parent, rank, name in nodes:
+            f.write(f"{tid}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+    with open(tmp_path / 'merged.dmp', 'w') as f:
+        f.write("511145\t|\t83333\t|\n")
+        f.write("12345\t|\t511145\t|\n")
+    with open(tmp_path / 'delnodes.dmp', 'w') as f:
+        f.write("999999\t|\n")
+    os.makedirs(tmp_path / 'accession2taxid')
+    with open(tmp_path / 'accession2taxid' / 'nucl_gb.accession2taxid', 'w') as f:
+        f.write("accession\taccession.version\ttaxid\tgi\n")
+        for acc, tid in sorted(accessions):
+            f.write(f"{acc}\t{acc}.1\t{tid}\t0\n")
+
+    _clear()
+    t.loadTaxonomy(str(tmp_path), auto_download=False)
+    yield tmp_path
+    _clear()
@@ -0,0 +1,42 @@
+from detaxa import taxonomy as t
+from conftest import accessions
+
+
+def test_route_misses(taxdb):
+    acc2taxid_file = str(taxdb / 'accession2taxid' / 'nucl_gb.accession2taxid')
+    routes = t.indexAcc2taxid(acc2taxid_file)
+    assert routes['AA_999999'] == ['NC_000913', 'NC_007795']
+    assert routes['AA999999'] == ['AL009126', 'AL009126']
+
+    assert all(t._accInFile(acc, acc2taxid_file) for acc, tid in accessions)
+    # no accession of the format
+    assert not t._accInFile('ABCD01000001', acc2taxid_file)
+    # out of the key range of the format
+    assert not t._accInFile('AB000001', acc2taxid_file)
+    assert not t._accInFile('NC_999999', acc2taxid_file)
+
+    assert t.acc2taxid('AL009126.3') == '1423'
+    assert t.acc2taxid('AB000001.1') == ''
+    assert t.acc2taxid_many(['NC_000964.3', 'ABCD01000001.1']) == ['1423', '']
+
+
+def test_bloom_misses(taxdb):
+    import json
+    acc2taxid_file = str(taxdb / 'accession2taxid' / 'nucl_gb.accession2taxid')
+    t.indexAcc2taxid(acc2taxid_file)
+    with open(f"{acc2taxid_file}.routes.json") as f:
+        index = json.load(f)
+    assert index['count'] == len(accessions)
+    assert t._accCount(acc2taxid_file) == len(accessions)
+
+    bloom, num_bits, num_hashes = t._accFileIndex(acc2taxid_file)['bloom']
+    assert num_bits == index['bloom']['bits'] and len(bloom) == (num_bits+7)//8
+    # in the key range of 'AA_999999' but not in the file
+    assert not t._accInFile('NC_000950', acc2taxid_file)
+    assert t.acc2taxid('NC_000950.1') == ''
+
+    # a changed file is searched without the index
+    with open(acc2taxid_file, 'a') as f:
+        f.write("NC_000950\tNC_000950.1\t562\t0\n")
+    t._accIndexes.clear()
+    assert t._accInFile('NC_000950', acc2taxid_file)
@@ -0,0 +1,14 @@
+from click.testing import CliRunner
+
+from detaxa import taxonomy as t
+from detaxa.__main__ import cli
+
+
+def test_custom_lineage_format(taxdb, tmp_path):
+    with open(tmp_path / 'lineage.txt', 'w') as f:
+        f.write('sk__Bacteria;k__;p__Bacillota;c__Bacilli;o__Bacillales;f__Staphylococcaceae;g__Staphylococcus\n')
+
+    for command in (['export-tsv'], ['dump-lineages', '--sep', ';']):
+        result = CliRunner().invoke(cli, command + ['-d', str(taxdb), '-c', str(tmp_path / 'lineage.txt'), '-f', 'lineage'])
+        assert result.exit_code == 0, result.output
+        assert 'Staphylococcaceae' in result.output
@@ -0,0 +1,18 @@
+import json
+
+from detaxa import taxonomy as t
+
+
+def test_export_subtree(taxdb, tmp_path):
+    assert t.export_subtree('543', str(tmp_path / 'tree.nwk'), annotate=False) == 6
+    assert open(tmp_path / 'tree.nwk').read().strip() == '(((83333)562)561,(622)620)543;'
+
+    t.export_subtree('543', str(tmp_path / 'tree.json'), format='json')
+    tree = json.load(open(tmp_path / 'tree.json'))
+    assert (tree['taxid'], tree['name'], tree['rank']) == ('543', 'Enterobacteriaceae', 'family')
+    assert sorted(child['taxid'] for child in tree['children']) == ['561', '620']
+
+    t.export_subtree('2', str(tmp_path / 'genera.nwk'), ranks=['genus'], annotate=False)
+    assert open(tmp_path / 'genera.nwk').read().strip() == '(561,620,1386,1279)2;'
+    t.export_subtree('2', str(tmp_path / 'top.nwk'), max_depth=1, annotate=False)
+    assert open(tmp_path / 'top.nwk').read().strip() == '(1224,1239)2;'
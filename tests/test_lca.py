@@ -0,0 +1,41 @@
+from detaxa import taxonomy as t
+from detaxa import lca
+
+
+def test_acc2taxid_many(taxdb):
+    accs = ['NC_007795.1', 'NOPE0001', 'AL009126.3', 'NC_000913.3', 'NC_007795.1', 'NZ_CP009072']
+    tids = t.acc2taxid_many(accs)
+    t.accTid.clear()
+    assert tids == [t.acc2taxid(acc) for acc in accs]
+    assert tids == ['1280', '', '1423', '511145', '1280', '562']
+
+
+def test_lcaTaxid(taxdb):
+    assert lca.lcaTaxid(['562', '83333']) == '562'
+    assert lca.lcaTaxid(['562', '622']) == '543'
+    assert lca.lcaTaxid(['562', '622', '1280']) == '2'
+    assert lca.lcaTaxid(['562', '562', '83333', '1280'], majority=0.75) == '562'
+    assert lca.lcaTaxid(['562', '562', '622', '1280'], majority=0.6) == '543'
+    assert lca.lcaTaxid(['511145', '562']) == '562'
+    assert lca.lcaTaxid(['NOPE']) == 'unknown'
+
+
+def test_lcaHits(taxdb, tmp_path):
+    hits = [
+        ('q1', 'ref|NZ_CP009072.1|', 99.0, 1e-50, 500.0),
+        ('q1', 'gi|1|ref|NC_000913.3|', 98.0, 1e-48, 480.0),
+        ('q1', 'NC_007795.1', 80.0, 1e-10, 100.0),
+        ('q2', 'NC_000964.1', 99.0, 1e-50, 500.0),
+        ('q2', 'NC_007795.1', 99.0, 1e-50, 490.0),
+        ('q3', 'NOPE0001.1', 99.0, 1e-50, 500.0),
+    ]
+    with open(tmp_path / 'hits.m8', 'w') as f:
+        for query, subject, identity, evalue, bitscore in hits:
+            f.write(f"{query}\t{subject}\t{identity}\t100\t0\t0\t1\t100\t1\t100\t{evalue}\t{bitscore}\n")
+
+    for jobs in (1, 2):
+        assert lca.lcaHits(str(tmp_path / 'hits.m8'), str(tmp_path / 'hits.lca.tsv'), top_percent=10, jobs=jobs) == 3
+        rows = [line.rstrip('\n').split('\t') for line in open(tmp_path / 'hits.lca.tsv')]
+        assert rows == [['q1', '562', 'species', 'Escherichia coli', '2'],
+                        ['q2', '1385', 'order', 'Bacillales', '2'],
+                        ['q3', 'unknown', '', 'unclassified', '0']]
@@ -0,0 +1,67 @@
+from detaxa import taxonomy as t
+
+
+def test_full_lineage(taxdb):
+    lineage = 'sk__Bacteria;p__Pseudomonadota;c__Gammaproteobacteria;o__Enterobacterales;f__Enterobacteriaceae;g__Escherichia;s__Escherichia coli'
+    assert t.lineage2taxid(lineage) == '562'
+    assert t.lineage2taxid(lineage.replace('Escherichia coli', 'Escherichia_coli')) == '562'
+
+
+def test_empty_ranks(taxdb):
+    lineage = 'sk__Bacteria;k__;p__Pseudomonadota;c__Gammaproteobacteria;o__;f__Enterobacteriaceae;g__Escherichia'
+    assert t.lineage2taxid(lineage) == '561'
+
+
+def test_skipped_ranks(taxdb):
+    assert t.lineage2taxid('sk__Bacteria;p__Pseudomonadota;g__Escherichia') == '561'
+    assert t.lineage2taxid('p__Bacillota;s__Staphylococcus aureus') == '1280'
+    assert t.lineage2taxid('g__Escherichia;s__Escherichia coli') == '562'
+
+
+def test_no_rank_names(taxdb):
+    lineage = 'sk__Bacteria;p__Pseudomonadota;c__Gammaproteobacteria;o__Gammaproteobacteria - no_o_rank;f__Enterobacteriaceae'
+    assert t.lineage2taxid(lineage) == '543'
+
+
+def test_no_rank_taxa(tmp_path):
+    with open(tmp_path / 'lineage.txt', 'w') as f:
+        f.write('sk__Bacteria;k__;p__Bacillota;c__Bacilli;o__;f__;g__Staphylococcus;s__Staphylococcus_aureus\n')
+        f.write('sk__Bacteria;k__;p__Pseudomonadota;c__Gammaproteobacteria;o__Enterobacterales;f__Enterobacteriaceae;g__Escherichia\n')
+
+    from conftest import _clear
+    _clear()
+    t.loadMgnifyTaxonomy(str(tmp_path / 'lineage.txt'))
+    assert t.lineage2taxid('sk__Bacteria;k__;p__Bacillota;c__Bacilli;o__;f__;g__Staphylococcus') == 'Staphylococcus'
+    assert t.lineage2taxid('sk__Bacteria;p__Bacillota;s__Staphylococcus_aureus') == 'Staphylococcus_aureus'
+    assert t.lineage2taxid('sk__Bacteria;c__Gammaproteobacteria;g__Escherichia') == 'Escherichia'
+    _clear()
+
+
+def test_homonyms(taxdb):
+    assert t.lineage2taxid('sk__Bacteria;g__Bacillus') == '1386'
+    assert t.lineage2taxid('sk__Eukaryota;c__Insecta;g__Bacillus') == '55087'
+    # the LCA (`lca_taxid()`) of homonyms without a distinguishing ancestor
+    assert t.lineage2taxid('g__Bacillus') == '1'
+    # a homonym elsewhere in the tree doesn't match
+    assert t.lineage2taxid('sk__Bacteria;p__Pseudomonadota;g__Bacillus') == '1224'
+
+
+def test_unknown(taxdb):
+    assert t.lineage2taxid('g__NoSuchGenus') == 'unknown'
+    assert t.lineage2taxid('') == 'unknown'
+    assert t.lineage2taxid('sk__Bacteria;p__Pseudomonadota;g__NoSuchGenus') == '1224'
+
+
+def test_many(taxdb):
+    lineages = ['sk__Bacteria;g__Escherichia', 'g__NoSuchGenus', 'sk__Bacteria;g__Escherichia']
+    assert t.lineage2taxid_many(lineages) == ['561', 'unknown', '561']
+
+
+def test_iterLineages(taxdb):
+    for tid, lineage in t.iterLineages():
+        assert lineage == t.taxid2lineage(tid)
+    for tid, lineage in t.iterLineages('543', sep=';', print_strain=True):
+        assert lineage == t.taxid2lineage(tid, sep=';', print_strain=True)
+    for tid, lineage in t.iterLineages('2', full_lineage=True, space2underscore=True):
+        assert lineage == t.taxid2fullLineage(tid)
+    assert sorted(tid for tid, lineage in t.iterLineages('561')) == ['561', '562', '83333']
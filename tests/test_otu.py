@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from detaxa import otu
+
+
+def _writeList(path, rows):
+    with open(path, 'w') as f:
+        f.write("LEVEL\tTAXA\tROLLUP\tASSIGNED\tTAXID\n")
+        for row in rows:
+            f.write('\t'.join(str(v) for v in row) + '\n')
+
+
+@pytest.fixture
+def samples(taxdb, tmp_path):
+    _writeList(tmp_path / 'S1.list.txt', [('root', 'root', 100, 0, '1'),
+                                           ('species', 'Escherichia coli', 60, 60, '562'),
+                                           ('species', 'Staphylococcus aureus', 40, 40, '1280'),
+                                           ('unclassified', 'unclassified', 5, 5, '0')])
+    _writeList(tmp_path / 'S2.list.txt', [('root', 'root', 50, 0, '1'),
+                                           ('species', 'Escherichia coli', 50, 40, '562'),
+                                           ('strain', 'Escherichia coli K-12', 10, 10, '83333')])
+    return [('S1', str(tmp_path / 'S1.list.txt')), ('S2', str(tmp_path / 'S2.list.txt'))]
+
+
+def test_otu_tsv(samples, tmp_path):
+    table = otu.buildOTUTable(samples)
+    otu.writeOTUTableTSV(table, str(tmp_path / 'otu.tsv'))
+    rows = [line.rstrip('\n').split('\t') for line in open(tmp_path / 'otu.tsv')]
+    assert rows[0] == ['#OTU ID', 'S1', 'S2']
+    counts = {row[0].split(';')[-1]: row[1:] for row in rows[1:]}
+    assert counts == {'s__Escherichia_coli': ['60', '50'], 's__Staphylococcus_aureus': ['40', '0']}
+
+    otu.writeOTUTableTSV(table, str(tmp_path / 'otu.rel.tsv'), relative=True)
+    rows = [line.rstrip('\n').split('\t') for line in open(tmp_path / 'otu.rel.tsv')]
+    assert [row[1:] for row in rows[1:]] == [['0.4', '0.0'], ['0.6', '1.0']]
+
+
+def test_otu_biom(samples, tmp_path):
+    table = otu.buildOTUTable(samples)
+    otu.writeOTUTableBIOM(table, str(tmp_path / 'otu.biom'))
+    biom = json.load(open(tmp_path / 'otu.biom'))
+    assert biom['shape'] == [2, 2]
+    assert [column['id'] for column in biom['columns']] == ['S1', 'S2']
+    assert [row['metadata']['taxonomy'][-1] for row in biom['rows']] == ['s__Staphylococcus_aureus', 's__Escherichia_coli']
+    assert biom['data'] == [[0, 0, 40], [1, 0, 60], [1, 1, 50]]
+
+
+def test_duplicate_samples(samples):
+    with pytest.raises(SystemExit):
+        otu.buildOTUTable(samples + [('S1', samples[1][1])])
@@ -0,0 +1,68 @@
+import shutil
+
+import pytest
+
+from detaxa import taxonomy as t
+from conftest import _clear, nodes
+
+
+@pytest.fixture
+def releases(taxdb, tmp_path):
+    """Two releases: r2 renames Escherichia coli, drops Shigella and adds a new species"""
+    r2 = tmp_path / 'r2'
+    r2.mkdir()
+    for name in ['merged.dmp', 'delnodes.dmp']:
+        shutil.copy(taxdb / name, r2 / name)
+    r2_nodes = [node for node in nodes if not node[0] in ('620', '622')] + [('900001', '561', 'species', 'Escherichia novel')]
+    with open(r2 / 'nodes.dmp', 'w') as f:
+        for tid, parent, rank, name in r2_nodes:
+            f.write(f"{tid}\t|\t{parent}\t|\t{rank}\t|\t\t|\n")
+    with open(r2 / 'names.dmp', 'w') as f:
+        for tid, parent, rank, name in r2_nodes:
+            name = 'Escherichia coli renamed' if tid == '562' else name
+            f.write(f"{tid}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+
+    _clear()
+    t.loadTaxonomyRelease('r1', str(taxdb), auto_download=False)
+    t.loadTaxonomyRelease('r2', str(r2), auto_download=False)
+    yield
+
+
+def test_release_lookups(releases):
+    assert t.taxid2name('562') == 'Escherichia coli'
+    assert t.taxid2name('562', release='r2') == 'Escherichia coli renamed'
+    assert t.taxid2name('622') == 'Shigella dysenteriae'
+    assert t.taxid2name('622', release='r2') == 'unknown'
+    assert t.taxid2name('900001') == 'unknown'
+    assert t.taxid2lineage('900001', release='r2').endswith('species|900001|Escherichia novel')
+    assert t.taxid2lineage('562', release='r1') == t.taxid2lineage('562')
+
+
+def test_release_names(releases):
+    assert t.name2taxid('Escherichia coli') == [562]
+    assert t.name2taxid('Escherichia coli', release='r2') == []
+    assert t.name2taxid('Escherichia coli renamed', release='r2') == [562]
+    assert t.name2taxid('Shigella', release='r2', expand=False) == []
+
+
+def test_default_release(releases):
+    t.setDefaultRelease('r2')
+    assert t.taxid2name('562') == 'Escherichia coli renamed'
+    assert t.taxid2name('562', release='r1') == 'Escherichia coli'
+    with pytest.raises(SystemExit):
+        t.setDefaultRelease('r3')
+    with pytest.raises(SystemExit):
+        t.taxid2name('562', release='r3')
+
+
+def test_drop_releases(releases, taxdb):
+    # loaders don't silently drop releases
+    with pytest.raises(SystemExit):
+        t.loadTaxonomy(str(taxdb), auto_download=False)
+    with pytest.raises(SystemExit):
+        t.add_taxa([('MAG001', '562', 'strain', 'MAG001')])
+
+    t.dropTaxonomyReleases()
+    assert list(t._releases) == ['r1']
+    assert t.taxid2name('562') == 'Escherichia coli'
+    assert t.add_taxa([('MAG001', '562', 'strain', 'MAG001')]) == 1
@@ -0,0 +1,25 @@
+import pytest
+
+from detaxa import taxonomy as t
+
+np = pytest.importorskip('numpy')
+
+
+def test_rollupCounts(taxdb):
+    result = t.rollupCounts(['562', '83333', '1280', '0', '999999', '12345'], [5, 2, 3, 4, 1, 1])
+    counts = {tid: (int(cumulative), int(direct)) for tid, cumulative, direct in
+              zip(result['taxid'], result['cumulative'], result['direct'])}
+    assert counts['83333'] == (3, 3)
+    assert counts['562'] == (8, 5)
+    assert counts['543'] == (8, 0)
+    assert counts['1280'] == (3, 3)
+    assert counts['2'] == (11, 0)
+    assert counts['1'] == (11, 0)
+    assert not '620' in counts
+    assert result['unclassified'] == 5
+
+
+def test_rollupCounts_ranks(taxdb):
+    result = t.rollupCounts(np.array(['562', '83333', '1280', '1423']), ranks=['genus'])
+    assert result['taxid'] == ['561', '1386', '1279']
+    assert result['cumulative'].tolist() == [2, 1, 1]
@@ -0,0 +1,25 @@
+from detaxa import taxonomy as t
+
+
+def test_sqlite_round_trip(taxdb, tmp_path):
+    funcs = [t.taxid2name, t.taxid2rank, t.taxid2parent, t.taxid2depth, t.taxid2type, t.taxidIsLeaf,
+             t.taxid2nearestMajorTaxid, t.taxid2lineage, t.taxid2fullLineage]
+    tids = list(t.taxParents) + ['12345', '511145', '999999', 'NOPE']
+    expected = {(func.__name__, tid): func(tid) for func in funcs for tid in tids}
+    names = {name: t.name2taxid(name) for name in ['Escherichia coli', 'Bacillus', 'NOPE']}
+
+    t.buildTaxonomySQLite(str(tmp_path / 'taxonomy.sqlite'),
+                          accession2taxid_files=[str(taxdb / 'accession2taxid' / 'nucl_gb.accession2taxid')])
+    t.name2taxid_reset()
+    t.loadTaxonomySQLite(str(tmp_path / 'taxonomy.sqlite'))
+    assert t._sqliteStore is not None
+
+    for (name, tid), value in expected.items():
+        assert getattr(t, name)(tid) == value, (name, tid)
+    for name, tids in names.items():
+        assert sorted(str(tid) for tid in t.name2taxid(name)) == sorted(str(tid) for tid in tids)
+    assert t.name2taxid('Escherichia col', fuzzy=True, max_matches=1) == ['562']
+    # a typo in the first two letters
+    assert t.name2taxid('Ecsherichia coli', fuzzy=True, max_matches=1) == ['562']
+    assert t.acc2taxid('NC_007795.1') == '1280'
+    assert t.acc2taxid('NOPE0001') == ''
@@ -0,0 +1,97 @@
+import pytest
+
+from detaxa import taxonomy as t
+
+
+def test_add_taxa(taxdb):
+    assert t.add_taxa([('MAG002', 'MAG001', 'strain', 'Escherichia coli MAG002'),
+                       ('MAG001', '562', 'no rank', 'Escherichia coli MAGs')]) == 2
+    assert t.taxParents['MAG002'] == 'MAG001'
+    assert t.taxid2parent('MAG002') == '562'
+    assert t.taxid2depth('MAG002') == t.taxid2depth('562') + 2
+    assert t.taxNumChilds['562'] == 2
+    assert t.taxid2lineage('MAG002') == t.taxid2lineage('562')
+    assert t.name2taxid('Escherichia coli MAG002', expand=False) == ['MAG002']
+
+    # redefine a loaded taxon
+    t.add_taxa([('622', '561', 'species', 'Shigella dysenteriae')])
+    assert t.taxid2depth('622') == t.taxid2depth('562')
+    assert t.taxNumChilds['561'] == 2
+    assert not '620' in t.taxNumChilds
+    assert t.taxid2lineage('622') == t.taxid2lineage('562').replace('562|Escherichia coli', '622|Shigella dysenteriae')
+
+
+def test_add_taxa_refused(taxdb):
+    num_taxa = len(t.taxParents)
+    with pytest.raises(SystemExit):
+        t.add_taxa([('MAG001', 'NOPE', 'strain', 'MAG001')])
+    with pytest.raises(SystemExit):
+        t.add_taxa([('543', '562', 'family', 'Enterobacteriaceae')])
+    assert len(t.taxParents) == num_taxa
+    assert t.taxid2parent('543') == '91347'
+
+
+def test_remove_taxa(taxdb):
+    depths = dict(t.taxDepths)
+    t.add_taxa([('MAG001', '1280', 'strain', 'Staphylococcus aureus MAG001')])
+    assert t.remove_taxa(['561']) == 3
+    assert t.remove_taxa(['MAG001']) == 1
+    for tid in ['561', '562', '83333', 'MAG001']:
+        assert not tid in t.taxParents
+    assert t.taxNumChilds['543'] == 1
+    assert not '1280' in t.taxNumChilds
+    assert t.name2taxid('Escherichia', expand=False) == []
+    assert all(t.taxDepths[tid] == depths[tid] for tid in t.taxParents)
+
+
+def test_lazy_names(taxdb):
+    from conftest import _clear, nodes
+    with open(taxdb / 'names.dmp', 'w') as f:
+        for tid, parent, rank, name in sorted(nodes, key=lambda node: int(node[0])):
+            f.write(f"{tid}\t|\t{name}\t|\t\t|\tscientific name\t|\n")
+    _clear()
+    t.loadTaxonomy(str(taxdb), auto_download=False, lazy_names=True)
+    assert isinstance(t.taxNames, t._LazyNames)
+
+    t.add_taxa([('MAG001', '562', 'strain', 'Escherichia coli MAG001')])
+    assert t.taxid2name('MAG001') == 'Escherichia coli MAG001'
+    assert t.remove_taxa(['562']) == 3
+    for tid in ['562', '83333', 'MAG001']:
+        assert not tid in t.taxParents and not tid in t.taxRanks and not tid in t.taxDepths
+    assert not '561' in t.taxNumChilds
+    assert t.taxid2name('561') == 'Escherichia'
+
+
+def test_freeze(taxdb):
+    t.freezeTaxonomy()
+    try:
+        assert len(t.taxChildren) and len(t._derivedAttrs) and len(t._lineageIndex)
+        assert t.df_names is not None
+        with pytest.raises(SystemExit):
+            t.loadTaxonomy(str(taxdb), auto_download=False)
+        with pytest.raises(SystemExit):
+            t.add_taxa([('MAG001', '562', 'strain', 'Escherichia coli MAG001')])
+        with pytest.raises(SystemExit):
+            t.remove_taxa(['562'])
+
+        # lookups don't fill the caches
+        assert t.taxid2lineage('562') == 'superkingdom|2|Bacteria|phylum|1224|Pseudomonadota|class|1236|Gammaproteobacteria|order|91347|Enterobacterales|family|543|Enterobacteriaceae|genus|561|Escherichia|species|562|Escherichia coli'
+        assert t.name2taxid('Escherichia coli') == [562]
+        assert t.acc2taxid('NC_007795.1') == '1280'
+        assert t.acc2taxid_many(['NC_000964', 'NOPE0001']) == ['1423', '']
+        assert not len(t.tidLineageDict) and not len(t.nameTid) and not len(t.accTid)
+    finally:
+        t.unfreezeTaxonomy()
+
+    assert t.add_taxa([('MAG001', '562', 'strain', 'Escherichia coli MAG001')]) == 1
+
+
+def test_normalize_taxids(taxdb):
+    # 12345 -> 511145 -> 83333
+    assert t.taxMerged['12345'] == '83333'
+    tids, counters = t.normalize_taxids(['12345', '511145', '562', '999999', 'NOPE', 562])
+    assert tids == ['83333', '83333', '562', 'unknown', 'unknown', '562']
+    assert counters['remapped'] == {'12345': 1, '511145': 1}
+    assert counters['deleted'] == {'999999': 1}
+    assert counters['unknown'] == {'NOPE': 1}
+    assert t.taxid2name('12345') == 'Escherichia coli K-12'